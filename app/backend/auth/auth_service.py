@@ -1,42 +1,62 @@
-import csv
-import bcrypt
-from pathlib import Path
 # At the top of auth_service.py, add:
 from backend.db.db_writer import log_user
-
-USER_FILE = Path("data/users.csv")
+from backend.auth.user_registry import USER_STORE
+from backend.auth.password_pool import PASSWORD_POOL, PoolBusy
+from backend.auth.sessions import RATE_LIMITER, CREDENTIALS
 
 def load_users():
-    if not USER_FILE.exists():
-        return []
-    with open(USER_FILE, newline="") as f:
-        return list(csv.DictReader(f))
+    return USER_STORE.all()
 
 def save_user(user_id, password, role):
-    USER_FILE.parent.mkdir(parents=True, exist_ok=True)
-
-    users = load_users()
-    if any(u["user_id"] == user_id for u in users):
+    if USER_STORE.get(user_id) is not None:
         return False, "User already exists."
 
-    pw_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    # hash outside the store lock; add() re-checks for a concurrent signup
+    try:
+        pw_hash = PASSWORD_POOL.hash(password)
+    except PoolBusy:
+        return False, "Server busy, please try again."
+
+    if not USER_STORE.add(user_id, pw_hash, role):
+        return False, "User already exists."
 
-    write_header = not USER_FILE.exists()
-    with open(USER_FILE, "a", newline="") as f:
-        writer = csv.writer(f)
-        if write_header:
-            writer.writerow(["user_id", "password_hash", "role"])
-        writer.writerow([user_id, pw_hash, role])
-        
     log_user(user_id, role)
     return True, "Signup successful."
 
 def authenticate(user_id, password):
     print("AUTH ATTEMPT:", user_id)
-    users = load_users()
-    for u in users:
-        if u["user_id"] == user_id:
-            if bcrypt.checkpw(password.encode(), u["password_hash"].encode()):
-                return True, u["role"]
-            return False, "Invalid password"
-    return False, "User not found"
+    cached_role = CREDENTIALS.check(user_id, password)
+    if cached_role is not None:
+        return True, cached_role
+
+    allowed, retry_after = RATE_LIMITER.try_acquire(user_id)
+    if not allowed:
+        return False, f"Too many login attempts, try again in {retry_after:.0f}s"
+
+    u = USER_STORE.get(user_id)
+    if u is None:
+        return False, "User not found"
+    try:
+        valid = PASSWORD_POOL.verify(password, u["password_hash"])
+    except PoolBusy:
+        RATE_LIMITER.refund(user_id)
+        return False, "Server busy, please try again."
+    if not valid:
+        return False, "Invalid password"
+
+    RATE_LIMITER.reset(user_id)
+    CREDENTIALS.remember(user_id, u["role"], password)
+    return True, u["role"]
+
+def forget_login(user_id):
+    """
+    Logout: the next login runs the full password check again.
+    """
+    return CREDENTIALS.forget_user(user_id)
+
+def auth_stats():
+    return {
+        "hashing": PASSWORD_POOL.stats(),
+        "rate_limit": RATE_LIMITER.stats(),
+        "credential_cache": CREDENTIALS.stats(),
+    }
@@ -0,0 +1,121 @@
+# backend/auth/password_pool.py
+"""
+Bounded worker pool for bcrypt.
+
+bcrypt is deliberately slow (~0.25 s per check at cost 12). Run inline in
+Gradio handlers, a shift-change login storm puts one hash per waiting
+driver on the CPU at once and starves every other handler, live segment
+updates included. Here at most WORKERS hashes run at a time; the rest wait
+in a queue of at most MAX_PENDING, and beyond that verify() fails fast
+with PoolBusy instead of piling up. A request not answered within
+RESULT_TIMEOUT_S also fails with PoolBusy; its slot stays taken until the
+hash really finishes.
+
+bcrypt releases the GIL while hashing, so threads are enough: the waiting
+handler blocks on a future, not on the interpreter.
+
+Env:
+    AUTH_HASH_WORKERS  concurrent hashes (default: half the cores)
+    AUTH_HASH_QUEUE    max waiting + running requests (default 64)
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+from backend.metrics import LatencySamples
+
+WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+MAX_PENDING = int(os.getenv("AUTH_HASH_QUEUE", "64"))
+ADMIT_TIMEOUT_S = 1.0
+RESULT_TIMEOUT_S = 30.0
+
+
+class PoolBusy(RuntimeError):
+    """Too many hash requests queued; the caller should ask the user to retry."""
+
+
+class PasswordPool:
+    """
+    Usage:
+        ok = PASSWORD_POOL.verify(password, stored_hash)
+        stored_hash = PASSWORD_POOL.hash(password)
+    """
+
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.queue_wait = LatencySamples()
+        self.hash_time = LatencySamples()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=ADMIT_TIMEOUT_S):
+            with self._lock:
+                self.rejected += 1
+            raise PoolBusy(f"{self.max_pending} password checks already queued")
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            self.queue_wait.record(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                self.hash_time.record(time.perf_counter() - started)
+
+        def done(_):
+            # the slot is held until the hash has actually finished (or was
+            # cancelled while queued), so MAX_PENDING bounds real work
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self._pool.submit(job)
+        except BaseException:
+            done(None)
+            raise
+        future.add_done_callback(done)
+
+        try:
+            return future.result(timeout=RESULT_TIMEOUT_S)
+        except FutureTimeout:
+            future.cancel()  # drops it if still queued; a running hash finishes
+            with self._lock:
+                self.timed_out += 1
+            raise PoolBusy(f"password check not done within {RESULT_TIMEOUT_S:.0f}s") from None
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run(bcrypt.checkpw, password.encode(), hashed.encode())
+
+    def hash(self, password: str) -> str:
+        return self._run(lambda pw: bcrypt.hashpw(pw, bcrypt.gensalt()).decode(), password.encode())
+
+    def stats(self):
+        with self._lock:
+            pending, rejected, timed_out = self.pending, self.rejected, self.timed_out
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "rejected": rejected,
+            "timed_out": timed_out,
+            "queue_wait_s": self.queue_wait.stats(),
+            "hash_s": self.hash_time.stats(),
+        }
+
+
+PASSWORD_POOL = PasswordPool()
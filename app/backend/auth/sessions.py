@@ -0,0 +1,148 @@
+# backend/auth/sessions.py
+"""
+Login rate limiting and a verified-credential cache.
+
+LoginRateLimiter
+    Token bucket per user_id: BURST attempts, refilled evenly over
+    WINDOW_S. Each attempt that would reach bcrypt takes a token; a
+    successful login refills the bucket. An attacker (or a stuck client)
+    hammering one account is turned away before any hash runs.
+
+CredentialCache
+    After a successful login, remembers an HMAC of the credentials (keyed
+    with a per-process secret, never the password itself) for TTL_S, so
+    logging in again with the same password inside the TTL (page reload,
+    reconnect) is a dict lookup instead of a bcrypt check. Logout forgets
+    the user's entries. Who is logged in per browser tab is tracked by
+    backend/state/session_registry.py, not here.
+
+Env:
+    AUTH_RATE_BURST       attempts per user before limiting (default 5)
+    AUTH_RATE_WINDOW      seconds to refill the full burst (default 60)
+    AUTH_CREDENTIAL_TTL   how long a verified login is remembered, seconds (default 900)
+"""
+
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+BURST = int(os.getenv("AUTH_RATE_BURST", "5"))
+WINDOW_S = float(os.getenv("AUTH_RATE_WINDOW", "60"))
+TTL_S = float(os.getenv("AUTH_CREDENTIAL_TTL", "900"))
+MAX_CREDENTIALS = 10000
+MAX_TRACKED_USERS = 10000
+
+
+class LoginRateLimiter:
+    def __init__(self, burst=BURST, window_s=WINDOW_S, max_users=MAX_TRACKED_USERS):
+        self.burst = burst
+        self.rate = burst / window_s  # tokens per second
+        self.max_users = max_users
+        self._buckets = OrderedDict()  # user_id -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+        self.limited = 0
+
+    def _tokens(self, user_id, now):
+        tokens, updated = self._buckets.get(user_id, (self.burst, now))
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def try_acquire(self, user_id: str):
+        """
+        Take one attempt. Returns (allowed, retry_after_s).
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(user_id, now)
+            if tokens < 1:
+                self.limited += 1
+                return False, (1 - tokens) / self.rate
+            self._buckets[user_id] = (tokens - 1, now)
+            self._buckets.move_to_end(user_id)
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)  # least recently tried
+            return True, 0.0
+
+    def reset(self, user_id: str):
+        with self._lock:
+            self._buckets.pop(user_id, None)
+
+    def refund(self, user_id: str):
+        """Give back an attempt that never reached bcrypt (e.g. pool busy)."""
+        now = time.monotonic()
+        with self._lock:
+            if user_id in self._buckets:
+                self._buckets[user_id] = (min(self.burst, self._tokens(user_id, now) + 1), now)
+
+    def stats(self):
+        with self._lock:
+            return {"tracked_users": len(self._buckets), "limited": self.limited}
+
+
+class CredentialCache:
+    def __init__(self, ttl_s=TTL_S, max_entries=MAX_CREDENTIALS):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._secret = secrets.token_bytes(32)
+        self._entries = OrderedDict()  # credential digest -> (user_id, role, expires_at)
+        self._lock = threading.Lock()
+
+        self.stored = 0
+        self.hits = 0
+
+    def _digest(self, user_id, password):
+        msg = f"{user_id}\x00{password}".encode()
+        return hmac.new(self._secret, msg, hashlib.sha256).digest()
+
+    def _expire(self, now):
+        # caller holds self._lock; entries are in expiry order
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry[2] > now and len(self._entries) <= self.max_entries:
+                return
+            self._entries.popitem(last=False)
+
+    def remember(self, user_id: str, role: str, password: str):
+        """
+        Record credentials that bcrypt has just verified.
+        """
+        digest = self._digest(user_id, password)
+        now = time.monotonic()
+        with self._lock:
+            self._entries[digest] = (user_id, role, now + self.ttl_s)
+            self._entries.move_to_end(digest)
+            self.stored += 1
+            self._expire(now)
+
+    def check(self, user_id: str, password: str):
+        """
+        Role of a recently verified login with these credentials, or None.
+        """
+        digest = self._digest(user_id, password)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def forget_user(self, user_id: str) -> int:
+        with self._lock:
+            digests = [d for d, entry in self._entries.items() if entry[0] == user_id]
+            for digest in digests:
+                del self._entries[digest]
+            return len(digests)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "stored": self.stored, "hits": self.hits}
+
+
+RATE_LIMITER = LoginRateLimiter()
+CREDENTIALS = CredentialCache()
@@ -0,0 +1,188 @@
+# backend/auth/user_registry.py
+"""
+User store behind auth_service: user_id -> (password_hash, role).
+
+Login and signup used to re-read users.csv and scan it on every call. The
+store answers get() from an index instead:
+
+    csv     data/users.csv parsed once into a dict. A stat() per lookup
+            notices edits made outside the app (mtime/size change) and
+            reloads. Signups append one row under a lock and update the
+            dict, so duplicates are checked in O(1).
+    sqlite  data/users.sqlite keyed by user_id, for user counts where
+            holding and re-parsing the whole CSV stops being cheap. On
+            first use an empty database imports users.csv.
+
+Env:
+    AUTH_USER_STORE  csv | sqlite (default csv)
+    AUTH_USER_DB     SQLite file for the sqlite store (default data/users.sqlite)
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+DEBUG = False
+
+USER_FILE = Path("data/users.csv")
+USER_STORE_KIND = os.getenv("AUTH_USER_STORE", "csv")
+USER_DB_PATH = os.getenv("AUTH_USER_DB", "data/users.sqlite")
+
+_FIELDS = ["user_id", "password_hash", "role"]
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[USER_REGISTRY] {msg}")
+
+
+def _read_csv(path: Path):
+    with open(path, newline="") as f:
+        return [row for row in csv.DictReader(f) if row.get("user_id")]
+
+
+class CsvUserStore:
+    """
+    Dict index over the CSV file; the file stays the source of truth.
+    """
+
+    def __init__(self, path=USER_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._users = {}
+        self._stamp = None  # (mtime_ns, size) the index was built from
+
+        self.reloads = 0
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        # caller holds self._lock
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        rows = _read_csv(self.path) if stamp is not None else []
+        self._users = {row["user_id"]: row for row in rows}
+        self._stamp = stamp
+        self.reloads += 1
+        _log(f"Loaded {len(self._users)} users from {self.path}")
+
+    def get(self, user_id: str):
+        """
+        {"user_id", "password_hash", "role"} or None.
+        """
+        with self._lock:
+            self._refresh()
+            return self._users.get(user_id)
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return list(self._users.values())
+
+    def add(self, user_id: str, password_hash: str, role: str) -> bool:
+        """
+        Append a user; False if user_id is already taken.
+        """
+        with self._lock:
+            self._refresh()
+            if user_id in self._users:
+                return False
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_header = self._stamp is None
+            with open(self.path, "a", newline="") as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(_FIELDS)
+                writer.writerow([user_id, password_hash, role])
+
+            self._users[user_id] = {"user_id": user_id, "password_hash": password_hash, "role": role}
+            self._stamp = self._file_stamp()  # our own write needs no reload
+            return True
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._users)
+
+
+class SqliteUserStore:
+    """
+    Users in a SQLite table (primary key lookups), one connection per thread.
+    """
+
+    def __init__(self, path=USER_DB_PATH, import_from=USER_FILE):
+        self.path = path
+        self.import_from = Path(import_from) if import_from else None
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._init_lock:
+                if not self._initialized:
+                    self._init_schema(conn)
+                    self._initialized = True
+        return conn
+
+    def _init_schema(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " user_id TEXT PRIMARY KEY, password_hash TEXT NOT NULL, role TEXT NOT NULL)"
+        )
+        empty = conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+        if empty and self.import_from is not None and self.import_from.exists():
+            rows = _read_csv(self.import_from)
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (user_id, password_hash, role) VALUES (?, ?, ?)",
+                [(r["user_id"], r["password_hash"], r["role"]) for r in rows],
+            )
+            print(f"[USER_REGISTRY] Imported {len(rows)} users from {self.import_from}")
+        conn.commit()
+
+    def get(self, user_id: str):
+        row = self._db().execute(
+            "SELECT user_id, password_hash, role FROM users WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return dict(zip(_FIELDS, row)) if row else None
+
+    def all(self):
+        rows = self._db().execute("SELECT user_id, password_hash, role FROM users").fetchall()
+        return [dict(zip(_FIELDS, row)) for row in rows]
+
+    def add(self, user_id: str, password_hash: str, role: str) -> bool:
+        conn = self._db()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO users (user_id, password_hash, role) VALUES (?, ?, ?)",
+            (user_id, password_hash, role),
+        )
+        conn.commit()
+        return cur.rowcount == 1
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def create_user_store(kind=USER_STORE_KIND):
+    if kind == "csv":
+        return CsvUserStore()
+    if kind == "sqlite":
+        return SqliteUserStore()
+    raise ValueError(f"AUTH_USER_STORE must be 'csv' or 'sqlite', got {kind!r}")
+
+
+USER_STORE = create_user_store()
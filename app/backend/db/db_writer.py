@@ -1,60 +1,350 @@
 # backend/db/db_writer.py
 """
 Fire-and-forget background DB writer.
-Inserts NEVER block the main pipeline.
-The queue accepts jobs instantly; a daemon thread handles all writes.
+Inserts don't wait for the database: the queue accepts jobs instantly and a
+daemon thread handles all writes, through the configured storage backend
+(storage.py: MySQL or embedded SQLite, see DB_BACKEND).
+
+The thread drains the queue in batches: up to BATCH_SIZE rows, or whatever
+arrived within FLUSH_INTERVAL_S of the first one. Rows for the same
+statement go out as one executemany, and each batch is one commit.
+
+The queue is bounded (QUEUE_MAX). When it is full, OVERFLOW decides:
+    block        wait up to PUT_TIMEOUT_S for room, then drop the row
+    drop_new     drop the incoming row
+    drop_oldest  drop the oldest queued row to make room
+Dropped rows are counted in stats().
+
+Whatever is still queued at interpreter exit is flushed (atexit), so short
+scripts no longer need to sleep before exiting; flush() does the same on
+demand.
+
+When the database is unreachable, batches go to the durable spool
+(spool.py) instead of being lost. While rows are spooled, new batches are
+appended behind them, and the spool is replayed oldest-first in
+REPLAY_BATCH chunks with exponential backoff (RETRY_BASE_S doubling up to
+RETRY_MAX_S) until the connection is back. Rows spooled by a previous run
+are replayed when the writer starts. If the spool file itself fails (bad
+DB_SPOOL_PATH, disk full), the spool is switched off and writes go straight
+to the database.
+
+Env:
+    DB_BATCH_SIZE (100), DB_FLUSH_INTERVAL (0.5 s), DB_QUEUE_MAX (10000),
+    DB_OVERFLOW (block), DB_PUT_TIMEOUT (0.5 s), DB_SPOOL_PATH (see spool.py)
 """
 
+import atexit
 import queue
 import threading
+import time
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+from backend.db.spool import WriteSpool, response_key
+from backend.db.storage import get_backend
+from backend.metrics import Histogram, LatencySamples
+
+DEBUG = False
+
+BATCH_SIZE = int(os.getenv("DB_BATCH_SIZE", "100"))
+FLUSH_INTERVAL_S = float(os.getenv("DB_FLUSH_INTERVAL", "0.5"))
+QUEUE_MAX = int(os.getenv("DB_QUEUE_MAX", "10000"))
+OVERFLOW = os.getenv("DB_OVERFLOW", "block")
+PUT_TIMEOUT_S = float(os.getenv("DB_PUT_TIMEOUT", "0.5"))
+EXIT_FLUSH_TIMEOUT_S = 10.0
+
+REPLAY_BATCH = 500
+RETRY_BASE_S = 1.0
+RETRY_MAX_S = 60.0
+
+_spool = WriteSpool()
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[DB_WRITER] {msg}")
 
-_DB_CONFIG = {
-    "host":     os.getenv("DB_HOST", "localhost"),
-    "port":     int(os.getenv("DB_PORT", 3306)),
-    "user":     os.getenv("DB_USER", "fleetuser"),
-    "password": os.getenv("DB_PASSWORD", ""),
-    "database": os.getenv("DB_NAME", "fleet_manager"),
-}
 
-_job_queue: queue.Queue = queue.Queue()
+_job_queue: queue.Queue = queue.Queue(maxsize=QUEUE_MAX)
 _started = False
 _lock = threading.Lock()
 
+# Control messages travel through the same queue as rows, so they are
+# handled strictly after everything queued before them.
+_SHUTDOWN = object()
 
-# ─── Internal worker ────────────────────────────────────────────────────────
 
-def _worker():
-    """Runs in a daemon thread. Pulls jobs from queue and executes them."""
-    import mysql.connector
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
 
-    conn = None
 
-    while True:
-        job = _job_queue.get()          # blocks until a job arrives
-        if job is None:                 # sentinel: shutdown signal
+_metrics = {
+    "rows_queued": 0,
+    "rows_written": 0,
+    "rows_failed": 0,
+    "rows_dropped": 0,
+    "rows_spooled": 0,
+    "rows_replayed": 0,
+    "batches": 0,
+    "max_queue_depth": 0,
+    "db_available": True,
+    "retry_in_s": 0.0,
+}
+_batch_sizes = Histogram([1, 5, 10, 25, 50, 100, 250])
+_insert_latency = LatencySamples()
+
+
+# ─── Internal worker ────────────────────────────────────────────────────────
+
+def _collect(first):
+    """
+    Gather a batch starting with first. Returns (rows, control) where
+    control is a _Flush / _SHUTDOWN that ended the batch early, or None.
+    """
+    rows = [first]
+    deadline = time.monotonic() + FLUSH_INTERVAL_S
+    while len(rows) < BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
             break
+        try:
+            job = _job_queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if job is _SHUTDOWN or isinstance(job, _Flush):
+            return rows, job
+        rows.append(job)
+    return rows, None
+
+
+def _is_connection_error(e) -> bool:
+    """Database unreachable (spool and retry) vs. a bad row (give up)."""
+    return get_backend().is_connection_error(e)
+
+
+def _write_batch(conn, rows):
+    """executemany per statement (in first-seen order), one commit."""
+    backend = get_backend()
+    by_name = {}
+    for name, params, _ in rows:
+        by_name.setdefault(name, []).append(params)
 
-        sql, params = job
+    t0 = time.perf_counter()
+    cur = conn.cursor()
+    try:
+        for name, params in by_name.items():
+            cur.executemany(backend.statement(name), params)
+        conn.commit()
+    finally:
+        cur.close()
+    _insert_latency.record(time.perf_counter() - t0)
 
+
+def _connected(conn):
+    # Reconnect if needed; the writer keeps one pooled connection borrowed
+    backend = get_backend()
+    if conn is not None and not backend.is_alive(conn):
+        backend.release(conn, broken=True)
+        conn = None
+    if conn is None:
+        conn = backend.acquire()
+    return conn
+
+
+def _rollback(conn, e):
+    """After a failed batch: keep the connection if it is still usable."""
+    if conn is None:
+        return None
+    if not _is_connection_error(e):
         try:
-            # Reconnect if needed
-            if conn is None or not conn.is_connected():
-                conn = mysql.connector.connect(**_DB_CONFIG)
+            conn.rollback()
+            return conn
+        except Exception:
+            pass
+    get_backend().release(conn, broken=True)
+    return None
+
+
+def _record_written(rows):
+    with _lock:
+        _metrics["rows_written"] += len(rows)
+        _metrics["batches"] += 1
+    _batch_sizes.record(len(rows))
 
-            cur = conn.cursor()
-            cur.execute(sql, params)
-            conn.commit()
-            cur.close()
 
+def _spool_failed(e):
+    print(f"[DB_WRITER] Spool unusable, disabling it and writing directly: {e}")
+    _spool.disable(e)
+
+
+def _spool_call(fn, *args, default=None):
+    """A spool read or update; on error the spool is disabled and default returned."""
+    try:
+        return fn(*args)
+    except Exception as e:
+        _spool_failed(e)
+        return default
+
+
+def _to_spool(rows) -> bool:
+    try:
+        _spool.append(rows)
+    except Exception as e:
+        print(f"[DB_WRITER] Spool write failed, {len(rows)} rows lost")
+        _spool_failed(e)
+        with _lock:
+            _metrics["rows_failed"] += len(rows)
+        return False
+    with _lock:
+        _metrics["rows_spooled"] += len(rows)
+    return True
+
+
+def _replay(conn):
+    """
+    Push spooled rows to the database. Returns (conn, drained).
+    Rows the database rejects individually are dropped so they can't
+    block the spool forever. A spool that fails counts as drained: it is
+    disabled and writes go direct.
+    """
+    while True:
+        pending = _spool_call(_spool.peek, REPLAY_BATCH)
+        if pending is None:
+            return conn, True
+        if not pending:
+            print("[DB_WRITER] Spool replayed, database writes are direct again")
+            return conn, True
+        ids = [i for i, _ in pending]
+        rows = [row for _, row in pending]
+        try:
+            conn = _connected(conn)
+            _write_batch(conn, rows)
         except Exception as e:
-            print(f"[DB_WRITER] Insert failed (non-fatal): {e}")
+            conn = _rollback(conn, e)
+            if _is_connection_error(e):
+                return conn, False
+            conn, ok = _replay_one_by_one(conn, pending)
+            if not ok:
+                return conn, False
+            continue
+        _spool_call(_spool.mark_replayed, ids)
+        _record_written(rows)
+        with _lock:
+            _metrics["rows_replayed"] += len(rows)
 
-        finally:
-            _job_queue.task_done()
+
+def _write_one_by_one(conn, rows, settled=None):
+    """
+    After a batch failed on a bad row: write rows singly so only the ones
+    the database rejects are dropped. settled(i, written) runs once row i
+    is written or dropped. Returns (conn, done, error): done rows were
+    settled before error, a connection error, stopped the rest (None if
+    all were).
+    """
+    for i, row in enumerate(rows):
+        try:
+            conn = _connected(conn)
+            _write_batch(conn, [row])
+        except Exception as e:
+            conn = _rollback(conn, e)
+            if _is_connection_error(e):
+                return conn, i, e
+            print(f"[DB_WRITER] Row rejected, dropping it: {e}")
+            with _lock:
+                _metrics["rows_failed"] += 1
+            written = False
+        else:
+            _record_written([row])
+            written = True
+        if settled is not None:
+            settled(i, written)
+    return conn, len(rows), None
+
+
+def _replay_one_by_one(conn, pending):
+    def settled(i, written):
+        _spool_call(_spool.mark_replayed, [pending[i][0]])
+        if written:
+            with _lock:
+                _metrics["rows_replayed"] += 1
+
+    conn, done, _ = _write_one_by_one(conn, [row for _, row in pending], settled)
+    return conn, done == len(pending)
+
+
+def _worker():
+    """Runs in a daemon thread. Pulls jobs from queue and writes them in batches."""
+    conn = None
+
+    # rows left in the spool by an earlier run are replayed right away
+    spooling = _spool.enabled and _spool_call(_spool.depth, default=0) > 0
+    backoff = 0.0
+    retry_at = 0.0
+
+    while True:
+        timeout = max(0.0, retry_at - time.monotonic()) if spooling else None
+        try:
+            job = _job_queue.get(timeout=timeout)  # blocks until a job arrives (or a retry is due)
+        except queue.Empty:
+            job = None
+
+        control = job
+        rows = []
+        if job is not None and job is not _SHUTDOWN and not isinstance(job, _Flush):
+            rows, control = _collect(job)
+
+        if spooling and time.monotonic() >= retry_at:
+            conn, drained = _replay(conn)
+            if drained:
+                spooling = False
+                backoff = 0.0
+            else:
+                backoff = min(RETRY_MAX_S, max(RETRY_BASE_S, backoff * 2))
+                retry_at = time.monotonic() + backoff
+                print(f"[DB_WRITER] Database still unavailable, retrying in {backoff:.0f}s")
+            with _lock:
+                _metrics["db_available"] = not spooling
+                _metrics["retry_in_s"] = backoff if spooling else 0.0
+
+        if rows and spooling:
+            # keep order: behind what is already spooled
+            if not _to_spool(rows):
+                spooling = False
+                with _lock:
+                    _metrics["db_available"] = True
+                    _metrics["retry_in_s"] = 0.0
+        elif rows:
+            try:
+                conn = _connected(conn)
+                _write_batch(conn, rows)
+                _record_written(rows)
+
+            except Exception as e:
+                conn = _rollback(conn, e)
+                if not _is_connection_error(e):
+                    _log(f"Batch of {len(rows)} failed, writing it row by row: {e}")
+                    conn, done, e = _write_one_by_one(conn, rows)
+                    rows = rows[done:]
+
+                # whatever is left hit a connection error
+                if rows and _spool.enabled:
+                    print(f"[DB_WRITER] Database unavailable, spooling {len(rows)} rows: {e}")
+                    if _to_spool(rows):
+                        spooling = True
+                        backoff = RETRY_BASE_S
+                        retry_at = time.monotonic() + backoff
+                        with _lock:
+                            _metrics["db_available"] = False
+                            _metrics["retry_in_s"] = backoff
+                elif rows:
+                    print(f"[DB_WRITER] Database unavailable, {len(rows)} rows lost: {e}")
+                    with _lock:
+                        _metrics["rows_failed"] += len(rows)
+
+        if isinstance(control, _Flush):
+            control.done.set()
+        elif control is _SHUTDOWN:
+            break
 
 
 def _ensure_started():
@@ -65,21 +355,85 @@ def _ensure_started():
             t = threading.Thread(target=_worker, daemon=True, name="db-writer")
             t.start()
             _started = True
+            atexit.register(_flush_at_exit)
+
+
+def _enqueue(job):
+    _ensure_started()
+    try:
+        if OVERFLOW == "block":
+            _job_queue.put(job, timeout=PUT_TIMEOUT_S)
+        elif OVERFLOW == "drop_oldest":
+            while True:
+                try:
+                    _job_queue.put_nowait(job)
+                    break
+                except queue.Full:
+                    try:
+                        dropped = _job_queue.get_nowait()
+                    except queue.Empty:
+                        continue
+                    if dropped is _SHUTDOWN or isinstance(dropped, _Flush):
+                        _job_queue.put(dropped)  # never lose a control message
+                        raise queue.Full
+                    with _lock:
+                        _metrics["rows_dropped"] += 1
+        else:
+            _job_queue.put_nowait(job)
+    except queue.Full:
+        with _lock:
+            _metrics["rows_dropped"] += 1
+        print(f"[DB_WRITER] Queue full ({QUEUE_MAX}), row dropped (policy: {OVERFLOW})")
+        return
+
+    with _lock:
+        _metrics["rows_queued"] += 1
+        _metrics["max_queue_depth"] = max(_metrics["max_queue_depth"], _job_queue.qsize())
+
+
+def _flush_at_exit():
+    if flush(timeout=EXIT_FLUSH_TIMEOUT_S):
+        _job_queue.put(_SHUTDOWN)
+    else:
+        print(f"[DB_WRITER] Exit flush timed out with {_job_queue.qsize()} rows queued")
 
 
 # ─── Public API ──────────────────────────────────────────────────────────────
 
+def flush(timeout=None) -> bool:
+    """
+    Block until every row queued so far has been written, spooled or
+    has failed. Returns False on timeout.
+    """
+    if not _started:
+        return True
+    marker = _Flush()
+    _job_queue.put(marker)  # control messages always wait for room
+    return marker.done.wait(timeout)
+
+
+def stats():
+    """
+    Queue depth, batch sizes, insert latency and row counters.
+    """
+    with _lock:
+        out = dict(_metrics)
+    out["queue_depth"] = _job_queue.qsize()
+    out["queue_max"] = QUEUE_MAX
+    out["overflow"] = OVERFLOW
+    out["spool"] = _spool_call(_spool.stats) if _spool.path else None
+    out["storage"] = get_backend().stats()
+    out["batch_size"] = _batch_sizes.stats()
+    out["insert_latency_s"] = _insert_latency.stats()
+    return out
+
+
 def log_user(user_id: str, role: str):
     """
     Insert or ignore a user record.
     Non-blocking — returns immediately.
     """
-    _ensure_started()
-    sql = """
-        INSERT IGNORE INTO users (user_id, role)
-        VALUES (%s, %s)
-    """
-    _job_queue.put((sql, (user_id, role)))
+    _enqueue(("insert_user", (user_id, role), f"user:{user_id}:{role}"))
 
 
 def log_driver_response(
@@ -92,14 +446,10 @@ def log_driver_response(
 ):
     """
     Queue a driver coaching response for DB insertion.
-    Non-blocking — returns immediately.
-    """
-    _ensure_started()
-
-    
-    sql = """
-        INSERT INTO driver_responses
-            (driver_id, trip_id, segment_index, severity, summary, coaching)
-        VALUES (%s, %s, %s, %s, %s, %s)
+    Non-blocking — returns immediately (see OVERFLOW when the queue is full).
     """
-    _job_queue.put((sql, (driver_id, trip_id, segment_index, severity, summary, coaching)))
\ No newline at end of file
+    _enqueue((
+        "insert_response",
+        (driver_id, trip_id, segment_index, severity, summary, coaching),
+        response_key(driver_id, trip_id, segment_index, summary),
+    ))
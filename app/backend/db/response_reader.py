@@ -0,0 +1,143 @@
+# backend/db/response_reader.py
+"""
+Read side of driver_responses: coaching that was already generated.
+
+The coach dashboard asks for the latest stored coaching of a
+(driver, trip, segment) before it goes to the model, and marks the
+segments of a trip that have any (stored_segments). Lookups borrow a
+connection from the storage backend's pool and run prepared statements
+(one cursor per statement per connection, prepared on first use), served
+by the (driver_id, trip_id, segment_index) index from schema migration 3.
+
+Reads are best effort: if the database is unreachable the caller just
+falls back to the model, and lookups are skipped for RETRY_S so a dead
+server doesn't add a connect timeout to every click.
+"""
+
+import threading
+import time
+
+from backend.db.storage import get_backend
+from backend.metrics import LatencySamples
+
+DEBUG = False
+
+ACQUIRE_TIMEOUT_S = 2.0
+RETRY_S = 30.0
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[RESPONSE_READER] {msg}")
+
+
+class ResponseReader:
+    """
+    Usage:
+        row = RESPONSE_READER.latest_response(driver_id, trip_id, idx)
+        if row and row["summary"] == summary:
+            ...  # row["coaching"] is the driver-side text
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._cursors = {}  # conn -> {statement: cursor}
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.skipped = 0
+        self.latency = LatencySamples()
+
+    @property
+    def backend(self):
+        return self._backend or get_backend()
+
+    def _cursor(self, backend, conn, name):
+        with self._lock:
+            if conn not in self._cursors and len(self._cursors) >= backend.pool_size:
+                # more connections than the pool holds: some were discarded
+                self._cursors.clear()
+            per_conn = self._cursors.setdefault(conn, {})
+            cur = per_conn.get(name)
+        if cur is None:
+            cur = backend.prepared_cursor(conn)
+            with self._lock:
+                per_conn[name] = cur
+        return cur
+
+    def _query(self, name, params):
+        """
+        Run a named SELECT and return all rows, or None when the
+        database is unavailable.
+        """
+        if time.monotonic() < self._down_until:
+            with self._lock:
+                self.skipped += 1
+            return None
+
+        backend = self.backend
+        t0 = time.perf_counter()
+        try:
+            with backend.session(timeout=ACQUIRE_TIMEOUT_S) as conn:
+                cur = self._cursor(backend, conn, name)
+                cur.execute(backend.statement(name), params)
+                rows = cur.fetchall()
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            if backend.is_connection_error(e):
+                self._down_until = time.monotonic() + RETRY_S
+                print(f"[RESPONSE_READER] Database unavailable, skipping lookups for {RETRY_S:.0f}s: {e}")
+            else:
+                print(f"[RESPONSE_READER] {name} failed (non-fatal): {e}")
+            return None
+        self.latency.record(time.perf_counter() - t0)
+        return rows
+
+    def latest_response(self, driver_id: str, trip_id: str, segment_index: int):
+        """
+        Most recent stored coaching for a segment:
+        {"severity", "summary", "coaching", "created_at"} or None.
+        """
+        rows = self._query("latest_response", (driver_id, trip_id, int(segment_index)))
+        if rows is None:
+            return None
+        with self._lock:
+            if rows:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not rows:
+            return None
+        severity, summary, coaching, created_at = rows[0]
+        return {
+            "severity": severity,
+            "summary": summary,
+            "coaching": coaching,
+            "created_at": created_at,
+        }
+
+    def stored_segments(self, driver_id: str, trip_id: str):
+        """
+        Segment indices of a trip that have stored coaching.
+        """
+        rows = self._query("stored_segments", (driver_id, trip_id))
+        return {int(r[0]) for r in rows} if rows else set()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "errors": self.errors,
+                "skipped": self.skipped,
+                "latency_s": self.latency.stats(),
+            }
+
+
+RESPONSE_READER = ResponseReader()
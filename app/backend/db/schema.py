@@ -0,0 +1,161 @@
+# backend/db/schema.py
+"""
+Tables, migrations and named statements shared by every storage backend.
+
+Each migration has one DDL list per dialect ("mysql", "sqlite") and is
+applied once, in version order; applied versions are recorded in
+schema_version. Tables use IF NOT EXISTS, so pointing the app at a
+database created before migrations existed is harmless.
+
+Statements are written once, MySQL-style (%s placeholders, INSERT IGNORE),
+and render() adapts them to the backend's dialect. Callers refer to them
+by name (see STATEMENTS), which is also what the write spool stores, so a
+spooled row replays on whichever backend is configured.
+"""
+
+import time
+
+MIGRATIONS = [
+    (1, "users", {
+        "mysql": [
+            "CREATE TABLE IF NOT EXISTS users ("
+            " user_id VARCHAR(64) NOT NULL PRIMARY KEY,"
+            " role VARCHAR(16) NOT NULL,"
+            " created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+        ],
+        "sqlite": [
+            "CREATE TABLE IF NOT EXISTS users ("
+            " user_id TEXT NOT NULL PRIMARY KEY,"
+            " role TEXT NOT NULL,"
+            " created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+        ],
+    }),
+    (2, "driver_responses", {
+        "mysql": [
+            "CREATE TABLE IF NOT EXISTS driver_responses ("
+            " id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,"
+            " driver_id VARCHAR(64) NOT NULL,"
+            " trip_id VARCHAR(64) NOT NULL,"
+            " segment_index INT NOT NULL,"
+            " severity VARCHAR(16) NOT NULL,"
+            " summary TEXT NOT NULL,"
+            " coaching TEXT NOT NULL,"
+            " created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+        ],
+        "sqlite": [
+            "CREATE TABLE IF NOT EXISTS driver_responses ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " driver_id TEXT NOT NULL,"
+            " trip_id TEXT NOT NULL,"
+            " segment_index INTEGER NOT NULL,"
+            " severity TEXT NOT NULL,"
+            " summary TEXT NOT NULL,"
+            " coaching TEXT NOT NULL,"
+            " created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP)",
+        ],
+    }),
+    # Serves the coach-side lookups: secondary indexes carry the primary
+    # key in both engines, so "latest row for a segment" is an index seek
+    # ordered by id, and "which segments are stored" never touches the table.
+    (3, "driver_responses_segment_index", {
+        "mysql": [
+            "CREATE INDEX idx_responses_segment"
+            " ON driver_responses (driver_id, trip_id, segment_index)",
+        ],
+        "sqlite": [
+            "CREATE INDEX IF NOT EXISTS idx_responses_segment"
+            " ON driver_responses (driver_id, trip_id, segment_index)",
+        ],
+    }),
+]
+
+STATEMENTS = {
+    "insert_user": (
+        "INSERT IGNORE INTO users (user_id, role) VALUES (%s, %s)"
+    ),
+    "insert_response": (
+        "INSERT INTO driver_responses"
+        " (driver_id, trip_id, segment_index, severity, summary, coaching)"
+        " VALUES (%s, %s, %s, %s, %s, %s)"
+    ),
+    "latest_response": (
+        "SELECT severity, summary, coaching, created_at FROM driver_responses"
+        " WHERE driver_id = %s AND trip_id = %s AND segment_index = %s"
+        " ORDER BY id DESC LIMIT 1"
+    ),
+    "stored_segments": (
+        "SELECT DISTINCT segment_index FROM driver_responses"
+        " WHERE driver_id = %s AND trip_id = %s"
+    ),
+}
+
+_VERSION_TABLE = {
+    "mysql": (
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version INT NOT NULL PRIMARY KEY,"
+        " name VARCHAR(64) NOT NULL,"
+        " applied_at DOUBLE NOT NULL)"
+    ),
+    "sqlite": (
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        " version INTEGER NOT NULL PRIMARY KEY,"
+        " name TEXT NOT NULL,"
+        " applied_at REAL NOT NULL)"
+    ),
+}
+
+
+# MySQL has no CREATE INDEX IF NOT EXISTS: "duplicate key name" means the
+# index is already there (created by hand, or by a run that died before it
+# recorded the version), so that statement counts as applied.
+_MYSQL_DUP_KEYNAME = 1061
+
+
+def _already_applied(e, dialect) -> bool:
+    return dialect == "mysql" and getattr(e, "errno", None) == _MYSQL_DUP_KEYNAME
+
+
+def render(sql: str, dialect: str) -> str:
+    if dialect == "sqlite":
+        return sql.replace("INSERT IGNORE", "INSERT OR IGNORE").replace("%s", "?")
+    return sql
+
+
+def statement(name: str, dialect: str) -> str:
+    return render(STATEMENTS[name], dialect)
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0]
+
+
+def migrate(conn, dialect: str):
+    """
+    Apply pending migrations on a DB-API connection. Returns the versions
+    applied (empty when the schema is current).
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(_VERSION_TABLE[dialect])
+        cur.execute("SELECT version FROM schema_version")
+        done = {row[0] for row in cur.fetchall()}
+
+        applied = []
+        for version, name, ddl in MIGRATIONS:
+            if version in done:
+                continue
+            for sql in ddl[dialect]:
+                try:
+                    cur.execute(sql)
+                except Exception as e:
+                    if not _already_applied(e, dialect):
+                        raise
+            cur.execute(
+                render("INSERT IGNORE INTO schema_version (version, name, applied_at) VALUES (%s, %s, %s)", dialect),
+                (version, name, time.time()),
+            )
+            applied.append(version)
+        conn.commit()
+        return applied
+    finally:
+        cur.close()
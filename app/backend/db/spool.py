@@ -0,0 +1,156 @@
+# backend/db/spool.py
+"""
+Durable write-ahead spool for rows the database could not take.
+
+When the database is unreachable, db_writer appends its batch here instead of
+dropping it. The spool is a local SQLite file (append-only table, WAL
+mode), so coaching rows survive both the outage and an app restart. Once
+the connection is back, db_writer replays it oldest-first in batches.
+
+Every row carries a dedupe key — for driver_responses
+(driver_id, trip_id, segment_index, sha1(summary)) — and the table keeps
+it UNIQUE, so the same coaching spooled twice (retries, re-analysis) is
+replayed once. Replayed rows are kept as tombstones for KEEP_REPLAYED_S
+so a late duplicate is still recognised.
+
+Env:
+    DB_SPOOL_PATH   SQLite file (default data/db_spool.sqlite, "" disables)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEBUG = False
+
+SPOOL_PATH = os.getenv("DB_SPOOL_PATH", "data/db_spool.sqlite")
+KEEP_REPLAYED_S = 24 * 3600
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[DB_SPOOL] {msg}")
+
+
+def response_key(driver_id, trip_id, segment_index, summary) -> str:
+    digest = hashlib.sha1(summary.encode("utf-8")).hexdigest()[:16]
+    return f"resp:{driver_id}:{trip_id}:{int(segment_index)}:{digest}"
+
+
+class WriteSpool:
+    """
+    rows are (statement, params, dedupe_key) — the db_writer job format,
+    where statement names an entry of schema.STATEMENTS.
+    """
+
+    def __init__(self, path=SPOOL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self.error = None  # set by disable(): the spool is off for this run
+
+        self.spooled = 0
+        self.duplicates = 0
+        self.replayed = 0
+
+    def _db(self):
+        # caller holds self._lock
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS spool ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " dedupe_key TEXT UNIQUE,"
+                " statement TEXT NOT NULL,"
+                " params TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " replayed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS spool_pending ON spool (replayed_at, id)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and self.error is None
+
+    def disable(self, error):
+        """
+        The spool file can't be used (bad path, disk full, corrupt file):
+        stop using it for the rest of this run.
+        """
+        with self._lock:
+            self.error = str(error)
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except Exception:
+                    pass
+                self._conn = None
+
+    def append(self, rows) -> int:
+        """
+        Durably store rows (one transaction). Returns how many were new.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO spool (dedupe_key, statement, params, created_at) VALUES (?, ?, ?, ?)",
+                [(key, name, json.dumps(list(params)), now) for name, params, key in rows],
+            )
+            conn.commit()
+            added = conn.total_changes - before
+            self.spooled += added
+            self.duplicates += len(rows) - added
+        _log(f"Spooled {added}/{len(rows)} rows")
+        return added
+
+    def peek(self, limit):
+        """
+        Oldest pending rows as [(id, (statement, params, dedupe_key))].
+        """
+        with self._lock:
+            cur = self._db().execute(
+                "SELECT id, statement, params, dedupe_key FROM spool"
+                " WHERE replayed_at IS NULL ORDER BY id LIMIT ?", (limit,)
+            )
+            return [(row[0], (row[1], tuple(json.loads(row[2])), row[3])) for row in cur]
+
+    def mark_replayed(self, ids):
+        now = time.time()
+        with self._lock:
+            conn = self._db()
+            conn.executemany("UPDATE spool SET replayed_at = ? WHERE id = ?", [(now, i) for i in ids])
+            conn.execute(
+                "DELETE FROM spool WHERE replayed_at IS NOT NULL AND replayed_at < ?",
+                (now - KEEP_REPLAYED_S,),
+            )
+            conn.commit()
+            self.replayed += len(ids)
+
+    def depth(self) -> int:
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return self._db().execute(
+                "SELECT COUNT(*) FROM spool WHERE replayed_at IS NULL"
+            ).fetchone()[0]
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "error": self.error,
+            "depth": self.depth(),
+            "spooled": self.spooled,
+            "duplicates": self.duplicates,
+            "replayed": self.replayed,
+        }
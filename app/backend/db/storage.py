@@ -0,0 +1,333 @@
+# backend/db/storage.py
+"""
+Storage backends for coaching and user records.
+
+db_writer (and anything else that talks to the database) goes through a
+StorageBackend instead of a driver module, so the same code runs on:
+
+    mysql   MySQL server, pooled connections (mysql.connector.pooling)
+    sqlite  embedded SQLite file in WAL mode, for dev boxes and
+            single-node deployments — no server needed
+
+Both create their tables through schema.migrate() on first use and render
+the shared named statements for their dialect.
+
+Connections are borrowed with acquire() / release(), or session():
+
+    with get_backend().session() as conn:
+        ...
+        conn.commit()
+
+Env:
+    DB_BACKEND      mysql | sqlite (default mysql)
+    DB_POOL_SIZE    pooled connections per process (default 5)
+    DB_SQLITE_PATH  database file for the sqlite backend (default data/fleet.sqlite)
+    DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME   mysql settings
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from backend.db import schema
+
+load_dotenv()
+
+DEBUG = False
+
+BACKEND = os.getenv("DB_BACKEND", "mysql")
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "data/fleet.sqlite")
+ACQUIRE_TIMEOUT_S = 30.0
+
+_DB_CONFIG = {
+    "host":     os.getenv("DB_HOST", "localhost"),
+    "port":     int(os.getenv("DB_PORT", 3306)),
+    "user":     os.getenv("DB_USER", "fleetuser"),
+    "password": os.getenv("DB_PASSWORD", ""),
+    "database": os.getenv("DB_NAME", "fleet_manager"),
+}
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[STORAGE] {msg}")
+
+
+class StorageBackend:
+    """
+    Base class: a bounded pool of DB-API connections plus the dialect.
+    Subclasses implement _connect() and is_connection_error().
+    """
+
+    dialect = None
+
+    def __init__(self, pool_size=POOL_SIZE):
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()  # most recently used first: warm connections
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._migrated = False
+
+        self.opened = 0
+        self.acquired = 0
+        self.discarded = 0
+
+    # --------------------------------------------------
+    # Dialect
+    # --------------------------------------------------
+
+    def statement(self, name: str) -> str:
+        return schema.statement(name, self.dialect)
+
+    def render(self, sql: str) -> str:
+        return schema.render(sql, self.dialect)
+
+    def is_connection_error(self, e) -> bool:
+        """Database unreachable (retry later) vs. a bad statement."""
+        return isinstance(e, (ConnectionError, OSError, TimeoutError))
+
+    # --------------------------------------------------
+    # Connections
+    # --------------------------------------------------
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def is_alive(self, conn) -> bool:
+        return True
+
+    def prepared_cursor(self, conn):
+        """
+        Cursor that prepares its statement once and re-executes it.
+        Reuse it for one statement; repeated execute() skips parsing.
+        """
+        return conn.cursor()
+
+    def _ensure_schema(self, conn):
+        with self._lock:
+            if self._migrated:
+                return
+            applied = schema.migrate(conn, self.dialect)
+            if applied:
+                print(f"[STORAGE] Applied {self.dialect} migrations {applied}")
+            self._migrated = True
+
+    def acquire(self, timeout=ACQUIRE_TIMEOUT_S):
+        """
+        Borrow a connection; blocks while all pool_size are in use.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"no free {self.dialect} connection after {timeout}s")
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    with self._lock:
+                        self.opened += 1
+                    break
+                if not self.is_alive(conn):
+                    self._close(conn)
+                    conn = None
+            if not self._migrated:
+                self._ensure_schema(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.acquired += 1
+        return conn
+
+    def release(self, conn, broken=False):
+        """
+        Return a borrowed connection. broken=True closes it instead of
+        pooling it (after a connection error).
+        """
+        try:
+            if broken:
+                self._close(conn)
+                with self._lock:
+                    self.discarded += 1
+            else:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self, timeout=ACQUIRE_TIMEOUT_S):
+        """
+        Borrowed connection, rolled back if the block raises. The caller commits.
+        """
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except BaseException as e:
+            broken = self.is_connection_error(e)
+            if not broken:
+                try:
+                    conn.rollback()
+                except Exception:
+                    broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.dialect,
+                "pool_size": self.pool_size,
+                "idle": self._idle.qsize(),
+                "opened": self.opened,
+                "acquired": self.acquired,
+                "discarded": self.discarded,
+            }
+
+
+class MySQLBackend(StorageBackend):
+    dialect = "mysql"
+
+    def __init__(self, config=None, pool_size=POOL_SIZE):
+        super().__init__(pool_size)
+        self.config = dict(config or _DB_CONFIG)
+        self._pool = None
+
+    def _connect(self):
+        # Pooled connections keep their socket open between borrows;
+        # close() on them hands the connection back to the driver's pool.
+        from mysql.connector import pooling
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = pooling.MySQLConnectionPool(
+                    pool_name="fleet_storage",
+                    pool_size=self.pool_size,
+                    pool_reset_session=True,
+                    **self.config,
+                )
+                _log(f"MySQL pool of {self.pool_size} to {self.config['host']}:{self.config['port']}")
+        return self._pool.get_connection()
+
+    def is_alive(self, conn) -> bool:
+        try:
+            return conn.is_connected()
+        except Exception:
+            return False
+
+    def prepared_cursor(self, conn):
+        # server-side prepared statement (binary protocol); connections stay
+        # checked out of the driver pool, so no session reset drops it
+        return conn.cursor(prepared=True)
+
+    def is_connection_error(self, e) -> bool:
+        if super().is_connection_error(e):
+            return True
+        try:
+            from mysql.connector import errors
+        except ImportError:
+            return False
+        return isinstance(e, (errors.InterfaceError, errors.OperationalError, errors.PoolError))
+
+
+# SQLITE_BUSY, SQLITE_LOCKED, SQLITE_CANTOPEN (primary codes)
+_SQLITE_TRANSIENT_CODES = {5, 6, 14}
+_SQLITE_TRANSIENT_MESSAGES = (
+    "database is locked",
+    "database table is locked",
+    "database is busy",
+    "unable to open database file",
+)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    One file, WAL journal: readers never block the writer and vice versa,
+    and commits only fsync at checkpoints (synchronous=NORMAL).
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH, pool_size=POOL_SIZE):
+        super().__init__(pool_size)
+        self.path = path
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        _log(f"SQLite connection to {self.path}")
+        return conn
+
+    def is_connection_error(self, e) -> bool:
+        if super().is_connection_error(e):
+            return True
+        if not isinstance(e, sqlite3.OperationalError):
+            return False
+        # only busy / locked / can't open are outages; "no such table" or
+        # "no such column" (an older schema) are permanent: bad-row path
+        code = getattr(e, "sqlite_errorcode", None)  # Python 3.11+
+        if code is not None:
+            return code & 0xFF in _SQLITE_TRANSIENT_CODES
+        message = str(e).lower()
+        return any(m in message for m in _SQLITE_TRANSIENT_MESSAGES)
+
+    # prepared_cursor: the default is enough, sqlite3 keeps compiled
+    # statements per connection (cached_statements) keyed by SQL text
+
+
+_BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: str) -> StorageBackend:
+    if name not in _BACKENDS:
+        raise ValueError(f"DB_BACKEND must be one of {sorted(_BACKENDS)}, got {name!r}")
+    return _BACKENDS[name]()
+
+
+def get_backend() -> StorageBackend:
+    """
+    Process-wide backend selected by DB_BACKEND, created on first use.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_backend(BACKEND)
+        return _backend
+
+
+def set_backend(backend: StorageBackend):
+    """
+    Replace the process-wide backend (e.g. a SQLite file in benchmarks).
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,263 @@
+# backend/llm/batch_decode.py
+"""
+Multi-sequence batched generation on one llama.cpp context.
+
+BatchedGenerator opens a second context over the already-loaded model
+(weights are shared, only the KV cache is new) with n_seq_max slots.
+Each prompt gets its own sequence id / KV slot and its own sampler; every
+decode step advances all live sequences with a single llama_decode call.
+
+Sampling mirrors Llama.create_completion (same sampler chain, same seed
+progression, EOG + stop-string handling), so under fixed seeds a batch
+produces the same text as running the prompts one by one — up to
+llama.cpp's batch-shape-dependent float rounding.
+
+With prefix_text, the shared system-prompt prefix is decoded once into
+sequence 0 and copied to every other slot (unified KV cache, so the cells
+are shared rather than duplicated); it stays resident across generate()
+calls and only the per-summary suffix is prefilled.
+"""
+
+import random
+
+import llama_cpp
+from llama_cpp import _internals as internals
+
+from backend.llm.budget import is_sentence_boundary
+from backend.llm.prefix_cache import prefix_tokens
+
+DEBUG = False
+
+# Defaults Llama.create_completion uses for arguments we don't override
+_TOP_K = 40
+_MIN_P = 0.05
+_TYPICAL_P = 1.0
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[BATCH_DECODE] {msg}")
+
+
+class _Sequence:
+    def __init__(self, seq_id, prompt_tokens, params, seed, sampler):
+        self.seq_id = seq_id
+        self.prompt_tokens = prompt_tokens
+        self.pending = list(prompt_tokens)  # prompt tokens not yet decoded
+        self.n_past = 0
+        self.params = params
+        self.seed = seed
+        self.sampler = sampler
+        self.completion = []
+        self.text = b""
+        self.done = False
+        self.early_stop = False
+        self.logit_idx = None  # batch row holding this sequence's next logits
+
+
+class BatchedGenerator:
+    """
+    Usage:
+        gen = BatchedGenerator(llm, n_seq=4)
+        gen.generate([(prompt, params), ...], stop=[...])
+    params are create_completion kwargs: max_tokens, temperature, top_p,
+    repeat_penalty, optional seed, plus an optional token budget after
+    which the next sentence boundary ends the sequence (see budget.py).
+    """
+
+    def __init__(self, llm, n_seq=4, n_ctx_per_seq=1024, prefix_text=None):
+        self.llm = llm
+        self.n_seq = n_seq
+        self.prefix = prefix_tokens(llm, prefix_text) if prefix_text else []
+        self._prefix_loaded = False
+
+        params = type(llm.context_params).from_buffer_copy(llm.context_params)
+        params.n_seq_max = n_seq
+        params.n_ctx = n_seq * n_ctx_per_seq
+        if self.prefix:
+            params.kv_unified = True
+        self.n_batch = params.n_batch
+
+        self._ctx = internals.LlamaContext(model=llm._model, params=params, verbose=False)
+        self._batch = internals.LlamaBatch(n_tokens=self.n_batch, embd=0, n_seq_max=n_seq, verbose=False)
+
+    def close(self):
+        self._batch.close()
+        self._ctx.close()
+
+    # --------------------------------------------------
+    # Sampling
+    # --------------------------------------------------
+
+    def _next_seed(self):
+        # same progression as Llama._create_completion(seed=None)
+        self.llm.set_seed(random.Random(self.llm._seed).randint(0, 2 ** 32))
+        return self.llm._seed
+
+    def _sampler(self, params, seed):
+        """Same chain as Llama._init_sampler for create_completion defaults."""
+        temp = params.get("temperature", 0.8)
+        sampler = internals.LlamaSampler()
+        sampler.add_penalties(
+            penalty_last_n=self.llm.last_n_tokens_size,
+            penalty_repeat=params.get("repeat_penalty", 1.0),
+            penalty_freq=0.0,
+            penalty_present=0.0,
+        )
+        if temp < 0.0:
+            sampler.add_softmax()
+            sampler.add_dist(seed)
+        elif temp == 0.0:
+            sampler.add_greedy()
+        else:
+            sampler.add_top_k(_TOP_K)
+            sampler.add_typical(_TYPICAL_P, 1)
+            sampler.add_top_p(params.get("top_p", 0.95), 1)
+            sampler.add_min_p(_MIN_P, 1)
+            sampler.add_temp(temp)
+            sampler.add_dist(seed)
+        return sampler
+
+    # --------------------------------------------------
+    # Decoding
+    # --------------------------------------------------
+
+    def _load_prefix(self):
+        """Decode the shared prefix into seq 0 and copy it to all slots."""
+        self._ctx.kv_cache_clear()
+        b = self._batch.batch
+        for start in range(0, len(self.prefix), self.n_batch):
+            chunk = self.prefix[start:start + self.n_batch]
+            for i, tok in enumerate(chunk):
+                b.token[i] = tok
+                b.pos[i] = start + i
+                b.seq_id[i][0] = 0
+                b.n_seq_id[i] = 1
+                b.logits[i] = False
+            b.n_tokens = len(chunk)
+            self._ctx.decode(self._batch)
+
+        for seq_id in range(1, self.n_seq):
+            self._ctx.kv_cache_seq_cp(0, seq_id, -1, -1)
+        self._prefix_loaded = True
+        _log(f"Shared {len(self.prefix)} prefix tokens across {self.n_seq} sequences")
+
+    def _reset_kv(self):
+        """Drop everything but the shared prefix (or everything, without one)."""
+        if not self.prefix:
+            self._ctx.kv_cache_clear()
+            return
+        if not self._prefix_loaded:
+            self._load_prefix()
+            return
+        for seq_id in range(self.n_seq):
+            self._ctx.kv_cache_seq_rm(seq_id, len(self.prefix), -1)
+
+    def _start(self, seq, prompt_tokens):
+        """Skip the resident prefix if this prompt really starts with it."""
+        p = len(self.prefix)
+        if p and prompt_tokens[:p] == self.prefix:
+            seq.pending = list(prompt_tokens[p:])
+            seq.n_past = p
+        elif p:
+            self._ctx.kv_cache_seq_rm(seq.seq_id, 0, -1)
+            self._prefix_loaded = False  # slot no longer holds the prefix
+
+    def _fill_batch(self, seqs):
+        """
+        Pack one decode step: every live sequence contributes either its
+        next sampled token or as many prompt tokens as still fit.
+        """
+        b = self._batch.batch
+        n = 0
+        for s in seqs:
+            s.logit_idx = None
+            if s.done:
+                continue
+            while s.pending and n < self.n_batch:
+                tok = s.pending.pop(0)
+                b.token[n] = tok
+                b.pos[n] = s.n_past
+                b.seq_id[n][0] = s.seq_id
+                b.n_seq_id[n] = 1
+                b.logits[n] = not s.pending
+                if not s.pending:
+                    s.logit_idx = n
+                s.n_past += 1
+                n += 1
+        b.n_tokens = n
+        return n
+
+    def _accept(self, s, token, stop, max_tokens):
+        if llama_cpp.llama_token_is_eog(self.llm._model.vocab, token):
+            s.done = True
+            return
+
+        s.completion.append(token)
+        text = self.llm.detokenize(s.completion, prev_tokens=s.prompt_tokens)
+
+        budget = s.params.get("budget")
+        if budget is not None and len(s.completion) > budget:
+            piece = text[len(s.text):].decode("utf-8", errors="ignore")
+            if is_sentence_boundary(s.text.decode("utf-8", errors="ignore"), piece):
+                s.completion.pop()
+                s.done = True
+                s.early_stop = True
+                return
+        hits = [text.index(x) for x in stop if x in text]
+        if hits:
+            s.text = text[: min(hits)]
+            s.done = True
+            return
+
+        s.text = text
+        if len(s.completion) >= max_tokens:
+            s.done = True
+        else:
+            s.pending.append(token)
+
+    def generate(self, requests, stop=()):
+        """
+        requests: [(prompt, params)] with at most n_seq entries.
+        Returns [{"text": str, "completion_tokens": int, "early_stop": bool}]
+        in request order.
+        """
+        if len(requests) > self.n_seq:
+            raise ValueError(f"batch of {len(requests)} exceeds n_seq={self.n_seq}")
+
+        stop = [x.encode("utf-8") for x in stop]
+        self._reset_kv()
+
+        seqs = []
+        for seq_id, (prompt, params) in enumerate(requests):
+            seed = params.get("seed")
+            if seed is None:
+                seed = self._next_seed()
+            tokens = self.llm.tokenize(prompt.encode("utf-8"), add_bos=True, special=True)
+            seq = _Sequence(seq_id, tokens, params, seed, self._sampler(params, seed))
+            self._start(seq, tokens)
+            seqs.append(seq)
+
+        while any(not s.done for s in seqs):
+            if self._fill_batch(seqs) == 0:
+                break
+            self._ctx.decode(self._batch)
+
+            for s in seqs:
+                if s.logit_idx is None:
+                    continue
+                token = s.sampler.sample(self._ctx, s.logit_idx)
+                self._accept(s, token, stop, s.params.get("max_tokens", 16))
+
+        for s in seqs:
+            s.sampler.close()
+
+        _log(f"Generated {sum(len(s.completion) for s in seqs)} tokens over {len(seqs)} sequences")
+        return [
+            {
+                "text": s.text.decode("utf-8", errors="ignore"),
+                "completion_tokens": len(s.completion),
+                "early_stop": s.early_stop,
+            }
+            for s in seqs
+        ]
@@ -0,0 +1,142 @@
+# backend/llm/budget.py
+"""
+Severity-aware token budgets with sentence-boundary early stop.
+
+SAMPLING_PROFILES caps completions at 200/200/300 tokens, but most
+coaching (LOW in particular) is far shorter or trails off into filler.
+BudgetController learns, per severity, the distribution of completion
+lengths and sets the budget to its PERCENTILE. Once a generation has used
+its budget it stops at the next sentence boundary; max_tokens stays the
+hard cap.
+
+Budget-stopped completions are recorded at their stop length, so the
+budget only shrinks when more than (1 - PERCENTILE) of completions end
+on their own before it — it does not ratchet down on its own output.
+
+Until MIN_SAMPLES completions of a severity have been seen, its budget
+is max_tokens (no early stop).
+
+Env:
+    LLM_BUDGET             0 disables early stop (lengths are still recorded)
+    LLM_BUDGET_PERCENTILE  default 0.8
+"""
+
+import os
+import threading
+from collections import deque
+
+from backend.metrics import Histogram
+
+DEBUG = False
+
+ENABLED = os.getenv("LLM_BUDGET", "1") != "0"
+PERCENTILE = float(os.getenv("LLM_BUDGET_PERCENTILE", "0.8"))
+MIN_SAMPLES = 20
+MIN_BUDGET = 32
+WINDOW = 500  # recent completions per severity
+
+LATENCY_BOUNDS_S = [0.5, 1, 2, 4, 8, 16, 32]
+TOKEN_BOUNDS = [16, 32, 64, 96, 128, 200, 300]
+
+_SENTENCE_END = (".", "!", "?")
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[LLM_BUDGET] {msg}")
+
+
+def is_sentence_boundary(text: str, piece: str) -> bool:
+    """
+    True when text ends a sentence and piece starts the next one, so
+    "3.5" or "e.g." mid-token never counts.
+    """
+    return bool(piece) and piece[0].isspace() and text.rstrip(" ").endswith(_SENTENCE_END)
+
+
+class _SeverityStats:
+    def __init__(self):
+        self.lengths = deque(maxlen=WINDOW)
+        self.latency = Histogram(LATENCY_BOUNDS_S)
+        self.tokens = Histogram(TOKEN_BOUNDS)
+        self.early_stops = 0
+
+
+class BudgetController:
+    def __init__(self, enabled=ENABLED, percentile=PERCENTILE, min_samples=MIN_SAMPLES):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _for(self, severity):
+        # caller holds self._lock
+        if severity not in self._stats:
+            self._stats[severity] = _SeverityStats()
+        return self._stats[severity]
+
+    def budget(self, severity: str, max_tokens: int) -> int:
+        """
+        Tokens after which the next sentence boundary ends the completion.
+        """
+        if not self.enabled:
+            return max_tokens
+        with self._lock:
+            lengths = sorted(self._for(severity).lengths)
+        if len(lengths) < self.min_samples:
+            return max_tokens
+        target = lengths[min(len(lengths) - 1, int(self.percentile * len(lengths)))]
+        return max(MIN_BUDGET, min(max_tokens, target))
+
+    def record(self, severity: str, tokens: int, seconds: float, early_stop: bool = False):
+        with self._lock:
+            s = self._for(severity)
+            s.lengths.append(tokens)
+            s.early_stops += early_stop
+        s.latency.record(seconds)
+        s.tokens.record(tokens)
+        _log(f"{severity}: {tokens} tokens in {seconds:.2f}s (early stop: {early_stop})")
+
+    def stats(self, max_tokens_by_severity=None):
+        max_tokens_by_severity = max_tokens_by_severity or {}
+        with self._lock:
+            items = list(self._stats.items())
+        out = {}
+        for severity, s in items:
+            out[severity] = {
+                "budget": self.budget(severity, max_tokens_by_severity.get(severity, TOKEN_BOUNDS[-1])),
+                "samples": len(s.lengths),
+                "early_stops": s.early_stops,
+                "latency_s": s.latency.stats(),
+                "tokens": s.tokens.stats(),
+            }
+        return out
+
+
+def complete_with_budget(llm, prompt, stop, params, budget, on_piece=None):
+    """
+    Streamed llama.cpp completion that ends at the first sentence boundary
+    after budget tokens. on_piece(text) is called for every kept chunk.
+    Returns (text, completion_tokens, early_stop).
+    """
+    output = llm(prompt, stop=stop, stream=True, **params)
+    text = ""
+    tokens = 0
+    early_stop = False
+    for chunk in output:
+        piece = chunk["choices"][0]["text"]
+        if tokens >= budget and is_sentence_boundary(text, piece):
+            early_stop = True
+            output.close()
+            break
+        tokens += 1  # llama.cpp streams one chunk per sampled token
+        if not piece:
+            continue
+        text += piece
+        if on_piece is not None:
+            on_piece(piece)
+    return text, tokens, early_stop
+
+
+BUDGET = BudgetController()
@@ -0,0 +1,183 @@
+# backend/llm/inference_client.py
+"""
+Client backend for inference_server.py.
+
+With LLM_SERVER_URL set, llm_engine hands every coaching request to an
+InferenceClient instead of a local model; callers keep using
+get_coaching_feedback / submit_coaching_feedback / stream_coaching_feedback
+/ cancel_coaching unchanged.
+
+    LLM_SERVER_URL=http://127.0.0.1:8765
+    LLM_SERVER_URL=unix:///tmp/coach.sock
+
+Env:
+    LLM_SERVER_READY_TIMEOUT   seconds to wait for the server at startup (default 300)
+"""
+
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+DEBUG = False
+
+TIMEOUT_S = 600  # a queued request may wait behind a full scheduler
+READY_TIMEOUT_S = float(os.getenv("LLM_SERVER_READY_TIMEOUT", "300"))
+CANCEL_TIMEOUT_S = 5
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[INFERENCE_CLIENT] {msg}")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class InferenceClient:
+    def __init__(self, url, max_inflight=16, timeout=TIMEOUT_S):
+        self.url = url
+        parsed = urlparse(url)
+        self._unix_path = parsed.path if parsed.scheme == "unix" else None
+        self._host = parsed.hostname
+        self._port = parsed.port or 80
+        self.timeout = timeout
+
+        # blocking HTTP calls behind submit(); the server does the queueing
+        self._pool = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="llm-client")
+        self._tagged = {}  # tag -> [Future]
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    # HTTP
+    # --------------------------------------------------
+
+    def _conn(self, timeout=None):
+        timeout = timeout or self.timeout
+        if self._unix_path:
+            return _UnixHTTPConnection(self._unix_path, timeout)
+        return http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+
+    def _request(self, method, path, payload=None, timeout=None):
+        conn = self._conn(timeout)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body else {}
+        conn.request(method, path, body=body, headers=headers)
+        return conn, conn.getresponse()
+
+    def _json(self, method, path, payload=None, timeout=None):
+        conn, resp = self._request(method, path, payload, timeout)
+        try:
+            data = json.loads(resp.read() or b"{}")
+        finally:
+            conn.close()
+        if resp.status == 409:
+            raise CancelledError()
+        if resp.status != 200:
+            raise RuntimeError(f"inference server {resp.status}: {data.get('error')}")
+        return data
+
+    @staticmethod
+    def _body(summary, severity, is_coach, priority, tag):
+        return {
+            "summary": summary,
+            "severity": severity,
+            "is_coach": is_coach,
+            "priority": priority,
+            "tag": list(tag) if isinstance(tag, tuple) else tag,
+        }
+
+    # --------------------------------------------------
+    # Public API (mirrors llm_engine)
+    # --------------------------------------------------
+
+    def health(self, timeout=5):
+        return self._json("GET", "/health", timeout=timeout)
+
+    def wait_ready(self, poll_s=1.0, timeout=READY_TIMEOUT_S):
+        """
+        Block until the server answers and its model is loaded.
+        Raises TimeoutError after timeout seconds (None waits forever).
+        """
+        t0 = time.monotonic()
+        while True:
+            try:
+                state = self.health()["status"]["state"]
+                if state == "ready":
+                    return
+                if state == "failed":
+                    raise RuntimeError("inference server failed to load its model")
+            except (OSError, http.client.HTTPException) as e:
+                _log(f"Server not reachable yet: {e}")
+            if timeout is not None and time.monotonic() - t0 > timeout:
+                raise TimeoutError(f"inference server at {self.url} not ready")
+            time.sleep(poll_s)
+
+    def submit(self, summary, severity, is_coach, priority, tag=None) -> Future:
+        body = self._body(summary, severity, is_coach, priority, tag)
+        future = self._pool.submit(lambda: self._json("POST", "/v1/coaching", body)["text"])
+        if tag is not None:
+            with self._lock:
+                self._tagged.setdefault(tag, []).append(future)
+            future.add_done_callback(lambda f: self._forget(tag, f))
+        return future
+
+    def _forget(self, tag, future):
+        with self._lock:
+            futures = self._tagged.get(tag, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._tagged.pop(tag, None)
+
+    def stream(self, summary, severity, is_coach, priority, tag=None):
+        """
+        Generator of text deltas; raises CancelledError if cancelled.
+        """
+        body = self._body(summary, severity, is_coach, priority, tag)
+        conn, resp = self._request("POST", "/v1/coaching/stream", body)
+        try:
+            if resp.status != 200:
+                raise RuntimeError(f"inference server {resp.status}")
+            for raw in resp:
+                msg = json.loads(raw)
+                if "delta" in msg:
+                    yield msg["delta"]
+                elif msg.get("cancelled"):
+                    raise CancelledError()
+                elif "error" in msg:
+                    raise RuntimeError(f"inference server: {msg['error']}")
+                elif msg.get("done"):
+                    return
+        finally:
+            conn.close()
+
+    def cancel(self, tag) -> int:
+        """
+        Cancel tag's requests here and on the server. Never raises: with the
+        server unreachable only the local ones are cancelled (0 / False if none).
+        """
+        with self._lock:
+            local = [f for f in self._tagged.pop(tag, []) if f.cancel()]
+        try:
+            remote = self._json(
+                "POST", "/v1/cancel",
+                {"tag": list(tag) if isinstance(tag, tuple) else tag},
+                timeout=CANCEL_TIMEOUT_S,
+            )
+        except (OSError, http.client.HTTPException, RuntimeError) as e:
+            print(f"[INFERENCE_CLIENT] Cancel of {tag} not sent (non-fatal): {e}")
+            return len(local)
+        return len(local) + remote.get("cancelled", 0)
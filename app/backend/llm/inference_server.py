@@ -0,0 +1,169 @@
+# backend/llm/inference_server.py
+"""
+Standalone coaching inference service.
+
+One process loads the model and serves get_coaching_feedback semantics
+over HTTP (TCP or a Unix socket), so several Gradio front ends share one
+warm model and scale independently. Requests from every client go through
+this process's scheduler, so they are deduplicated, prioritised and — with
+LLM_BATCH_SIZE > 1 — decoded together in batches; the response cache and
+near-duplicate index are shared by all clients as well.
+
+Usage (from app/):
+    python -m backend.llm.inference_server --port 8765
+    python -m backend.llm.inference_server --socket /tmp/coach.sock
+
+Front ends point at it with LLM_SERVER_URL=http://127.0.0.1:8765 or
+LLM_SERVER_URL=unix:///tmp/coach.sock (see inference_client.py).
+
+API (JSON):
+    GET  /health               {"status": llm_status(), "scheduler": ..., "cache": ...}
+    POST /v1/coaching          {summary, severity, is_coach, priority?, tag?} -> {"text"}
+    POST /v1/coaching/stream   same body -> NDJSON lines {"delta"} ... {"done": true}
+    POST /v1/cancel            {"tag"} -> {"cancelled": n}
+"""
+
+import argparse
+import json
+import os
+import socketserver
+from concurrent.futures import CancelledError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.llm import llm_engine
+from backend.llm.load_llm import llm_status, start_llm_warmup
+from backend.llm.scheduler import PRIORITY_COACH
+
+DEBUG = False
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[INFERENCE_SERVER] {msg}")
+
+
+def _tag(value):
+    # JSON has no tuples; tags are compared by value on this side
+    return tuple(value) if isinstance(value, list) else value
+
+
+class CoachingHandler(BaseHTTPRequestHandler):
+    server_version = "DriverCoach/1.0"
+
+    def log_message(self, fmt, *args):
+        _log(fmt % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path != "/health":
+            return self._send_json(404, {"error": "not found"})
+        self._send_json(200, {
+            "status": llm_status(),
+            "scheduler": llm_engine.scheduler_stats(),
+            "cache": llm_engine.cache_stats(),
+        })
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            return self._send_json(400, {"error": f"bad JSON: {e}"})
+
+        if self.path == "/v1/cancel":
+            return self._send_json(200, {"cancelled": llm_engine.cancel_coaching(_tag(body.get("tag")))})
+        if self.path not in ("/v1/coaching", "/v1/coaching/stream"):
+            return self._send_json(404, {"error": "not found"})
+
+        missing = [k for k in ("summary", "severity") if k not in body]
+        if missing or body["severity"] not in llm_engine.SAMPLING_PROFILES:
+            return self._send_json(400, {"error": f"missing or invalid fields: {missing or ['severity']}"})
+
+        args = (body["summary"], body["severity"], bool(body.get("is_coach", False)))
+        kwargs = {"priority": int(body.get("priority", PRIORITY_COACH)), "tag": _tag(body.get("tag"))}
+
+        if self.path == "/v1/coaching":
+            try:
+                text = llm_engine.submit_coaching_feedback(*args, **kwargs).result()
+            except CancelledError:
+                return self._send_json(409, {"error": "cancelled"})
+            except Exception as e:
+                return self._send_json(500, {"error": str(e)})
+            return self._send_json(200, {"text": text})
+
+        self._stream(args, kwargs)
+
+    def _stream(self, args, kwargs):
+        # HTTP/1.0 response without a length: the body ends when we close
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        def line(payload):
+            self.wfile.write((json.dumps(payload) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            for delta in llm_engine.stream_coaching_feedback(*args, **kwargs):
+                line({"delta": delta})
+            line({"done": True})
+        except CancelledError:
+            line({"error": "cancelled", "cancelled": True})
+        except (BrokenPipeError, ConnectionResetError):
+            _log("Client went away mid-stream")
+        except Exception as e:
+            line({"error": str(e)})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)  # BaseHTTPRequestHandler expects (host, port)
+
+
+def make_server(host="127.0.0.1", port=8765, socket_path=None):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return UnixHTTPServer(socket_path, CoachingHandler)
+    return ThreadingHTTPServer((host, port), CoachingHandler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Coaching model inference server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None, help="serve on a Unix socket instead of TCP")
+    args = parser.parse_args(argv)
+
+    if os.getenv("LLM_SERVER_URL"):
+        parser.error("LLM_SERVER_URL is set: the server must load the model itself")
+
+    start_llm_warmup()  # /health reports "loading" until the model is ready
+    server = make_server(args.host, args.port, args.socket)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f">>> Inference server listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# backend/llm/latency.py
+"""
+Generation throughput for LLM metrics. Latency samples and histograms
+are generic: see backend/metrics.py.
+"""
+
+import threading
+from collections import deque
+
+
+class ThroughputMeter:
+    """
+    Rolling tokens/sec over the last maxlen generations.
+    """
+
+    def __init__(self, maxlen=50):
+        self._runs = deque(maxlen=maxlen)  # (tokens, seconds)
+        self._lock = threading.Lock()
+
+    def record(self, tokens, seconds):
+        if seconds > 0:
+            with self._lock:
+                self._runs.append((tokens, seconds))
+
+    def tokens_per_sec(self):
+        with self._lock:
+            tokens = sum(t for t, _ in self._runs)
+            seconds = sum(s for _, s in self._runs)
+        return tokens / seconds if seconds else None
+
+    def mean_tokens(self):
+        with self._lock:
+            runs = list(self._runs)
+        return sum(t for t, _ in runs) / len(runs) if runs else None
+
+    def stats(self):
+        rate = self.tokens_per_sec()
+        mean = self.mean_tokens()
+        return {
+            "generations": len(self._runs),
+            "tokens_per_sec": round(rate, 2) if rate else None,
+            "mean_tokens": round(mean, 1) if mean else None,
+        }
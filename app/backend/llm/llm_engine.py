@@ -7,11 +7,89 @@ IMPORTANT:
 - Summary text must be passed verbatim from severity.py.
 """
 
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from backend.llm.budget import BUDGET, complete_with_budget
+from backend.llm.latency import ThroughputMeter
+from backend.metrics import LatencySamples
+from backend.llm.response_cache import RESPONSE_CACHE, make_key, model_fingerprint
+from backend.llm.worker_pool import LLMWorkerPool
+from backend.llm.template_index import TEMPLATE_INDEX, TEMPLATE_SEVERITIES
+from backend.llm.scheduler import (
+    InferenceScheduler,
+    PRIORITY_COACH,
+    PRIORITY_LIVE,
+    PRIORITY_PREFETCH,
+)
+
 DEBUG = False
 USE_STUB = False   # Set True to bypass LLM for UI testing
 
 # The 'coach' object should be initialized externally if using llama.cpp
 coach = None
+_model_id = None
+
+# Set once coach is usable (or its background load failed)
+_model_ready = threading.Event()
+_load_error = None
+
+# >1 decodes up to this many queued prompts together (see batch_decode.py)
+BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))
+_batcher = None
+
+# Set to use a shared inference_server.py instead of a local model
+SERVER_URL = os.getenv("LLM_SERVER_URL", "")
+_remote = None
+
+# >0 runs generations in this many worker processes (see worker_pool.py)
+POOL_WORKERS = int(os.getenv("LLM_POOL_WORKERS", "0"))
+
+# Evaluate the system header once and restore its KV state per request
+USE_PREFIX_CACHE = os.getenv("LLM_PREFIX_CACHE", "1") != "0"
+_prefix = None
+
+# Token streaming: raw text generated so far and listeners, per request key
+_stream_lock = threading.Lock()
+_partials = {}   # key -> raw text so far
+_listeners = {}  # key -> [queue.Queue]
+_STREAM_DONE = object()
+FIRST_TEXT_LATENCY = LatencySamples()
+THROUGHPUT = ThroughputMeter()  # measured generation speed (prefetch throttling)
+
+STOP_TOKENS = ["<|eot_id|>","<|start_header_id|>"]
+
+# Sampling per severity (part of the response cache key)
+SAMPLING_PROFILES = {
+    "LOW": {
+        "max_tokens": 200,
+        "temperature": 1.0,
+        "top_p": 1.0,
+        "repeat_penalty": 1.1,
+    },
+    "MEDIUM": {
+        "max_tokens": 200,
+        "temperature": 0.8,
+        "top_p": 0.9,
+        "repeat_penalty": 1.2,
+    },
+    "HIGH": {
+        "max_tokens": 300,
+        "temperature": 0.3, # high temperature for creative long responses
+        "top_p": 0.8, # low prob low for controlling variety of words
+        "repeat_penalty": 1.2,
+    },
+}
+
+REPLACEMENTS = {
+    "segment": "trip",
+    "Segment": "Trip",
+    "this segment": "this trip",
+    "the segment": "the Trip",
+}
 
 
 def _log(msg):
@@ -25,77 +103,404 @@ def init_llm(model):
     Injects the LLM instance (llama.cpp / GGUF).
     Call this ONCE during app startup.
     """
-    global coach
+    global coach, _model_id, _batcher, _prefix
     coach = model
+    _batcher = None
+    _prefix = None
+    _model_id = model_fingerprint(getattr(model, "model_path", None))
+    _model_ready.set()
     _log("LLM initialized")
 
+
+def expect_llm(model_path):
+    """
+    Called when a background load of model_path starts. Requests are
+    accepted from now on (cache hits are served immediately); jobs that
+    need the model wait on the scheduler thread until init_llm().
+    """
+    global _model_id
+    _model_id = model_fingerprint(model_path)
+
+
+def use_remote(client):
+    """
+    Forward every request to an inference server (inference_client.py)
+    instead of a local model.
+    """
+    global _remote
+    _remote = client
+    _log(f"Using inference server at {client.url}")
+
+
+def llm_load_failed(error):
+    """
+    The background load gave up: fail queued and future model jobs.
+    """
+    global _load_error
+    _load_error = error
+    _model_ready.set()
+
+
+def is_ready() -> bool:
+    return coach is not None or _remote is not None
+
 # def is_initialized():
 #     return coach is not None
 
 
-def get_coaching_feedback(summary: str, severity: str, is_coach: bool) -> str:
+def get_coaching_feedback(summary: str, severity: str, is_coach: bool, priority: int = PRIORITY_COACH) -> str:
     """
     Main entry point used by UI and services.
+    Blocks until the scheduler has served the request.
     """
     print(">>> ENTERED get_coaching_feedback")
 
+    return submit_coaching_feedback(summary, severity, is_coach, priority=priority).result()
+
+
+def submit_coaching_feedback(summary: str, severity: str, is_coach: bool,
+                             priority: int = PRIORITY_COACH, tag=None) -> Future:
+    """
+    Non-blocking variant: returns a Future of the coaching text.
+    Cache hits resolve immediately; everything else goes through the
+    scheduler, which is the only caller of the model.
+    tag groups requests for cancel_coaching() (e.g. (driver_id, trip_id)).
+    """
     if USE_STUB:
-        return _stub_response(summary)
+        future = Future()
+        future.set_result(_stub_response(summary))
+        return future
 
-    if coach is None:
+    if _remote is not None:
+        return _remote.submit(summary, severity, is_coach, priority, tag)
+
+    if _model_id is None:
         raise RuntimeError("LLM not initialized. Call init_llm() first.")
 
+    params = SAMPLING_PROFILES[severity]
+    key = make_key(summary, severity, params, _model_id)
+
+    TEMPLATE_INDEX.count_call()
+    text = RESPONSE_CACHE.get(key)
+    if text is not None:
+        _log("Serving cached response")
+        _index_template(summary, severity, params, text)
+    elif severity in TEMPLATE_SEVERITIES and RESPONSE_CACHE.mode == "use":
+        # refresh / off mean "generate": no canned text either
+        text = TEMPLATE_INDEX.lookup(_template_scope(severity, params), summary)
+        if text is not None:
+            _log("Serving near-duplicate response")
+
+    if text is not None:
+        future = Future()
+        future.set_result(_apply_replacements(text, is_coach))
+        return future
+
+    return _scheduler.submit(
+        key,
+        (key, summary, severity, params),
+        priority=priority,
+        tag=tag,
+        transform=lambda raw: _apply_replacements(raw, is_coach),
+    )
+
+
+def stream_coaching_feedback(summary: str, severity: str, is_coach: bool,
+                             priority: int = PRIORITY_LIVE, tag=None):
+    """
+    Generator of coaching text deltas, in order, as tokens are produced.
+    Joined together they equal get_coaching_feedback(); coach-side
+    replacements are applied without splitting a word across deltas.
+    Cache hits and batched generations arrive as a single delta.
+    Raises CancelledError if the request is cancelled (cancel_coaching).
+    """
+    t0 = time.perf_counter()
+    if _remote is not None and not USE_STUB:
+        first = True
+        for delta in _remote.stream(summary, severity, is_coach, priority, tag):
+            if first:
+                FIRST_TEXT_LATENCY.record(time.perf_counter() - t0)
+                first = False
+            yield delta
+        return
+
+    deltas = _DeltaStream(is_coach)
+
+    chunks = queue.Queue()
+    key = None
+    if not USE_STUB and _model_id is not None:
+        key = make_key(summary, severity, SAMPLING_PROFILES[severity], _model_id)
+        with _stream_lock:
+            _listeners.setdefault(key, []).append(chunks)
+            if _partials.get(key):
+                chunks.put(_partials[key])  # joined a running generation
+
+    first = True
+    try:
+        future = submit_coaching_feedback(summary, severity, is_coach, priority, tag)
+        future.add_done_callback(lambda _: chunks.put(_STREAM_DONE))
+        while True:
+            chunk = chunks.get()
+            if chunk is _STREAM_DONE:
+                break
+            delta = deltas.feed(chunk)
+            if delta:
+                if first:
+                    FIRST_TEXT_LATENCY.record(time.perf_counter() - t0)
+                    first = False
+                yield delta
+
+        delta = deltas.finish(future.result())
+        if delta:
+            if first:
+                FIRST_TEXT_LATENCY.record(time.perf_counter() - t0)
+            yield delta
+    finally:
+        if key is not None:
+            with _stream_lock:
+                listeners = _listeners.get(key, [])
+                if chunks in listeners:
+                    listeners.remove(chunks)
+                if not listeners:
+                    _listeners.pop(key, None)
+
+
+def coach_text(text: str) -> str:
+    """
+    Coach-side wording of driver-side coaching (e.g. a stored response).
+    """
+    return _apply_replacements(text, True)
+
+
+def stream_stats():
+    """
+    Time from stream_coaching_feedback() to its first non-empty delta.
+    """
+    return {"first_text": FIRST_TEXT_LATENCY.stats()}
+
+
+def cancel_coaching(tag) -> int:
+    """
+    Cancel queued requests submitted with tag (e.g. when a driver stops a trip).
+    """
+    if _remote is not None:
+        return _remote.cancel(tag)
+    return _scheduler.cancel(tag)
+
+
+def scheduler_stats():
+    return _scheduler.stats()
+
+
+def cache_stats():
+    return RESPONSE_CACHE.stats()
+
+
+def throughput_stats():
+    return THROUGHPUT.stats()
+
+
+def template_stats():
+    """
+    Near-duplicate fast path: lookups, hits, and calls_saved_fraction
+    (hits over all coaching requests).
+    """
+    return TEMPLATE_INDEX.stats()
+
+
+def pool_stats():
+    return coach.stats() if isinstance(coach, LLMWorkerPool) else None
+
+
+def budget_stats():
+    """
+    Per-severity token budget, early stops, latency and token histograms.
+    """
+    return BUDGET.stats({sev: p["max_tokens"] for sev, p in SAMPLING_PROFILES.items()})
+
+
+# ================= INTERNAL HELPERS =================
+
+
+def _wait_for_model():
+    """
+    Block the scheduler thread until the model has loaded.
+    """
+    if coach is None:
+        _model_ready.wait()
+    if coach is None:
+        raise RuntimeError(f"LLM failed to load: {_load_error}")
+
+
+def _generate_and_store(key: str, summary: str, severity: str, params: dict) -> str:
+    """
+    Scheduler job: generate, then fill the response cache.
+    """
+    _wait_for_model()
+    try:
+        text = _generate(summary, params, key, severity)
+    finally:
+        with _stream_lock:
+            _partials.pop(key, None)
+    RESPONSE_CACHE.put(key, text)
+    _index_template(summary, severity, params, text)
+    return text
+
+
+def _template_scope(severity: str, params: dict) -> str:
+    return make_key("", severity, params, _model_id)
+
+
+def _index_template(summary: str, severity: str, params: dict, text: str):
+    if severity in TEMPLATE_SEVERITIES:
+        TEMPLATE_INDEX.add(_template_scope(severity, params), summary, text)
+
+
+def _generate_batch_and_store(args_list) -> list:
+    """
+    Scheduler batch job: decode several prompts as parallel sequences.
+    """
+    global _batcher
+    _wait_for_model()
+    if _batcher is None:
+        from backend.llm.batch_decode import BatchedGenerator
+        _batcher = BatchedGenerator(
+            coach,
+            n_seq=BATCH_SIZE,
+            prefix_text=_prompt_prefix() if USE_PREFIX_CACHE else None,
+        )
+
+    requests = [
+        (_build_prompt(summary), dict(params, budget=BUDGET.budget(severity, params["max_tokens"])))
+        for _, summary, severity, params in args_list
+    ]
+    _log(f"Sending batch of {len(requests)} prompts to LLM")
+    t0 = time.perf_counter()
+    outputs = _batcher.generate(requests, stop=STOP_TOKENS)
+    elapsed = time.perf_counter() - t0
+    for (_, _, severity, _), out in zip(args_list, outputs):
+        # parallel sequences: each one costs its share of the batch
+        THROUGHPUT.record(out["completion_tokens"], elapsed / len(outputs))
+        BUDGET.record(severity, out["completion_tokens"], elapsed, out["early_stop"])
+
+    texts = []
+    for (key, summary, severity, params), out in zip(args_list, outputs):
+        RESPONSE_CACHE.put(key, out["text"])
+        _index_template(summary, severity, params, out["text"])
+        texts.append(out["text"])
+    return texts
+
+
+_scheduler = InferenceScheduler(
+    _generate_and_store,
+    run_batch=_generate_batch_and_store if BATCH_SIZE > 1 and not POOL_WORKERS else None,
+    max_batch=BATCH_SIZE,
+    workers=max(1, POOL_WORKERS),
+)
+
+
+def _generate(summary: str, params: dict, key: str = None, severity: str = None) -> str:
+    """
+    One llama.cpp completion; returns the raw assistant text.
+    Tokens are streamed to any stream_coaching_feedback() listeners of key.
+    Past the severity's token budget, the next sentence boundary ends it.
+    """
     prompt = _build_prompt(summary)
+    budget = BUDGET.budget(severity, params["max_tokens"]) if severity else params["max_tokens"]
 
+    _restore_prefix()
     _log("Sending prompt to LLM")
 
-    if severity == "LOW":
-        output = coach(
-        prompt,
-        max_tokens=200,
-        temperature=1.0,
-        top_p=1.0,
-        repeat_penalty=1.1,
-        stop=["<|eot_id|>","<|start_header_id|>"]
-    )
-    if severity == "MEDIUM":
-        output = coach(
-        prompt,
-        max_tokens=200,
-        temperature=0.8,
-        top_p=0.9,
-        repeat_penalty=1.2,
-        stop=["<|eot_id|>","<|start_header_id|>"]
-    )
-    if severity == "HIGH":
-        output = coach(
-        prompt,
-        max_tokens=300,
-        temperature=0.3, # high temperature for creative long responses
-        top_p=0.8, # low prob low for controlling variety of words
-        repeat_penalty=1.2,
-        stop=["<|eot_id|>","<|start_header_id|>"]
-    )
-    print(">>> RAW RESULT TYPE:", type(output))
-    print(">>> RAW RESULT:", output)
-    text = output["choices"][0]["text"]
-
-    replacements = {
-        "segment": "trip",
-        "Segment": "Trip",
-        "this segment": "this trip",
-        "the segment": "the Trip",
-    }
+    on_piece = (lambda piece: _publish(key, piece)) if key is not None else None
+    t0 = time.perf_counter()
+    if isinstance(coach, LLMWorkerPool):
+        text, tokens, early_stop = coach.complete(prompt, STOP_TOKENS, params, budget, on_piece)
+    else:
+        text, tokens, early_stop = complete_with_budget(coach, prompt, STOP_TOKENS, params, budget, on_piece)
+    elapsed = time.perf_counter() - t0
+    THROUGHPUT.record(tokens, elapsed)
+    if severity:
+        BUDGET.record(severity, tokens, elapsed, early_stop)
+
+    print(">>> RAW RESULT:", text)
+    return text
+
+
+def _publish(key: str, piece: str):
+    with _stream_lock:
+        _partials[key] = _partials.get(key, "") + piece
+        for listener in _listeners.get(key, ()):
+            listener.put(piece)
+
+
+class _DeltaStream:
+    """
+    Turns raw chunks into display deltas consistent with _apply_replacements:
+    text that could still become part of a replacement, leading whitespace
+    and trailing whitespace are held back until the next chunk settles them.
+    """
+
+    def __init__(self, is_coach: bool):
+        self.is_coach = is_coach
+        self.raw = ""
+        self.sent = ""
+
+    def _holdback(self) -> int:
+        if not self.is_coach:
+            return 0
+        longest = 0
+        for word in REPLACEMENTS:
+            for n in range(1, len(word)):
+                if self.raw.endswith(word[:n]):
+                    longest = max(longest, n)
+        return longest
+
+    def _emit(self, shown: str) -> str:
+        if not shown.startswith(self.sent):
+            return ""  # never retract text already on screen
+        delta = shown[len(self.sent):]
+        self.sent = shown
+        return delta
+
+    def feed(self, chunk: str) -> str:
+        self.raw += chunk
+        settled = self.raw[:len(self.raw) - self._holdback()]
+        shown = settled
+        if self.is_coach:
+            for word, replacement in REPLACEMENTS.items():
+                shown = shown.replace(word, replacement)
+        return self._emit(shown.strip())
+
+    def finish(self, final: str) -> str:
+        return self._emit(final)
+
+
+def _restore_prefix():
+    """
+    Put the system-prompt KV snapshot back if the context lost it.
+    Only for real llama.cpp models; runs on the scheduler thread.
+    """
+    global _prefix
+    if not USE_PREFIX_CACHE or not hasattr(coach, "save_state"):
+        return
+    if _prefix is None:
+        from backend.llm.prefix_cache import PrefixCache
+        _prefix = PrefixCache(coach, _prompt_prefix())
+    _prefix.restore()
+
+
+def prefix_cache_stats():
+    return _prefix.stats() if _prefix is not None else None
+
+
+def _apply_replacements(text: str, is_coach: bool) -> str:
     if is_coach:
-        for word, replacement in replacements.items():
+        for word, replacement in REPLACEMENTS.items():
             text = text.replace(word, replacement)
 
     return text.strip()
 
 
-# ================= INTERNAL HELPERS =================
-
-
 def _build_prompt(summary: str) -> str:
     """
     EXACT prompt used during training.
@@ -115,6 +520,14 @@ def _build_prompt(summary: str) -> str:
     )
 
 
+def _prompt_prefix() -> str:
+    """
+    The part of _build_prompt() that precedes the summary.
+    """
+    marker = "\x00SUMMARY\x00"
+    return _build_prompt(marker).split(marker)[0]
+
+
 def _extract_response(output: str) -> str:
     """
     Extracts assistant response safely.
@@ -1,6 +1,14 @@
 import os
-from llama_cpp import Llama
-from backend.llm.llm_engine import init_llm
+import threading
+import time
+from backend.llm.llm_engine import (
+    init_llm,
+    expect_llm,
+    llm_load_failed,
+    use_remote,
+    POOL_WORKERS,
+    SERVER_URL,
+)
 MODEL_PATH = os.getenv(
     "LLM_MODEL_PATH",
     "backend/llm/driving-coach-q4_k_m.gguf"
@@ -8,23 +16,100 @@ MODEL_PATH = os.getenv(
 )
 
 _llm = None
+_client = None  # InferenceClient when LLM_SERVER_URL is set
+_load_lock = threading.Lock()
+
+# Readiness for UI / services: idle -> loading -> ready | failed
+_status = {"state": "idle", "error": None, "started_at": None, "load_seconds": None}
+
 
 def load_llm_once():
     global _llm
 
-    if _llm is not None:
-        return
+    with _load_lock:
+        if _llm is not None:
+            return
+
+        print(f">>> Loading LLM from: {MODEL_PATH}")
+        _status["state"] = "loading"
+        _status["started_at"] = _status["started_at"] or time.time()
+        t0 = time.perf_counter()
+
+        if SERVER_URL:
+            # no local model: wait for the shared inference server instead
+            llm = _remote_client()
+            llm.wait_ready()
+            _llm = llm
+            _status["state"] = "ready"
+            _status["load_seconds"] = round(time.perf_counter() - t0, 2)
+            print(f">>> USING INFERENCE SERVER {SERVER_URL}")
+            return
+
+        if POOL_WORKERS > 0:
+            # N processes over the same mmap'd GGUF, cores split between them
+            from backend.llm.worker_pool import LLMWorkerPool
+            llm = LLMWorkerPool(MODEL_PATH, workers=POOL_WORKERS, n_ctx=4096)
+            llm.start()
+        else:
+            from llama_cpp import Llama  # heavy import, only when actually loading
+            llm = Llama(
+                model_path=MODEL_PATH,   # ✅ USE ENV VARIABLE
+                n_ctx=4096,
+                n_threads=8,
+                chat_format=None,
+                verbose=False
+            )
+
+        init_llm(llm)
+        _llm = llm
+        _status["state"] = "ready"
+        _status["load_seconds"] = round(time.perf_counter() - t0, 2)
+        print(">>> LLM INITIALIZED")
+
+
+def _remote_client():
+    global _client
+    if _client is None:
+        from backend.llm.inference_client import InferenceClient
+        _client = InferenceClient(SERVER_URL)
+        use_remote(_client)
+    return _client
+
+
+def start_llm_warmup():
+    """
+    Load the model on a background thread and return immediately.
+    Coaching requests are accepted right away (cache hits are served);
+    anything that needs the model waits in the scheduler until it is ready.
+    """
+    with _load_lock:
+        if _llm is not None or _status["state"] == "loading":
+            return
+        _status["state"] = "loading"
+        _status["started_at"] = time.time()
+        if SERVER_URL:
+            _remote_client()  # the server queues requests while it warms up
+        else:
+            expect_llm(MODEL_PATH)
+
+    def _warmup():
+        try:
+            load_llm_once()
+        except Exception as e:
+            _status["state"] = "failed"
+            _status["error"] = str(e)
+            llm_load_failed(e)
+            print(f">>> LLM LOAD FAILED: {e}")
+
+    threading.Thread(target=_warmup, daemon=True, name="llm-warmup").start()
+
 
-    print(f">>> Loading LLM from: {MODEL_PATH}")
+def llm_status():
+    """
+    {"state": idle|loading|ready|failed, "error", "started_at", "load_seconds"}
+    """
+    return dict(_status)
 
-    llm = Llama(
-        model_path=MODEL_PATH,   # ✅ USE ENV VARIABLE
-        n_ctx=4096,
-        n_threads=8,
-        chat_format=None,
-        verbose=False
-    )
 
-    init_llm(llm)
-    _llm = llm
-    print(">>> LLM INITIALIZED")
+def is_llm_ready() -> bool:
+    return _status["state"] == "ready"
@@ -0,0 +1,141 @@
+# backend/llm/prefetcher.py
+"""
+Look-ahead prefetch of upcoming segments' coaching.
+
+While a trip plays back, the segments after the current one are queued at
+PRIORITY_PREFETCH so their results are in the response cache before the
+dashboard reaches them. Live requests still jump ahead (and promote a
+queued duplicate), and cancel_coaching(tag) drops everything prefetched
+for a stopped trip.
+
+How far ahead to go is throttled by measured generation speed: with
+seconds_per_segment = mean completion tokens / tokens per second, the
+prefetcher keeps ceil(seconds_per_segment / playback_interval_s) + 1
+segments in flight, capped at depth. A fast model therefore queues just
+the next segment; a slow one fills up to depth.
+
+Env:
+    LLM_PREFETCH_DEPTH   max segments ahead (default 3, 0 disables)
+"""
+
+import math
+import os
+import threading
+
+from backend.llm import llm_engine
+from backend.llm.scheduler import PRIORITY_PREFETCH
+
+DEBUG = False
+
+PREFETCH_DEPTH = int(os.getenv("LLM_PREFETCH_DEPTH", "3"))
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[PREFETCHER] {msg}")
+
+
+class LookaheadPrefetcher:
+    """
+    Usage (per playback tick):
+        prefetcher.update(tag, current_idx, summaries, severities)
+    and prefetcher.stop(tag) when the trip stops. A tag is forgotten as soon
+    as it has nothing in flight, so trips that simply end leave nothing behind.
+    """
+
+    def __init__(self, playback_interval_s, depth=PREFETCH_DEPTH):
+        self.playback_interval_s = playback_interval_s
+        self.depth = depth
+        self._inflight = {}  # tag -> {idx: Future}
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+
+    def effective_depth(self) -> int:
+        """
+        Segments to keep in flight given the measured model speed.
+        Until anything has been measured, assume the worst and use depth.
+        """
+        rate = llm_engine.THROUGHPUT.tokens_per_sec()
+        tokens = llm_engine.THROUGHPUT.mean_tokens()
+        if not rate or not tokens:
+            return self.depth
+        seconds_per_segment = tokens / rate
+        needed = math.ceil(seconds_per_segment / self.playback_interval_s) + 1
+        return max(1, min(self.depth, needed))
+
+    def update(self, tag, current_idx, summaries, severities) -> list:
+        """
+        Queue segments after current_idx up to the effective depth.
+        summaries: {idx: summary}; severities: [severity] by segment index.
+        Returns the newly submitted indices.
+        """
+        if self.depth <= 0:
+            return []
+
+        depth = self.effective_depth()
+        last = min(current_idx + depth, len(severities) - 1)
+        submitted = []
+        futures = []
+
+        with self._lock:
+            inflight = self._inflight.setdefault(tag, {})
+            for idx in list(inflight):
+                if inflight[idx].done() or idx <= current_idx:
+                    del inflight[idx]
+
+            for idx in range(current_idx + 1, last + 1):
+                if idx in inflight or idx not in summaries:
+                    continue
+                future = llm_engine.submit_coaching_feedback(
+                    summaries[idx], severities[idx], False,
+                    priority=PRIORITY_PREFETCH,
+                    tag=tag,
+                )
+                if not future.done():
+                    inflight[idx] = future
+                    submitted.append(idx)
+                    futures.append((idx, future))
+            self.submitted += len(submitted)
+            if not inflight:
+                del self._inflight[tag]
+
+        # outside the lock: the callback runs inline if the future already finished
+        for idx, future in futures:
+            future.add_done_callback(
+                lambda future, idx=idx: self._finished(tag, idx, future)
+            )
+
+        if submitted:
+            _log(f"{tag}: queued {submitted} (depth {depth})")
+        return submitted
+
+    def _finished(self, tag, idx, future):
+        with self._lock:
+            inflight = self._inflight.get(tag)
+            if inflight is None or inflight.get(idx) is not future:
+                return
+            del inflight[idx]
+            if not inflight:
+                del self._inflight[tag]
+
+    def stop(self, tag) -> int:
+        """
+        Cancel this tag's prefetches. Returns how many were still queued.
+        """
+        with self._lock:
+            self._inflight.pop(tag, None)
+        return llm_engine.cancel_coaching(tag)
+
+    def stats(self):
+        with self._lock:
+            inflight = sum(
+                1 for futures in self._inflight.values()
+                for f in futures.values() if not f.done()
+            )
+        return {
+            "depth": self.depth,
+            "effective_depth": self.effective_depth(),
+            "inflight": inflight,
+            "submitted": self.submitted,
+        }
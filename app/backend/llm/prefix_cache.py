@@ -0,0 +1,73 @@
+# backend/llm/prefix_cache.py
+"""
+KV-cache snapshot of the fixed system-prompt prefix.
+
+Every coaching prompt starts with the same system header (everything in
+_build_prompt before the summary). PrefixCache evaluates those tokens once,
+snapshots the llama.cpp state, and restore() puts it back before a request
+whenever the context no longer starts with the prefix. llama.cpp's own
+longest-prefix match then only evaluates the summary suffix.
+
+The prompt text itself is untouched — the prefix is derived from
+_build_prompt, not duplicated.
+"""
+
+import time
+
+DEBUG = False
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[PREFIX_CACHE] {msg}")
+
+
+def prefix_tokens(llm, prefix_text):
+    """
+    Prefix tokens as they appear at the start of full prompts. Tokenizing
+    the prefix alone can merge differently at the boundary, so the last
+    token is dropped — it is re-evaluated with the suffix.
+    """
+    tokens = llm.tokenize(prefix_text.encode("utf-8"), add_bos=True, special=True)
+    return tokens[:-1]
+
+
+class PrefixCache:
+    def __init__(self, llm, prefix_text):
+        self.llm = llm
+        self.tokens = prefix_tokens(llm, prefix_text)
+
+        t0 = time.perf_counter()
+        llm.reset()
+        llm.eval(self.tokens)
+        self.state = llm.save_state()
+        self.build_seconds = time.perf_counter() - t0
+
+        self.restores = 0
+        self.reuses = 0
+        _log(f"Snapshot of {len(self.tokens)} prefix tokens in {self.build_seconds:.3f}s")
+
+    def is_loaded(self) -> bool:
+        n = len(self.tokens)
+        return self.llm.n_tokens >= n and self.llm._input_ids[:n].tolist() == self.tokens
+
+    def restore(self) -> bool:
+        """
+        Make sure the context starts with the prefix. Returns True if the
+        snapshot had to be loaded.
+        """
+        if self.is_loaded():
+            self.reuses += 1
+            return False
+
+        self.llm.load_state(self.state)
+        self.restores += 1
+        return True
+
+    def stats(self):
+        return {
+            "prefix_tokens": len(self.tokens),
+            "build_seconds": round(self.build_seconds, 4),
+            "restores": self.restores,
+            "reuses": self.reuses,
+        }
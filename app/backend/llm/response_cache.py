@@ -0,0 +1,217 @@
+# backend/llm/response_cache.py
+"""
+Two-tier cache of raw coaching completions.
+
+Key = (summary, severity, sampling params, model fingerprint), so a new
+GGUF file or a changed sampling profile never serves stale text.
+
+- memory tier: LRU dict, per process
+- disk tier:   SQLite file shared across restarts (and processes)
+
+What is cached is the model's raw text; the coach-side word replacements
+are applied afterwards, so driver and coach views share entries.
+
+Policy (env):
+    LLM_CACHE_MODE     use | refresh | off   (default: use)
+                       refresh = always regenerate, then overwrite the entry
+    LLM_CACHE_MAX_AGE  seconds before an entry is regenerated (default: never)
+    LLM_CACHE_PATH     SQLite file for the disk tier ("" disables it)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEBUG = False
+
+CACHE_MODE = os.getenv("LLM_CACHE_MODE", "use")
+CACHE_MAX_AGE_S = float(os.getenv("LLM_CACHE_MAX_AGE", "0")) or None
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite")
+MEMORY_ENTRIES = 2048
+
+_FINGERPRINT_BYTES = 4 * 1024 * 1024
+_fingerprints = {}
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[RESPONSE_CACHE] {msg}")
+
+
+def model_fingerprint(model_path) -> str:
+    """
+    Cheap content hash of a GGUF file: size + first/last 4 MiB.
+    Memoized per (path, mtime) so it is computed once per model load.
+    """
+    if not model_path or not os.path.exists(model_path):
+        return f"unknown:{model_path}"
+
+    st = os.stat(model_path)
+    memo = (os.path.abspath(model_path), st.st_mtime_ns, st.st_size)
+    if memo in _fingerprints:
+        return _fingerprints[memo]
+
+    h = hashlib.sha256(str(st.st_size).encode())
+    with open(model_path, "rb") as f:
+        h.update(f.read(_FINGERPRINT_BYTES))
+        if st.st_size > _FINGERPRINT_BYTES:
+            f.seek(max(st.st_size - _FINGERPRINT_BYTES, _FINGERPRINT_BYTES))
+            h.update(f.read())
+    _fingerprints[memo] = h.hexdigest()[:32]
+    return _fingerprints[memo]
+
+
+def make_key(summary: str, severity: str, params: dict, model_id: str) -> str:
+    payload = json.dumps([summary, severity, params, model_id], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe memory LRU in front of an optional SQLite table.
+    """
+
+    def __init__(self, path=CACHE_PATH, memory_entries=MEMORY_ENTRIES,
+                 mode=CACHE_MODE, max_age_s=CACHE_MAX_AGE_S):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.mode = mode
+        self.max_age_s = max_age_s
+
+        self._memory = OrderedDict()  # key -> (created_at, text)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    # --------------------------------------------------
+    # Disk tier
+    # --------------------------------------------------
+
+    def _db(self):
+        if not self.path:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, created_at REAL NOT NULL, text TEXT NOT NULL)"
+                )
+                conn.commit()
+            except Exception as e:
+                print(f"[RESPONSE_CACHE] Disk tier unavailable (non-fatal): {e}")
+                self.path = None
+                return None
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, key):
+        conn = self._db()
+        if conn is None:
+            return None
+        try:
+            return conn.execute(
+                "SELECT created_at, text FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            print(f"[RESPONSE_CACHE] Read failed (non-fatal): {e}")
+            return None
+
+    def _disk_put(self, key, created_at, text):
+        conn = self._db()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, created_at, text) VALUES (?, ?, ?)",
+                (key, created_at, text),
+            )
+            conn.commit()
+        except Exception as e:
+            print(f"[RESPONSE_CACHE] Write failed (non-fatal): {e}")
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def _fresh(self, created_at):
+        return self.max_age_s is None or time.time() - created_at <= self.max_age_s
+
+    def _remember(self, key, created_at, text):
+        # caller holds self._lock
+        self._memory[key] = (created_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Cached text for key, or None when the policy says to regenerate.
+        """
+        if self.mode != "use":
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._fresh(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                self._memory.pop(key, None)
+                self.stale += 1
+
+        row = self._disk_get(key)
+        with self._lock:
+            if row is not None and self._fresh(row[0]):
+                self._remember(key, row[0], row[1])
+                self.disk_hits += 1
+                return row[1]
+            if row is not None:
+                self.stale += 1
+            self.misses += 1
+        return None
+
+    def put(self, key, text):
+        if self.mode == "off":
+            return
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, text)
+        self._disk_put(key, created_at, text)
+        _log(f"Stored {key[:12]}")
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        conn = self._db()
+        if conn is not None:
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "mode": self.mode,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+RESPONSE_CACHE = ResponseCache()
@@ -0,0 +1,244 @@
+# backend/llm/scheduler.py
+"""
+Priority scheduler in front of the single llama.cpp model.
+
+One worker thread owns every model call, so generations never overlap
+(unless workers > 1, see below).
+Jobs are served lowest priority number first (FIFO within a priority):
+
+    PRIORITY_LIVE      driver segment being watched right now
+    PRIORITY_COACH     coach clicked "Analyze Trip"
+    PRIORITY_PREFETCH  background look-ahead
+
+Identical requests (same summary + severity) share one queued/running job;
+a higher-priority duplicate promotes it. Every submit gets its own Future,
+and cancel(tag) drops the tagged futures — a job is only skipped once none
+of its submitters still want it.
+
+With run_batch set, the worker drains up to max_batch ready jobs (in
+priority order) into a single run_batch call instead.
+
+workers > 1 starts that many worker threads, for run functions that hand
+the work to something that really runs in parallel (the process pool).
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+DEBUG = False
+
+PRIORITY_LIVE = 0
+PRIORITY_COACH = 1
+PRIORITY_PREFETCH = 2
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[LLM_SCHEDULER] {msg}")
+
+
+def _resolve(future, result=None, error=None):
+    """Set a waiter's outcome unless it was cancelled meanwhile."""
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+class _Job:
+    def __init__(self, key, args, priority):
+        self.key = key
+        self.args = args
+        self.priority = priority
+        self.waiters = []  # (future, tag, transform)
+        self.started = False
+
+    def live_waiters(self):
+        return [w for w in self.waiters if not w[0].cancelled()]
+
+
+class InferenceScheduler:
+    """
+    run(*args) is called on the worker thread for each job and must return
+    the job's result (raw model text for the coaching engine).
+    run_batch([args, ...]) -> [result, ...], if given, serves groups of up
+    to max_batch jobs at once.
+    """
+
+    def __init__(self, run, name="llm-scheduler", run_batch=None, max_batch=1, workers=1):
+        self._run = run
+        self._run_batch = run_batch
+        self.max_batch = max_batch
+        self.workers = workers
+        self._name = name
+        self._heap = []
+        self._jobs = {}  # key -> _Job (queued or running)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+    # --------------------------------------------------
+    # Worker
+    # --------------------------------------------------
+
+    def _ensure_started(self):
+        # caller holds self._cond
+        if not self._threads:
+            for i in range(self.workers):
+                name = self._name if self.workers == 1 else f"{self._name}-{i}"
+                thread = threading.Thread(target=self._worker, daemon=True, name=name)
+                thread.start()
+                self._threads.append(thread)
+
+    def _pop_ready(self):
+        # caller holds self._cond; returns the next runnable job or None
+        while self._heap:
+            priority, _, job = heapq.heappop(self._heap)
+            if job.started or priority != job.priority:
+                continue  # superseded heap entry
+
+            if not job.live_waiters():
+                self._jobs.pop(job.key, None)
+                self.cancelled += 1
+                _log(f"Dropping cancelled job {job.key}")
+                continue
+
+            job.started = True
+            return job
+        return None
+
+    def _next_jobs(self):
+        limit = self.max_batch if self._run_batch is not None else 1
+        with self._cond:
+            while True:
+                while not self._heap:
+                    self._cond.wait()
+                job = self._pop_ready()
+                if job is not None:
+                    break
+
+            jobs = [job]
+            while len(jobs) < limit:
+                job = self._pop_ready()
+                if job is None:
+                    break
+                jobs.append(job)
+            return jobs
+
+    def _execute(self, jobs):
+        """[(result, error)] per job."""
+        if len(jobs) == 1:
+            try:
+                return [(self._run(*jobs[0].args), None)]
+            except Exception as e:
+                return [(None, e)]
+
+        try:
+            results = self._run_batch([j.args for j in jobs])
+            return [(r, None) for r in results]
+        except Exception as e:
+            return [(None, e)] * len(jobs)
+
+    def _finish(self, job, result, error):
+        with self._cond:
+            self._jobs.pop(job.key, None)
+            waiters = list(job.waiters)
+            self.completed += 1
+
+        for future, _, transform in waiters:
+            if error is not None:
+                _resolve(future, error=error)
+                continue
+            try:
+                _resolve(future, transform(result) if transform else result)
+            except Exception as e:
+                _resolve(future, error=e)
+
+    def _worker(self):
+        while True:
+            jobs = self._next_jobs()
+
+            t0 = time.perf_counter()
+            outcomes = self._execute(jobs)
+            with self._cond:
+                self.busy_seconds += time.perf_counter() - t0
+                self.batches += 1
+
+            for job, (result, error) in zip(jobs, outcomes):
+                self._finish(job, result, error)
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def submit(self, key, args, priority=PRIORITY_COACH, tag=None, transform=None) -> Future:
+        """
+        Queue run(*args) under key. Returns a Future of transform(result).
+        """
+        future = Future()
+
+        with self._cond:
+            self._ensure_started()
+            self.submitted += 1
+
+            job = self._jobs.get(key)
+            if job is None:
+                job = _Job(key, args, priority)
+                self._jobs[key] = job
+                heapq.heappush(self._heap, (priority, next(self._seq), job))
+                self._cond.notify()
+            else:
+                self.deduplicated += 1
+                if not job.started and priority < job.priority:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._seq), job))
+                    self._cond.notify()
+
+            job.waiters.append((future, tag, transform))
+
+        return future
+
+    def cancel(self, tag) -> int:
+        """
+        Cancel every pending future submitted with tag. Returns how many.
+        Running jobs finish, but their cancelled waiters get nothing.
+        """
+        n = 0
+        with self._cond:
+            for job in self._jobs.values():
+                for future, t, _ in job.waiters:
+                    if t == tag and future.cancel():
+                        n += 1
+        if n:
+            _log(f"Cancelled {n} request(s) for {tag}")
+        return n
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for j in self._jobs.values() if not j.started and j.live_waiters())
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": sum(1 for j in self._jobs.values() if not j.started),
+                "running": sum(1 for j in self._jobs.values() if j.started),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "batches": self.batches,
+                "busy_seconds": round(self.busy_seconds, 3),
+            }
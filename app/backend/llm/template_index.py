@@ -0,0 +1,181 @@
+# backend/llm/template_index.py
+"""
+Near-duplicate fast path for quiet segments.
+
+Most 30 s windows are uneventful: zero event counts and nearly the same
+speeds, so their summaries differ only in the last digit or two and the
+exact-match response cache misses. TemplateIndex keeps the coaching
+already generated for such windows, indexed by the numbers of their
+build_llm_summary() text, and serves it for a new window when
+
+    - every event count (brakes, accels, corners, bumps) is identical, and
+    - every continuous value is within its tolerance.
+
+The continuous values are quantized to tolerance-sized grid cells, so a
+lookup only inspects the neighbouring cells. The summary text is parsed
+back rather than passed alongside it, so callers need no changes.
+
+Env:
+    LLM_TEMPLATE_TOLERANCE   scale factor on TOLERANCES (default 1.0, 0 disables)
+"""
+
+import itertools
+import math
+import os
+import re
+import threading
+from collections import deque
+
+DEBUG = False
+
+TOLERANCE_SCALE = float(os.getenv("LLM_TEMPLATE_TOLERANCE", "1.0"))
+TEMPLATE_SEVERITIES = {"LOW"}
+MAX_ENTRIES = 5000
+
+# Continuous summary fields and how far apart two windows may be
+TOLERANCES = {
+    "avg_speed": 2.0,     # km/h
+    "max_speed": 3.0,     # km/h
+    "speed_var": 2.0,
+    "mean_jerk": 0.1,     # m/s³
+    "yaw_var": 0.005,
+}
+
+_SUMMARY_RE = re.compile(
+    r"Avg/Max speed: (?P<avg_speed>[-\d.]+)/(?P<max_speed>[-\d.]+) km/h "
+    r"\(variance (?P<speed_var>[-\d.]+)\)\s*"
+    r"• Harsh brakes: (?P<brakes>\d+)\s*"
+    r"• Harsh accelerations: (?P<accels>\d+)\s*"
+    r"• Sharp corners: (?P<corners>\d+)\s*"
+    r"• Bumps: (?P<bumps>\d+)\s*"
+    r"• Mean jerk: (?P<mean_jerk>[-\d.]+) m/s³\s*"
+    r"• Yaw variance: (?P<yaw_var>[-\d.]+)"
+)
+_COUNTS = ("brakes", "accels", "corners", "bumps")
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[TEMPLATE_INDEX] {msg}")
+
+
+def summary_features(summary: str):
+    """
+    (counts tuple, {continuous field: value}) from a build_llm_summary()
+    string, or None if it is not in that format.
+    """
+    m = _SUMMARY_RE.search(summary)
+    if m is None:
+        return None
+    counts = tuple(int(m.group(k)) for k in _COUNTS)
+    values = {k: float(m.group(k)) for k in TOLERANCES}
+    return counts, values
+
+
+class TemplateIndex:
+    """
+    Thread-safe grid index of (summary numbers -> raw coaching text),
+    partitioned by scope (severity + sampling + model).
+    """
+
+    def __init__(self, tolerance_scale=TOLERANCE_SCALE, max_entries=MAX_ENTRIES):
+        self.tolerances = {k: v * tolerance_scale for k, v in TOLERANCES.items()}
+        self.enabled = tolerance_scale > 0
+        self.max_entries = max_entries
+
+        self._cells = {}  # (scope, counts, cell) -> [(values, text)]
+        self._order = deque()  # insertion order of (cell key, summary) for eviction
+        self._seen = set()  # (scope, summary) already indexed
+        self._lock = threading.Lock()
+
+        self.calls = 0    # every coaching request, any severity
+        self.lookups = 0  # requests that reached the index
+        self.hits = 0
+
+    def _cell(self, values):
+        return tuple(math.floor(values[k] / tol) for k, tol in self.tolerances.items())
+
+    def _within(self, a, b):
+        return all(abs(a[k] - b[k]) <= tol for k, tol in self.tolerances.items())
+
+    def _distance(self, a, b):
+        return max(abs(a[k] - b[k]) / tol for k, tol in self.tolerances.items())
+
+    def add(self, scope, summary: str, text: str):
+        if not self.enabled:
+            return
+        parsed = summary_features(summary)
+        if parsed is None:
+            return
+        counts, values = parsed
+
+        with self._lock:
+            if (scope, summary) in self._seen:
+                return
+            key = (scope, counts, self._cell(values))
+            self._cells.setdefault(key, []).append((summary, values, text))
+            self._order.append((key, summary))
+            self._seen.add((scope, summary))
+
+            while len(self._order) > self.max_entries:
+                old_key, old_summary = self._order.popleft()
+                entries = [e for e in self._cells.get(old_key, []) if e[0] != old_summary]
+                if entries:
+                    self._cells[old_key] = entries
+                else:
+                    self._cells.pop(old_key, None)
+                self._seen.discard((old_key[0], old_summary))
+
+    def count_call(self):
+        """
+        One coaching request, whatever path serves it: the denominator
+        of calls_saved_fraction.
+        """
+        with self._lock:
+            self.calls += 1
+
+    def lookup(self, scope, summary: str):
+        """
+        Raw text of the nearest indexed window within tolerance, or None.
+        """
+        if not self.enabled:
+            return None
+        parsed = summary_features(summary)
+        if parsed is None:
+            return None
+        counts, values = parsed
+        cell = self._cell(values)
+
+        best, best_distance = None, None
+        with self._lock:
+            self.lookups += 1
+            for offset in itertools.product((-1, 0, 1), repeat=len(cell)):
+                neighbour = tuple(c + o for c, o in zip(cell, offset))
+                for _, other, text in self._cells.get((scope, counts, neighbour), ()):
+                    if not self._within(values, other):
+                        continue
+                    distance = self._distance(values, other)
+                    if best_distance is None or distance < best_distance:
+                        best, best_distance = text, distance
+            if best is not None:
+                self.hits += 1
+
+        if best is not None:
+            _log(f"Near-duplicate hit (distance {best_distance:.2f})")
+        return best
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._order),
+                "calls": self.calls,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                # every hit is an LLM call that did not happen
+                "calls_saved_fraction": self.hits / self.calls if self.calls else 0.0,
+            }
+
+
+TEMPLATE_INDEX = TemplateIndex()
@@ -0,0 +1,254 @@
+# backend/llm/worker_pool.py
+"""
+Optional out-of-process inference pool.
+
+LLMWorkerPool starts N worker processes, each with its own llama.cpp
+context over the same GGUF file. Weights are mmap'd (use_mmap=True), so
+the OS page cache holds a single copy shared by every worker; only the
+KV caches are per process. CPU cores are split evenly between workers.
+
+The front end talks to the pool through two local queues: jobs go out on
+a shared task queue (whichever worker is free takes the next one), and a
+dispatcher thread reads chunks and results back and resolves the waiting
+caller. complete() blocks like a local completion and streams chunks to
+on_piece as they arrive, so llm_engine can use the pool as its model.
+
+Workers that die take their running jobs with them (those fail); once no
+worker is left, every queued job fails and complete() refuses new work,
+so scheduler threads never wait on a pool that cannot answer. complete()
+also gives up after COMPLETE_TIMEOUT_S.
+
+Env:
+    LLM_POOL_WORKERS   worker processes (see llm_engine / load_llm)
+    LLM_POOL_TIMEOUT   seconds complete() waits for a result (default 600)
+"""
+
+import atexit
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+DEBUG = False
+
+COMPLETE_TIMEOUT_S = float(os.getenv("LLM_POOL_TIMEOUT", "600"))
+HEALTH_CHECK_S = 1.0
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[LLM_POOL] {msg}")
+
+
+def threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _worker_main(worker_id, model_path, n_ctx, n_threads, tasks, results):
+    """
+    Worker process: load the model, then serve tasks until None arrives.
+    """
+    from llama_cpp import Llama
+
+    from backend.llm.budget import complete_with_budget
+
+    try:
+        llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,
+            n_threads=n_threads,
+            use_mmap=True,
+            chat_format=None,
+            verbose=False,
+        )
+    except Exception as e:
+        results.put(("failed", worker_id, repr(e)))
+        return
+    results.put(("ready", worker_id, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        job_id, prompt, stop, params, budget = task
+        results.put(("start", job_id, worker_id))
+        try:
+            out = complete_with_budget(
+                llm, prompt, stop, params, budget,
+                on_piece=lambda piece: results.put(("chunk", job_id, piece)),
+            )
+            results.put(("done", job_id, out))
+        except Exception as e:
+            results.put(("error", job_id, repr(e)))
+
+
+class LLMWorkerPool:
+    """
+    Usage:
+        pool = LLMWorkerPool(model_path, workers=4)
+        pool.start()  # blocks until every worker has loaded the model
+        text, tokens, early_stop = pool.complete(prompt, stop, params, budget)
+    """
+
+    def __init__(self, model_path, workers=2, n_ctx=4096, n_threads=None):
+        self.model_path = model_path
+        self.workers = workers
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads or threads_per_worker(workers)
+
+        ctx = mp.get_context("spawn")  # fresh interpreters: no forked llama.cpp/GIL state
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(
+                target=_worker_main,
+                args=(i, model_path, n_ctx, self.n_threads, self._tasks, self._results),
+                daemon=True,
+                name=f"llm-worker-{i}",
+            )
+            for i in range(workers)
+        ]
+
+        self._ids = itertools.count()
+        self._jobs = {}      # job_id -> (Future, on_piece)
+        self._running = {}   # job_id -> worker_id
+        self._lock = threading.Lock()
+        self._dispatcher = None
+        self._closed = False
+        self._dead = False   # every worker process has exited
+
+    # --------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------
+
+    def start(self):
+        for p in self._procs:
+            p.start()
+
+        ready = 0
+        while ready < self.workers:
+            try:
+                kind, worker_id, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                if all(p.is_alive() for p in self._procs):
+                    continue
+                kind, worker_id, error = "failed", "?", "process exited during model load"
+            if kind == "failed":
+                self.close()
+                raise RuntimeError(f"LLM worker {worker_id} failed to load: {error}")
+            ready += 1
+        _log(f"{self.workers} workers ready ({self.n_threads} threads each)")
+
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True, name="llm-pool-dispatch")
+        self._dispatcher.start()
+        atexit.register(self.close)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._procs:
+            self._tasks.put(None)
+        for p in self._procs:
+            if p.is_alive():
+                p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+
+    # --------------------------------------------------
+    # Dispatch
+    # --------------------------------------------------
+
+    def _fail_dead_workers(self):
+        dead = {i for i, p in enumerate(self._procs) if not p.is_alive()}
+        if not dead:
+            return
+        with self._lock:
+            if len(dead) == len(self._procs):
+                # nobody left to take queued jobs either
+                if not self._dead:
+                    print(f"[LLM_POOL] All {len(dead)} workers died; failing {len(self._jobs)} jobs")
+                self._dead = True
+                lost = list(self._jobs)
+            else:
+                lost = [job_id for job_id, w in self._running.items() if w in dead]
+            for job_id in lost:
+                self._running.pop(job_id, None)
+                future, _ = self._jobs.pop(job_id, (None, None))
+                if future is not None:
+                    future.set_exception(RuntimeError("LLM worker process died"))
+
+    def _dispatch(self):
+        next_check = time.monotonic() + HEALTH_CHECK_S
+        while not self._closed:
+            # also while results keep flowing: one busy worker must not hide a dead one
+            if time.monotonic() >= next_check:
+                self._fail_dead_workers()
+                next_check = time.monotonic() + HEALTH_CHECK_S
+            try:
+                kind, job_id, payload = self._results.get(timeout=HEALTH_CHECK_S)
+            except queue.Empty:
+                continue
+
+            with self._lock:
+                if kind == "start":
+                    self._running[job_id] = payload
+                    continue
+                entry = self._jobs.get(job_id)
+                if kind in ("done", "error"):
+                    self._jobs.pop(job_id, None)
+                    self._running.pop(job_id, None)
+            if entry is None:
+                continue
+
+            future, on_piece = entry
+            if kind == "chunk":
+                if on_piece is not None:
+                    on_piece(payload)
+            elif kind == "done":
+                future.set_result(tuple(payload))
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def complete(self, prompt, stop, params, budget, on_piece=None):
+        """
+        Run one completion on the next free worker (see budget.complete_with_budget).
+        Blocks the calling thread; returns (text, completion_tokens, early_stop).
+        Raises RuntimeError if the workers are gone or no result arrives
+        within COMPLETE_TIMEOUT_S.
+        """
+        if self._closed:
+            raise RuntimeError("LLM worker pool is closed")
+        job_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            if self._dead:
+                raise RuntimeError("LLM worker pool has no live workers")
+            self._jobs[job_id] = (future, on_piece)
+        self._tasks.put((job_id, prompt, list(stop), dict(params), budget))
+        try:
+            return future.result(timeout=COMPLETE_TIMEOUT_S)
+        except FutureTimeout:
+            with self._lock:
+                # late chunks / results for this job are ignored from here on
+                self._jobs.pop(job_id, None)
+                self._running.pop(job_id, None)
+            raise RuntimeError(f"LLM worker pool: no result within {COMPLETE_TIMEOUT_S:g}s") from None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "alive": sum(p.is_alive() for p in self._procs),
+                "dead": self._dead,
+                "threads_per_worker": self.n_threads,
+                "queued": len(self._jobs) - len(self._running),
+                "running": len(self._running),
+            }
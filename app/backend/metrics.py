@@ -0,0 +1,75 @@
+# backend/metrics.py
+"""
+Small thread-safe metric helpers shared by the LLM, DB and auth layers:
+rolling latency percentiles and fixed-bucket histograms.
+"""
+
+import threading
+from collections import deque
+
+
+class LatencySamples:
+    """
+    Thread-safe rolling window of the last maxlen samples (seconds).
+    """
+
+    def __init__(self, maxlen=1000):
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def stats(self):
+        with self._lock:
+            values = sorted(self._samples)
+            count = self.count
+        if not values:
+            return {"count": count}
+
+        def pct(p):
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        return {
+            "count": count,
+            "mean": round(sum(values) / len(values), 4),
+            "p50": round(pct(0.50), 4),
+            "p95": round(pct(0.95), 4),
+            "max": round(values[-1], 4),
+        }
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: counts[i] = samples <= bounds[i], last bucket
+    is everything above the largest bound.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        with self._lock:
+            self.counts[i] += 1
+            self.total += value
+
+    def stats(self):
+        with self._lock:
+            counts = list(self.counts)
+            total = self.total
+        n = sum(counts)
+        labels = [f"<={b}" for b in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": n,
+            "mean": round(total / n, 3) if n else None,
+            "buckets": dict(zip(labels, counts)),
+        }
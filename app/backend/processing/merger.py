@@ -5,6 +5,8 @@ import numpy as np
 from scipy.signal import find_peaks
 from datetime import timedelta
 
+from backend.processing.sensor_binary import binary_path, is_fresh, read_sensor_binary
+
 # ================= CONFIG =================
 
 WINDOW_SECONDS = 30
@@ -17,6 +19,11 @@ LATERAL_G_THRESH = 0.35
 YAW_RATE_THRESH = 0.3
 BUMP_G_THRESH = 0.3
 
+# Columns the feature engine reads from each stream
+LOCATION_COLUMNS = ["speed"]
+ACCEL_COLUMNS = ["accelerationX", "accelerationY", "accelerationZ"]
+GYRO_COLUMNS = ["rotationRateZ"]
+
 DEBUG = False  # turn ON when debugging
 
 # ==========================================
@@ -27,11 +34,42 @@ def _log(msg):
         print(f"[MERGER] {msg}")
 
 
-def _load_csv(path, index_col="timestamp"):
+def merger_config():
+    """
+    Thresholds that shape the merged features.
+    Anything cached from merge_sensor_csvs must be keyed on this.
+    """
+    return (
+        ("WINDOW_SECONDS", WINDOW_SECONDS),
+        ("IMU_HZ", IMU_HZ),
+        ("HARSH_BRAKE_G", HARSH_BRAKE_G),
+        ("HARSH_ACCEL_G", HARSH_ACCEL_G),
+        ("LATERAL_G_THRESH", LATERAL_G_THRESH),
+        ("YAW_RATE_THRESH", YAW_RATE_THRESH),
+        ("BUMP_G_THRESH", BUMP_G_THRESH),
+    )
+
+
+def sensor_source(path):
+    """
+    The file _load_csv will actually read for a sensor CSV path:
+    its .sbin copy when that is up to date, otherwise the CSV itself.
+    """
+    return binary_path(path) if is_fresh(path) else path
+
+
+def _load_csv(path, index_col="timestamp", usecols=None):
+    if is_fresh(path):
+        df = read_sensor_binary(binary_path(path), usecols=usecols)
+        df.sort_index(inplace=True)
+        _log(f"Loaded {binary_path(path).name} ({len(df)} rows)")
+        return df
+
     if not path.exists():
         raise FileNotFoundError(f"Missing sensor file: {path}")
 
-    df = pd.read_csv(path, parse_dates=[index_col])
+    cols = None if usecols is None else [index_col, *usecols]
+    df = pd.read_csv(path, parse_dates=[index_col], usecols=cols)
     df.set_index(index_col, inplace=True)
     df.sort_index(inplace=True)
 
@@ -48,18 +86,256 @@ def merge_sensor_csvs(location_csv, accel_csv, gyro_csv, max_segments=None):
     """
 
     # ---------- Load ----------
-    location_df = _load_csv(location_csv)
-    accel_df = _load_csv(accel_csv)
-    gyro_df = _load_csv(gyro_csv)
+    location_df = _load_csv(location_csv, usecols=LOCATION_COLUMNS)
+    accel_df = _load_csv(accel_csv, usecols=ACCEL_COLUMNS)
+    gyro_df = _load_csv(gyro_csv, usecols=GYRO_COLUMNS)
 
     # ---------- Validation ----------
     if location_df.empty or accel_df.empty or gyro_df.empty:
         raise ValueError("One or more sensor CSVs are empty")
 
+    df = extract_window_features(location_df, accel_df, gyro_df, max_segments=max_segments)
+    _log(f"Generated {len(df)} windows")
+
+    return df
+
+
+# ================= WINDOW FEATURE ENGINE =================
+#
+# Every GPS timestamp opens a window [t, t + WINDOW_SECONDS] (both ends
+# inclusive, same as label slicing on a sorted DatetimeIndex).  Instead of
+# slicing the frames once per window, the engine resolves all window bounds
+# with searchsorted and reads per-window sums off cumulative sums.
+
+
+def _window_bounds(index, starts, ends):
+    """Positional [lo, hi) bounds of the inclusive label slices [start:end]."""
+    lo = index.searchsorted(starts, side="left")
+    hi = index.searchsorted(ends, side="right")
+    return lo, hi
+
+
+def _prefix(values):
+    """Cumulative sum with a leading zero, so window sums are c[hi] - c[lo]."""
+    out = np.zeros(len(values) + 1, dtype=np.float64)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _window_max(values, lo, hi):
+    """Max of values[lo:hi] per window via a sparse table (empty -> -inf)."""
+    n = len(values)
+    if n == 0:
+        return np.full(len(lo), -np.inf)
+
+    table = [values]
+    span = 1
+    while span * 2 <= n:
+        prev = table[-1]
+        table.append(np.maximum(prev[:-span], prev[span:]))
+        span *= 2
+
+    lengths = hi - lo
+    out = np.full(len(lo), -np.inf)
+    nonempty = lengths > 0
+    if nonempty.any():
+        k = np.floor(np.log2(lengths[nonempty])).astype(int)
+        l, h = lo[nonempty], hi[nonempty]
+        res = np.empty(len(k))
+        for level in np.unique(k):
+            sel = k == level
+            row = table[level]
+            res[sel] = np.maximum(row[l[sel]], row[h[sel] - (1 << level)])
+        out[nonempty] = res
+    return out
+
+
+def _window_variance(values, lo, hi):
+    """
+    Sample variance (ddof=1) of values[lo:hi], skipping NaN like pandas.
+    Values are centred on their global mean first to keep the
+    sum-of-squares form numerically stable.
+    """
+    valid = ~np.isnan(values)
+    centred = np.where(valid, values - (values[valid].mean() if valid.any() else 0.0), 0.0)
+
+    n = _prefix(valid)
+    s1 = _prefix(centred)
+    s2 = _prefix(centred * centred)
+
+    count = n[hi] - n[lo]
+    total = s1[hi] - s1[lo]
+    sq = s2[hi] - s2[lo]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (sq - total * total / count) / (count - 1)
+    var = np.where(count > 1, np.maximum(var, 0.0), np.nan)
+    return var, count
+
+
+def _peak_extents(signal):
+    """
+    Plateau edges of every find_peaks() peak over the whole signal.
+
+    A peak of the full signal is also a peak of a window slice exactly when
+    its plateau and both bracketing neighbours fall inside the slice, so the
+    per-window count only needs these edges.
+    """
+    _, props = find_peaks(signal, height=BUMP_G_THRESH, plateau_size=0)
+    return props["left_edges"], props["right_edges"]
+
+
+def extract_window_features(location_df, accel_df, gyro_df, max_segments=None):
+    """
+    Vectorized windowed feature extraction over loaded sensor frames.
+
+    Produces the same columns and values as the per-window reference
+    (_extract_window_features_loop) in a single pass.
+    """
+
+    timestamps = location_df.index
+    if len(timestamps) == 0:
+        return pd.DataFrame()
+
+    window = pd.Timedelta(seconds=WINDOW_SECONDS)
+
+    # ---------- Candidate windows ----------
+    # Windows stop at the first start whose end runs past the last GPS fix.
+    n_windows = int(timestamps.searchsorted(timestamps[-1] - window, side="right"))
+    starts = timestamps[:n_windows]
+    ends = starts + window
+
+    acc_lo, acc_hi = _window_bounds(accel_df.index, starts, ends)
+
+    # Require sufficient IMU coverage
+    min_samples = 0.7 * WINDOW_SECONDS * IMU_HZ
+    keep = np.flatnonzero((acc_hi - acc_lo) >= min_samples)
+    if DEBUG and len(keep) < n_windows:
+        _log(f"Skipping {n_windows - len(keep)} windows (insufficient IMU)")
+    if max_segments is not None and len(keep) > max_segments:
+        _log(f"Reached max_segments={max_segments}, stopping early")
+        keep = keep[:max_segments]
+
+    if len(keep) == 0:
+        return pd.DataFrame()
+
+    starts, ends = starts[keep], ends[keep]
+    acc_lo, acc_hi = acc_lo[keep], acc_hi[keep]
+    gyro_lo, gyro_hi = _window_bounds(gyro_df.index, starts, ends)
+    loc_lo, loc_hi = _window_bounds(location_df.index, starts, ends)
+
+    feat = {}
+
+    # ---------- Speed ----------
+    speed = location_df["speed"].to_numpy(dtype=np.float64)
+    speed_ok = ~np.isnan(speed)
+    speed_n = _prefix(speed_ok)
+    speed_sum = _prefix(np.where(speed_ok, speed, 0.0))
+    n_speed = speed_n[loc_hi] - speed_n[loc_lo]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_speed = (speed_sum[loc_hi] - speed_sum[loc_lo]) / n_speed
+    max_speed = _window_max(np.where(speed_ok, speed, -np.inf), loc_lo, loc_hi)
+    speed_var, _ = _window_variance(speed, loc_lo, loc_hi)
+
+    feat["avg_speed_kmh"] = np.where(n_speed > 0, np.round(mean_speed * 3.6, 1), 0.0)
+    feat["max_speed_kmh"] = np.where(n_speed > 0, np.round(max_speed * 3.6, 1), 0.0)
+    feat["speed_variance"] = np.where(n_speed > 1, np.round(speed_var, 2), 0.0)
+
+    # ---------- Longitudinal events ----------
+    ay = accel_df["accelerationY"].to_numpy(dtype=np.float64)
+    brakes = _prefix(ay < HARSH_BRAKE_G)
+    accels = _prefix(ay > HARSH_ACCEL_G)
+    feat["harsh_brake_count"] = (brakes[acc_hi] - brakes[acc_lo]).astype(np.int64)
+    feat["harsh_accel_count"] = (accels[acc_hi] - accels[acc_lo]).astype(np.int64)
+
+    # ---------- Cornering ----------
+    # Accel and gyro flags are combined on their (aligned) timestamps.
+    lateral = accel_df["accelerationX"].abs() > LATERAL_G_THRESH
+    yaw = gyro_df["rotationRateZ"].abs() > YAW_RATE_THRESH
+    corner = lateral & yaw
+    corner_c = _prefix(corner.to_numpy(dtype=bool))
+    c_lo, c_hi = _window_bounds(corner.index, starts, ends)
+    feat["sharp_corner_count"] = (corner_c[c_hi] - corner_c[c_lo]).astype(np.int64)
+
+    # ---------- Bumps ----------
+    z_adj = np.abs(accel_df["accelerationZ"].to_numpy(dtype=np.float64) + 1.0)  # remove gravity
+    left_edges, right_edges = _peak_extents(z_adj)
+    first = np.searchsorted(left_edges, acc_lo + 1, side="left")
+    last = np.searchsorted(right_edges, acc_hi - 2, side="right")
+    feat["bump_count"] = np.maximum(last - first, 0).astype(np.int64)
+
+    # ---------- Jerk ----------
+    abs_jerk = np.abs(np.diff(ay)) / DT
+    jerk_nan = _prefix(np.isnan(abs_jerk))
+    jerk_sum = _prefix(np.nan_to_num(abs_jerk, nan=0.0))
+    # diffs inside the window sit at positions [lo, hi - 1)
+    j_hi = np.maximum(acc_hi - 1, acc_lo)
+    n_jerk = j_hi - acc_lo
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_jerk = (jerk_sum[j_hi] - jerk_sum[acc_lo]) / n_jerk
+    mean_jerk = np.where(jerk_nan[j_hi] - jerk_nan[acc_lo] > 0, np.nan, mean_jerk)
+    feat["mean_abs_jerk"] = [
+        round(float(v), 3) if n else 0.0 for v, n in zip(mean_jerk, n_jerk)
+    ]
+
+    # ---------- Yaw stability ----------
+    yaw_var, _ = _window_variance(
+        gyro_df["rotationRateZ"].to_numpy(dtype=np.float64), gyro_lo, gyro_hi
+    )
+    feat["yaw_variance"] = [round(float(v), 6) for v in yaw_var]
+
+    return pd.DataFrame(feat)
+
+
+def _window_features(loc_win, accel_win, gyro_win):
+    """
+    Feature dict for one already-sliced window (reference implementation).
+    """
+
+    feat = {}
+
+    # ---------- Speed ----------
+    speeds = loc_win["speed"].dropna()
+    feat["avg_speed_kmh"] = round(speeds.mean() * 3.6, 1) if len(speeds) else 0.0
+    feat["max_speed_kmh"] = round(speeds.max() * 3.6, 1) if len(speeds) else 0.0
+    feat["speed_variance"] = round(speeds.var(), 2) if len(speeds) > 1 else 0.0
+
+    # ---------- Longitudinal events ----------
+    ay = accel_win["accelerationY"]
+    feat["harsh_brake_count"] = int((ay < HARSH_BRAKE_G).sum())
+    feat["harsh_accel_count"] = int((ay > HARSH_ACCEL_G).sum())
+
+    # ---------- Cornering ----------
+    lateral = accel_win["accelerationX"].abs() > LATERAL_G_THRESH
+    yaw = gyro_win["rotationRateZ"].abs() > YAW_RATE_THRESH
+    feat["sharp_corner_count"] = int((lateral & yaw).sum())
+
+    # ---------- Bumps ----------
+    z_adj = accel_win["accelerationZ"] + 1.0  # remove gravity
+    peaks, _ = find_peaks(z_adj.abs(), height=BUMP_G_THRESH)
+    feat["bump_count"] = int(len(peaks))
+
+    # ---------- Jerk ----------
+    jerk = np.diff(ay) / DT
+    feat["mean_abs_jerk"] = round(float(np.mean(np.abs(jerk))), 3) if len(jerk) else 0.0
+
+    # ---------- Yaw stability ----------
+    feat["yaw_variance"] = round(float(gyro_win["rotationRateZ"].var()), 6)
+
+    return feat
+
+
+def _extract_window_features_loop(location_df, accel_df, gyro_df, max_segments=None):
+    """
+    Original per-timestamp window loop. Kept as the reference the
+    vectorized engine is tested against (tests/test_merger_parity.py);
+    not used on the hot path.
+    """
+
     timestamps = location_df.index
     features = []
 
-    # ---------- Windowed feature extraction ----------
     for start_time in timestamps:
         end_time = start_time + timedelta(seconds=WINDOW_SECONDS)
         if end_time > timestamps[-1]:
@@ -75,42 +351,9 @@ def merge_sensor_csvs(location_csv, accel_csv, gyro_csv, max_segments=None):
             _log(f"Skipping window @ {start_time} (insufficient IMU)")
             continue
 
-        feat = {}
-
-        # ---------- Speed ----------
-        speeds = loc_win["speed"].dropna()
-        feat["avg_speed_kmh"] = round(speeds.mean() * 3.6, 1) if len(speeds) else 0.0
-        feat["max_speed_kmh"] = round(speeds.max() * 3.6, 1) if len(speeds) else 0.0
-        feat["speed_variance"] = round(speeds.var(), 2) if len(speeds) > 1 else 0.0
-
-        # ---------- Longitudinal events ----------
-        ay = accel_win["accelerationY"]
-        feat["harsh_brake_count"] = int((ay < HARSH_BRAKE_G).sum())
-        feat["harsh_accel_count"] = int((ay > HARSH_ACCEL_G).sum())
-
-        # ---------- Cornering ----------
-        lateral = accel_win["accelerationX"].abs() > LATERAL_G_THRESH
-        yaw = gyro_win["rotationRateZ"].abs() > YAW_RATE_THRESH
-        feat["sharp_corner_count"] = int((lateral & yaw).sum())
-
-        # ---------- Bumps ----------
-        z_adj = accel_win["accelerationZ"] + 1.0  # remove gravity
-        peaks, _ = find_peaks(z_adj.abs(), height=BUMP_G_THRESH)
-        feat["bump_count"] = int(len(peaks))
-
-        # ---------- Jerk ----------
-        jerk = np.diff(ay) / DT
-        feat["mean_abs_jerk"] = round(float(np.mean(np.abs(jerk))), 3) if len(jerk) else 0.0
-
-        # ---------- Yaw stability ----------
-        feat["yaw_variance"] = round(float(gyro_win["rotationRateZ"].var()), 6)
-
-        features.append(feat)
+        features.append(_window_features(loc_win, accel_win, gyro_win))
         if max_segments is not None and len(features) >= max_segments:
             _log(f"Reached max_segments={max_segments}, stopping early")
             break
 
-    df = pd.DataFrame(features)
-    _log(f"Generated {len(df)} windows")
-
-    return df
+    return pd.DataFrame(features)
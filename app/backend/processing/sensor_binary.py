@@ -0,0 +1,204 @@
+# backend/processing/sensor_binary.py
+"""
+Fixed-dtype binary format for raw sensor streams.
+
+A .sbin file sits next to its CSV (accelerometer_data.csv ->
+accelerometer_data.sbin) and stores the same rows column by column:
+
+    MAGIC | uint32 header length | JSON header | column blocks
+
+- timestamp: int64 nanoseconds since the epoch (timezone kept in the header)
+- every other column: float32
+
+Each column block is 64-byte aligned, so a reader can np.memmap exactly the
+columns it needs without touching the rest of the file.
+
+Usage (from app/):
+    python -m backend.processing.sensor_binary data/trips
+"""
+
+import argparse
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"DCSBIN1\n"
+SUFFIX = ".sbin"
+ALIGN = 64
+
+# Streams converted by default — the 25 Hz IMU files dominate parse time.
+DEFAULT_STREAMS = ("accelerometer_data.csv", "gyroscope_data.csv")
+
+
+def binary_path(csv_path) -> Path:
+    return Path(csv_path).with_suffix(SUFFIX)
+
+
+def is_fresh(csv_path) -> bool:
+    """
+    True if a binary copy exists and is at least as new as its CSV.
+    """
+    csv_path = Path(csv_path)
+    bin_path = binary_path(csv_path)
+    if not bin_path.exists():
+        return False
+    if not csv_path.exists():
+        return True
+    return bin_path.stat().st_mtime_ns >= csv_path.stat().st_mtime_ns
+
+
+def _pad(n):
+    return (-n) % ALIGN
+
+
+# ================= WRITE =================
+
+
+def write_sensor_binary(csv_path, out_path=None, index_col="timestamp") -> Path:
+    """
+    Convert one sensor CSV to .sbin. Returns the written path.
+    """
+    csv_path = Path(csv_path)
+    out_path = Path(out_path) if out_path else binary_path(csv_path)
+
+    df = pd.read_csv(csv_path, parse_dates=[index_col])
+    df.sort_values(index_col, kind="mergesort", inplace=True)
+
+    ts = pd.DatetimeIndex(df[index_col])
+    tz = str(ts.tz) if ts.tz is not None else None
+    if tz is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+
+    columns = [(index_col, ts.as_unit("ns").asi8.astype("<i8"))]
+    for col in df.columns:
+        if col == index_col:
+            continue
+        columns.append((col, df[col].to_numpy(dtype="<f4")))
+
+    # Header offsets are relative to the start of the data section.
+    layout = []
+    offset = 0
+    for name, arr in columns:
+        layout.append({"name": name, "dtype": arr.dtype.str, "offset": offset})
+        offset += arr.nbytes + _pad(arr.nbytes)
+
+    header = json.dumps({
+        "rows": int(len(df)),
+        "index": index_col,
+        "tz": tz,
+        "columns": layout,
+    }).encode()
+
+    prefix = len(MAGIC) + 4 + len(header)
+    header += b" " * _pad(prefix)
+
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for _, arr in columns:
+            f.write(arr.tobytes())
+            f.write(b"\0" * _pad(arr.nbytes))
+    tmp.replace(out_path)
+
+    return out_path
+
+
+# ================= READ =================
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a sensor binary file: {path}")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+    header["data_offset"] = len(MAGIC) + 4 + length
+    return header
+
+
+def read_sensor_binary(path, usecols=None) -> pd.DataFrame:
+    """
+    Load a .sbin file as a DataFrame indexed by timestamp.
+
+    Only the requested columns are mapped; channels are widened to float64
+    so downstream maths matches the CSV path.
+    """
+    header = _read_header(path)
+    rows = header["rows"]
+    base = header["data_offset"]
+    layout = {c["name"]: c for c in header["columns"]}
+    index_col = header["index"]
+
+    def _map(name):
+        c = layout[name]
+        if rows == 0:
+            return np.empty(0, dtype=c["dtype"])
+        return np.memmap(path, dtype=c["dtype"], mode="r", offset=base + c["offset"], shape=(rows,))
+
+    names = [n for n in layout if n != index_col]
+    if usecols is not None:
+        missing = [c for c in usecols if c not in layout]
+        if missing:
+            raise KeyError(f"{Path(path).name} has no columns {missing}")
+        names = [n for n in names if n in usecols]
+
+    index = pd.DatetimeIndex(np.asarray(_map(index_col)).view("datetime64[ns]"), name=index_col)
+    if header["tz"] is not None:
+        index = index.tz_localize("UTC").tz_convert(header["tz"])
+
+    return pd.DataFrame(
+        {n: np.asarray(_map(n), dtype=np.float64) for n in names},
+        index=index,
+    )
+
+
+# ================= CLI =================
+
+
+def convert_tree(root, streams=DEFAULT_STREAMS, force=False):
+    """
+    Convert every matching sensor CSV under root. Returns (converted, skipped).
+    """
+    converted, skipped = 0, 0
+    for name in streams:
+        for csv_path in sorted(Path(root).rglob(name)):
+            if not force and is_fresh(csv_path):
+                skipped += 1
+                continue
+            out = write_sensor_binary(csv_path)
+            print(f"[SENSOR_BINARY] {csv_path} -> {out.name}")
+            converted += 1
+    return converted, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert sensor CSVs to memory-mappable .sbin files.")
+    parser.add_argument("paths", nargs="+", help="CSV files or directories to scan")
+    parser.add_argument("--stream", action="append", dest="streams",
+                        help=f"CSV file name to convert when scanning directories (default: {', '.join(DEFAULT_STREAMS)})")
+    parser.add_argument("--force", action="store_true", help="rewrite binaries that are already up to date")
+    args = parser.parse_args(argv)
+
+    streams = tuple(args.streams) if args.streams else DEFAULT_STREAMS
+    converted, skipped = 0, 0
+    for p in map(Path, args.paths):
+        if p.is_dir():
+            c, s = convert_tree(p, streams, args.force)
+            converted += c
+            skipped += s
+        elif args.force or not is_fresh(p):
+            print(f"[SENSOR_BINARY] {p} -> {write_sensor_binary(p).name}")
+            converted += 1
+        else:
+            skipped += 1
+
+    print(f"[SENSOR_BINARY] converted={converted} up_to_date={skipped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# backend/processing/stream_merger.py
+"""
+Incremental version of merge_sensor_csvs for live trips.
+
+StreamingMerger accepts chunks of GPS / accelerometer / gyroscope samples as
+they arrive and emits each WINDOW_SECONDS window as soon as it has closed,
+with the same features (and the same window rules) as the batch merger:
+
+- every GPS fix opens a window [t, t + WINDOW_SECONDS], both ends inclusive
+- a window closes once every stream has a sample past its end
+- windows with too little IMU coverage are skipped
+
+A stream that never delivers (trips without IMU data, a stalled sensor)
+must not hold windows open forever: once GPS is more than
+STALL_TOLERANCE_WINDOWS windows past a window's end, the window is closed
+with whatever samples arrived (usually skipped for insufficient IMU).
+MAX_PENDING caps the open windows as a backstop.
+
+Only samples newer than the oldest still-open window are kept, so per-driver
+memory stays at roughly one window however long the trip runs.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from backend.processing import merger
+from backend.processing.merger import (
+    ACCEL_COLUMNS,
+    GYRO_COLUMNS,
+    LOCATION_COLUMNS,
+    _window_features,
+)
+
+DEBUG = False
+
+STALL_TOLERANCE_WINDOWS = 1
+MAX_PENDING = 512
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[STREAM_MERGER] {msg}")
+
+
+def _to_ns(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert("UTC").tz_localize(None)
+    return index.as_unit("ns").asi8
+
+
+class _SampleBuffer:
+    """
+    Compacting ring buffer of (timestamp_ns, channels) for one stream.
+    Storage is reused in place; it only grows if the live span does.
+    """
+
+    def __init__(self, columns, capacity=1024):
+        self.columns = list(columns)
+        self._ts = np.empty(capacity, dtype=np.int64)
+        self._vals = np.empty((capacity, len(self.columns)), dtype=np.float64)
+        self._head = 0
+        self._tail = 0
+
+    def __len__(self):
+        return self._tail - self._head
+
+    @property
+    def last_ts(self):
+        return self._ts[self._tail - 1] if len(self) else None
+
+    def append(self, ts, vals):
+        n = len(ts)
+        if n == 0:
+            return
+
+        if self._tail + n > len(self._ts):
+            live = len(self)
+            if live + n > len(self._ts):
+                cap = max(2 * len(self._ts), live + n)
+                ts_new = np.empty(cap, dtype=np.int64)
+                vals_new = np.empty((cap, len(self.columns)), dtype=np.float64)
+            else:
+                ts_new, vals_new = self._ts, self._vals
+            ts_new[:live] = self._ts[self._head:self._tail]
+            vals_new[:live] = self._vals[self._head:self._tail]
+            self._ts, self._vals = ts_new, vals_new
+            self._head, self._tail = 0, live
+
+        self._ts[self._tail:self._tail + n] = ts
+        self._vals[self._tail:self._tail + n] = vals
+        self._tail += n
+
+    def drop_before(self, ts):
+        """Forget samples strictly older than ts."""
+        live = self._ts[self._head:self._tail]
+        self._head += int(np.searchsorted(live, ts, side="left"))
+
+    def window(self, start, end, tz):
+        """DataFrame of samples with start <= ts <= end (label-slice semantics)."""
+        live = self._ts[self._head:self._tail]
+        lo = self._head + int(np.searchsorted(live, start, side="left"))
+        hi = self._head + int(np.searchsorted(live, end, side="right"))
+
+        index = pd.DatetimeIndex(self._ts[lo:hi].view("datetime64[ns]"))
+        if tz is not None:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        return pd.DataFrame(self._vals[lo:hi].copy(), index=index, columns=self.columns)
+
+
+class StreamingMerger:
+    """
+    Stateful, per-trip window feature extractor.
+
+    Usage:
+        sm = StreamingMerger()
+        for loc, acc, gyro in chunks:
+            for start, feat in sm.push(location=loc, accel=acc, gyro=gyro):
+                ...
+        for start, feat in sm.finish():
+            ...
+
+    Chunks are DataFrames indexed by timestamp; each stream must arrive in
+    time order across chunks. feat has the same keys as a row of
+    merge_sensor_csvs().
+    """
+
+    def __init__(self):
+        self._location = _SampleBuffer(LOCATION_COLUMNS, capacity=4 * merger.WINDOW_SECONDS)
+        self._accel = _SampleBuffer(ACCEL_COLUMNS, capacity=4 * merger.WINDOW_SECONDS * merger.IMU_HZ)
+        self._gyro = _SampleBuffer(GYRO_COLUMNS, capacity=4 * merger.WINDOW_SECONDS * merger.IMU_HZ)
+        self._pending = deque()  # open window start times (ns)
+        self._tz = None
+        self.windows_emitted = 0
+        self.windows_skipped = 0
+
+    # --------------------------------------------------
+    # Input
+    # --------------------------------------------------
+
+    def _ingest(self, buf, chunk):
+        if chunk is None or len(chunk) == 0:
+            return None
+
+        chunk = chunk.sort_index(kind="mergesort")
+        if self._tz is None and isinstance(chunk.index, pd.DatetimeIndex):
+            self._tz = chunk.index.tz
+
+        ts = _to_ns(chunk.index)
+        if buf.last_ts is not None and ts[0] < buf.last_ts:
+            raise ValueError("Sensor samples must arrive in time order")
+
+        buf.append(ts, chunk[buf.columns].to_numpy(dtype=np.float64))
+        return ts
+
+    def push(self, location=None, accel=None, gyro=None):
+        """
+        Add new samples and return [(window_start, features), ...] for
+        every window that closed as a result.
+        """
+        gps_ts = self._ingest(self._location, location)
+        if gps_ts is not None:
+            self._pending.extend(int(t) for t in gps_ts)
+        self._ingest(self._accel, accel)
+        self._ingest(self._gyro, gyro)
+
+        gps_mark = self._location.last_ts
+        if gps_mark is None:
+            return []
+
+        # samples exactly at the watermark could still be joined by more
+        marks = [b.last_ts for b in (self._location, self._accel, self._gyro)]
+        watermark = min(marks) if all(m is not None for m in marks) else None
+        # a stream this far behind GPS (or silent) no longer holds windows open
+        stale = gps_mark - int(STALL_TOLERANCE_WINDOWS * merger.WINDOW_SECONDS * 1e9)
+
+        return self._emit(lambda end: (
+            (watermark is not None and end < watermark)
+            or end < stale
+            or len(self._pending) > MAX_PENDING
+        ))
+
+    def finish(self):
+        """
+        End of trip: emit the windows the batch merger would still produce
+        (those ending on or before the last GPS fix).
+        """
+        last_gps = self._location.last_ts
+        if last_gps is None:
+            return []
+        out = self._emit(lambda end: end <= last_gps)
+        self._pending.clear()
+        return out
+
+    # --------------------------------------------------
+    # Windowing
+    # --------------------------------------------------
+
+    def _emit(self, closed):
+        span = int(merger.WINDOW_SECONDS * 1e9)
+        min_samples = 0.7 * merger.WINDOW_SECONDS * merger.IMU_HZ
+        out = []
+
+        while self._pending and closed(self._pending[0] + span):
+            start = self._pending.popleft()
+            end = start + span
+
+            accel_win = self._accel.window(start, end, self._tz)
+            if len(accel_win) < min_samples:
+                self.windows_skipped += 1
+                _log(f"Skipping window @ {start} (insufficient IMU)")
+                continue
+
+            feat = _window_features(
+                self._location.window(start, end, self._tz),
+                accel_win,
+                self._gyro.window(start, end, self._tz),
+            )
+            ts = pd.Timestamp(start, unit="ns", tz="UTC")
+            out.append((ts.tz_convert(self._tz) if self._tz is not None else ts.tz_localize(None), feat))
+            self.windows_emitted += 1
+
+        self._trim()
+        return out
+
+    def _trim(self):
+        if self._pending:
+            floor = self._pending[0]
+        elif self._location.last_ts is not None:
+            floor = self._location.last_ts  # next window can't start earlier
+        else:
+            return
+        for buf in (self._location, self._accel, self._gyro):
+            buf.drop_before(floor)
@@ -0,0 +1,173 @@
+# backend/registry/feature_cache.py
+"""
+Process-wide cache of merged trip feature dataframes.
+
+Every TripRegistry in the process shares FEATURE_CACHE, so a trip is
+parsed and merged once no matter how many views ask for it.
+
+- Entries are keyed on the trip and validated against a fingerprint
+  (sensor file mtimes/sizes + merger config); a changed fingerprint is a miss.
+- LRU eviction keeps the total dataframe size under a byte budget.
+- Concurrent requests for the same trip wait on a single load.
+
+Cached dataframes are shared between callers: treat them as read-only.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+DEBUG = False
+
+DEFAULT_MAX_BYTES = int(os.getenv("TRIP_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[FEATURE_CACHE] {msg}")
+
+
+def file_fingerprint(paths):
+    """(name, mtime_ns, size) for each file — changes whenever a file is rewritten."""
+    out = []
+    for p in paths:
+        st = os.stat(p)
+        out.append((os.fspath(p), st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def _df_nbytes(df):
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+class _InFlight:
+    """A load in progress; other callers for the same key wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TripFeatureCache:
+    """
+    Thread-safe LRU cache: trip_key -> (fingerprint, dataframe, nbytes).
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    # --------------------------------------------------
+    # Lookup
+    # --------------------------------------------------
+
+    def get_or_load(self, trip_key, fingerprint, loader):
+        """
+        Return the cached dataframe for trip_key if its fingerprint still
+        matches, otherwise call loader() once and cache the result.
+        """
+        full_key = (trip_key, fingerprint)
+
+        with self._lock:
+            entry = self._entries.get(trip_key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(trip_key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._inflight.get(full_key)
+            if flight is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                self.misses += 1
+                flight = _InFlight()
+                self._inflight[full_key] = flight
+                owner = True
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            _log(f"Loading {trip_key}")
+            value = loader()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._inflight.pop(full_key, None)
+            flight.done.set()
+            raise
+
+        flight.value = value
+        with self._lock:
+            self._store(trip_key, fingerprint, value)
+            self._inflight.pop(full_key, None)
+        flight.done.set()
+        return value
+
+    def _store(self, trip_key, fingerprint, value):
+        # caller holds self._lock
+        old = self._entries.pop(trip_key, None)
+        if old is not None:
+            self._bytes -= old[2]
+
+        nbytes = _df_nbytes(value)
+        if nbytes > self.max_bytes:
+            _log(f"Not caching {trip_key}: {nbytes} bytes exceeds budget")
+            return
+
+        self._entries[trip_key] = (fingerprint, value, nbytes)
+        self._bytes += nbytes
+
+        while self._bytes > self.max_bytes and self._entries:
+            evicted_key, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+            self._bytes -= evicted_bytes
+            self.evictions += 1
+            _log(f"Evicted {evicted_key}")
+
+    # --------------------------------------------------
+    # Maintenance
+    # --------------------------------------------------
+
+    def invalidate(self, trip_key):
+        with self._lock:
+            old = self._entries.pop(trip_key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            }
+
+
+FEATURE_CACHE = TripFeatureCache()
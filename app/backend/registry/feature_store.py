@@ -0,0 +1,134 @@
+# backend/registry/feature_store.py
+"""
+On-disk columnar store for merged trip windows.
+
+The output of merge_sensor_csvs is written next to the sensor CSVs as
+
+    <trip_dir>/.features/<version>/<column>.npy  (one array per column)
+    <trip_dir>/.features/<version>/meta.json
+
+<version> hashes the merger thresholds, max_segments, STORE_FORMAT and the
+source files' mtime/size, so any change there simply points at a new
+directory and the old one is rebuilt (and cleaned up) on the next load.
+Columns are memory-mapped on read.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from backend.processing.merger import merger_config
+from backend.registry.feature_cache import file_fingerprint
+
+DEBUG = False
+USE_FEATURE_STORE = os.getenv("FEATURE_STORE", "1") != "0"
+
+STORE_DIRNAME = ".features"
+STORE_FORMAT = 1
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[FEATURE_STORE] {msg}")
+
+
+def store_version(source_paths, max_segments=None) -> str:
+    """
+    Version tag for a trip's features: config + sources + format.
+    """
+    sources = [
+        (Path(name).name, mtime, size)
+        for name, mtime, size in file_fingerprint(source_paths)
+    ]
+    payload = repr((STORE_FORMAT, merger_config(), max_segments, sources))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def read_features(trip_dir, version):
+    """
+    Memory-mapped read of a stored feature frame, or None if absent.
+    """
+    store = Path(trip_dir) / STORE_DIRNAME / version
+    meta_path = store / "meta.json"
+    if not meta_path.exists():
+        return None
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        columns = {}
+        for col in meta["columns"]:
+            arr = np.load(store / f"{col}.npy", mmap_mode="r")
+            if len(arr) != meta["rows"]:
+                raise ValueError(f"column {col} has {len(arr)} rows, expected {meta['rows']}")
+            columns[col] = arr
+    except Exception as e:
+        _log(f"Ignoring unreadable store {store}: {e}")
+        return None
+
+    _log(f"Read {store}")
+    return pd.DataFrame(columns, index=pd.RangeIndex(meta["rows"]))
+
+
+def write_features(trip_dir, version, df):
+    """
+    Write df under <trip_dir>/.features/<version> and drop older versions.
+    Non-fatal: a read-only data directory just means no sidecar.
+    """
+    root = Path(trip_dir) / STORE_DIRNAME
+    final = root / version
+
+    try:
+        root.mkdir(exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=root))
+
+        for col in df.columns:
+            np.save(tmp / f"{col}.npy", df[col].to_numpy(), allow_pickle=False)
+
+        meta = {
+            "format": STORE_FORMAT,
+            "rows": int(len(df)),
+            "columns": [str(c) for c in df.columns],
+            "config": dict(merger_config()),
+        }
+        with open(tmp / "meta.json", "w") as f:
+            json.dump(meta, f)
+
+        try:
+            os.rename(tmp, final)
+        except OSError:
+            # another process published the same version first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        for old in root.iterdir():
+            if old.name != final.name and not old.name.startswith("."):
+                shutil.rmtree(old, ignore_errors=True)
+
+        _log(f"Wrote {final}")
+    except Exception as e:
+        print(f"[FEATURE_STORE] Write failed (non-fatal): {e}")
+
+
+def load_or_build(trip_dir, source_paths, max_segments, build):
+    """
+    Return stored features for the trip, or build() them and store the result.
+    """
+    if not USE_FEATURE_STORE:
+        return build()
+
+    version = store_version(source_paths, max_segments)
+
+    df = read_features(trip_dir, version)
+    if df is not None:
+        return df
+
+    df = build()
+    write_features(trip_dir, version, df)
+    return df
@@ -0,0 +1,147 @@
+# backend/registry/fleet_batch.py
+"""
+Fleet-wide batch precompute of trip features and severities.
+
+Fans merge_sensor_csvs + assign_severity out over every driver/trip
+directory with a process pool. Trips go through TripRegistry._load_trip_df,
+so results land in the on-disk feature store and later UI loads are cheap.
+A failing trip (e.g. missing IMU files) is reported and skipped.
+
+Usage (from app/):
+    python -m backend.registry.fleet_batch data/trips --workers 8
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+
+def _process_trip(registry, driver_id, trip_id):
+    t0 = time.perf_counter()
+    try:
+        severities = registry.list_segment_severities(driver_id, trip_id)
+        return {
+            "driver_id": driver_id,
+            "trip_id": trip_id,
+            "status": "ok",
+            "segments": len(severities),
+            "severities": [s["severity"] for s in severities],
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
+    except Exception as e:
+        return {
+            "driver_id": driver_id,
+            "trip_id": trip_id,
+            "status": "error",
+            "error": f"{type(e).__name__}: {e}",
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
+
+
+def _process_chunk(data_root, chunk):
+    """Worker entry point: one registry per chunk, one result per trip."""
+    from backend.registry.trip_registry import TripRegistry
+
+    registry = TripRegistry(Path(data_root))
+    return [_process_trip(registry, d, t) for d, t in chunk]
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _print_progress(done, total, result):
+    status = result["status"]
+    detail = f"{result['segments']} segments" if status == "ok" else result["error"]
+    print(f"[FLEET_BATCH] {done}/{total} {result['driver_id']}/{result['trip_id']}: {status} ({detail})")
+
+
+def process_fleet(registry, workers=None, chunksize=None, progress=None):
+    """
+    Process every trip known to registry in parallel.
+
+    Args:
+        workers:   process count (default: os.cpu_count())
+        chunksize: trips per scheduled task (default: ~4 tasks per worker)
+        progress:  callback(done, total, result) after each trip
+
+    Returns:
+        list of per-trip result dicts, in driver/trip order.
+    """
+    tasks = [
+        (driver_id, trip_id)
+        for driver_id in registry.list_drivers()
+        for trip_id in registry.list_trips(driver_id)
+    ]
+    if not tasks:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+    results = {}
+    done = 0
+
+    if workers == 1:
+        for chunk in _chunks(tasks, chunksize):
+            for r in _process_chunk(registry.data_root, chunk):
+                results[(r["driver_id"], r["trip_id"])] = r
+                done += 1
+                if progress:
+                    progress(done, len(tasks), r)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_process_chunk, str(registry.data_root), chunk)
+                for chunk in _chunks(tasks, chunksize)
+            ]
+            for fut in as_completed(futures):
+                for r in fut.result():
+                    results[(r["driver_id"], r["trip_id"])] = r
+                    done += 1
+                    if progress:
+                        progress(done, len(tasks), r)
+
+    return [results[t] for t in tasks]
+
+
+def main(argv=None):
+    from backend.registry.trip_registry import TripRegistry
+
+    parser = argparse.ArgumentParser(description="Precompute trip features and severities for the whole fleet.")
+    parser.add_argument("data_root", nargs="?", default="data/trips")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=None, help="trips per scheduled task")
+    parser.add_argument("--out", help="write per-trip results as JSON to this file")
+    parser.add_argument("--quiet", action="store_true", help="no per-trip progress lines")
+    args = parser.parse_args(argv)
+
+    registry = TripRegistry(Path(args.data_root))
+
+    t0 = time.perf_counter()
+    results = process_fleet(
+        registry,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        progress=None if args.quiet else _print_progress,
+    )
+    elapsed = time.perf_counter() - t0
+
+    ok = sum(r["status"] == "ok" for r in results)
+    print(
+        f"[FLEET_BATCH] {ok}/{len(results)} trips ok in {elapsed:.2f}s "
+        f"({len(results) / elapsed if elapsed else 0.0:.1f} trips/s)"
+    )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,12 @@
 from pathlib import Path
 import pandas as pd
 
-from backend.processing.merger import merge_sensor_csvs
+from backend.processing.merger import merge_sensor_csvs, merger_config, sensor_source
+from backend.registry.feature_cache import FEATURE_CACHE, file_fingerprint
+from backend.registry.feature_store import load_or_build
 from backend.processing.severity import build_llm_summary, assign_severity
-from backend.llm.llm_engine import get_coaching_feedback
+from backend.llm.llm_engine import coach_text, get_coaching_feedback
+from backend.db.response_reader import RESPONSE_READER
 # from backend.llm.llm_engine import is_initialized
 
 # if not is_initialized():
@@ -56,7 +59,13 @@ class TripRegistry:
         first_idx = segments[0]
         return [self.process_trip_segment(driver_id, trip_id, first_idx)]
 
-            
+    def process_fleet(self, workers=None, progress=None):
+        """
+        Precompute features + severities for every driver/trip in parallel.
+        Per-trip failures are returned, not raised.
+        """
+        from backend.registry.fleet_batch import process_fleet
+        return process_fleet(self, workers=workers, progress=progress)
 
     # --------------------------------------------------
     # Debug helpers
@@ -77,6 +86,12 @@ class TripRegistry:
         finally:
             llm_engine.USE_STUB = old_stub
 
+    def cache_stats(self):
+        """
+        Hit/miss counters of the shared trip feature cache.
+        """
+        return FEATURE_CACHE.stats()
+
     def list_segments(self, driver_id: str, trip_id: str) -> int:
         """
         Return number of segments for a trip.
@@ -86,16 +101,45 @@ class TripRegistry:
         # each row == one 30s window
         return list(df.index)
 
-    def process_trip_segment(self, driver_id: str, trip_id: str, idx: int):
+    def segment_summary(self, driver_id: str, trip_id: str, idx: int):
+        """
+        (summary, severity) of one segment, without calling the LLM.
+        """
         df = self._load_trip_df(driver_id, trip_id)
 
         if idx not in df.index:
             raise ValueError("Invalid segment index")
 
         row_dict = df.loc[idx].to_dict()
+        return build_llm_summary(row_dict), assign_severity(row_dict)
+
+    def stored_segments(self, driver_id: str, trip_id: str):
+        """
+        Segment indices of a trip with coaching in driver_responses
+        (one index-only query, no trip data loaded).
+        """
+        return RESPONSE_READER.stored_segments(driver_id, trip_id)
+
+    def stored_trip_segment(self, driver_id: str, trip_id: str, idx: int):
+        """
+        Coach-side result from coaching already in driver_responses, or None.
+        A stored row only counts if it was generated for the same summary.
+        """
+        summary, severity = self.segment_summary(driver_id, trip_id, idx)
+        stored = RESPONSE_READER.latest_response(driver_id, trip_id, idx)
+        if stored is None or stored["summary"] != summary:
+            return None
+
+        return {
+            "window_index": idx,
+            "severity": severity,
+            "summary": summary,
+            "coaching": coach_text(stored["coaching"]),
+            "source": "stored",
+        }
 
-        summary = build_llm_summary(row_dict)
-        severity = assign_severity(row_dict)
+    def process_trip_segment(self, driver_id: str, trip_id: str, idx: int):
+        summary, severity = self.segment_summary(driver_id, trip_id, idx)
         print(f">>> Calling Coach LLM for trip {trip_id}, window {idx}")
         coaching = get_coaching_feedback(summary, severity, True)
         
@@ -106,12 +150,17 @@ class TripRegistry:
             "severity": severity,
             "summary": summary,
             "coaching": coaching,
+            "source": "llm",
         }
     
     def _load_trip_df(self, driver_id: str, trip_id: str):
         """
         Load and merge sensor CSVs into a dataframe.
         Each row corresponds to one 30s segment.
+
+        Served from the process-wide FEATURE_CACHE, then the on-disk
+        feature store; the returned dataframe is shared, so callers must
+        not modify it.
         """
         trip_dir = self.data_root / driver_id / trip_id
 
@@ -127,9 +176,20 @@ class TripRegistry:
                 raise FileNotFoundError(f"Missing file: {f.name}")
 
         # 🔑 single source of truth for segmentation
-        df = merge_sensor_csvs(loc, acc, gyro, max_segments=MAX_SEGMENTS)
-
-        return df
+        sources = tuple(sensor_source(f) for f in (loc, acc, gyro))
+        trip_key = (str(trip_dir.resolve()), MAX_SEGMENTS)
+        fingerprint = (file_fingerprint(sources), merger_config())
+
+        return FEATURE_CACHE.get_or_load(
+            trip_key,
+            fingerprint,
+            lambda: load_or_build(
+                trip_dir,
+                sources,
+                MAX_SEGMENTS,
+                lambda: merge_sensor_csvs(loc, acc, gyro, max_segments=MAX_SEGMENTS),
+            ),
+        )
 
     def list_segment_severities(self, driver_id: str, trip_id: str):
         """
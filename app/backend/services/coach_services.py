@@ -1,6 +1,7 @@
 from pathlib import Path
 from backend.registry.trip_registry import TripRegistry
 from backend.state.global_state import GLOBAL_STATE
+from backend.llm.load_llm import llm_status
 
 DATA_ROOT = Path("data/trips")
 _registry = TripRegistry(DATA_ROOT)
@@ -14,11 +15,13 @@ def get_driver_status(driver_id: str):
     if not driver_dir.exists():
         return None
 
+    return GLOBAL_STATE.get_driver_status(driver_id)
 
-    return {
-        "driver_id": driver_id,
-        "online": driver_id in GLOBAL_STATE.active_drivers
-    }
+def online_drivers():
+    """
+    Set of driver_ids online now; one lock-free pass however big the fleet.
+    """
+    return GLOBAL_STATE.online_drivers()
 
 def list_drivers():
     if not DATA_ROOT.exists():
@@ -41,8 +44,30 @@ def list_trips(driver_id):
 def list_segments(driver_id, trip_id):
     return _registry.list_segments(driver_id, trip_id)
 
+def stored_segments(driver_id, trip_id):
+    """
+    Segment indices that already have stored coaching.
+    """
+    return _registry.stored_segments(driver_id, trip_id)
+
+def stored_analysis(driver_id, trip_id, segment_idx):
+    """
+    Coaching already stored for this segment (milliseconds), or None.
+    """
+    return _registry.stored_trip_segment(driver_id, trip_id, segment_idx)
+
 def analyze_segment(driver_id, trip_id, segment_idx):
+    """
+    Generate coaching with the LLM (try stored_analysis first).
+    """
     return _registry.process_trip_segment(driver_id, trip_id, segment_idx)
 
 def get_segment_severities(driver_id: str, trip_id: str):
     return _registry.list_segment_severities(driver_id, trip_id)
+
+def get_llm_status():
+    """
+    Model readiness: {"state": idle|loading|ready|failed, ...}.
+    Severity browsing never needs the model; analyze_segment queues until ready.
+    """
+    return llm_status()
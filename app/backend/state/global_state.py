@@ -1,42 +1,135 @@
+import os
 import time
 from threading import Lock
+from types import MappingProxyType
 
-current_user_id = None
-current_role = None
+# Who is logged in is per browser session: see session_registry.py.
+
+# A driver is online from login until logout, or until no heartbeat
+# (driver dashboard timer) has arrived for PRESENCE_TTL_S.
+PRESENCE_TTL_S = float(os.getenv("PRESENCE_TTL", "60"))
+PRUNE_INTERVAL_S = 10.0
 
 
 class GlobalState:
-    def __init__(self):
-        self.active_drivers = {}
+    """
+    Driver presence.
+
+    Writers (login, logout, pruning) take the lock and publish a new
+    read-only {driver_id: {"name", "since"}} snapshot; heartbeats only
+    overwrite an existing driver's timestamp. Readers never lock: they
+    read the current snapshot and the timestamps, so status checks for
+    thousands of drivers don't contend with logins.
+    """
+
+    def __init__(self, ttl_s=PRESENCE_TTL_S):
+        self.ttl_s = ttl_s
         self.lock = Lock()
+        self._drivers = MappingProxyType({})  # replaced, never mutated
+        self._last_seen = {}                  # driver_id -> monotonic time
+        self._next_prune = time.monotonic() + PRUNE_INTERVAL_S
+
+    # --------------------------------------------------
+    # Writes
+    # --------------------------------------------------
+
+    def _publish(self, drivers):
+        # caller holds self.lock
+        self._drivers = MappingProxyType(drivers)
 
     def driver_login(self, driver_id, name=None):
+        now = time.monotonic()
         with self.lock:
             print(">>> DRIVER LOGIN:", driver_id)
-            self.active_drivers[driver_id] = {
-                "name": name or driver_id
+            drivers = self._drivers.copy()
+            previous = drivers.get(driver_id)
+            drivers[driver_id] = {
+                "name": name or driver_id,
+                "since": previous["since"] if previous else time.time(),
             }
-            print(">>> ACTIVE DRIVERS NOW:", self.active_drivers)
+            self._last_seen[driver_id] = now  # before publishing: readers never miss it
+            self._publish(drivers)
+            self._prune(now)
+
+    def driver_logout(self, driver_id):
+        with self.lock:
+            print(">>> DRIVER LOGOUT:", driver_id)
+            if driver_id in self._drivers:
+                drivers = self._drivers.copy()
+                del drivers[driver_id]
+                self._publish(drivers)
+            self._last_seen.pop(driver_id, None)
+
+    def heartbeat(self, driver_id, name=None):
+        """
+        The driver's dashboard is still open. Lock-free for known drivers;
+        a driver that had expired (or never logged in here) comes back online.
+        """
+        now = time.monotonic()
+        if driver_id in self._drivers:
+            self._last_seen[driver_id] = now  # existing key: no resize, safe without the lock
+        else:
+            with self.lock:
+                if driver_id not in self._drivers:
+                    drivers = self._drivers.copy()
+                    drivers[driver_id] = {"name": name or driver_id, "since": time.time()}
+                    self._last_seen[driver_id] = now
+                    self._publish(drivers)
+        if now >= self._next_prune:
+            with self.lock:
+                self._prune(now)
+
+    def _prune(self, now):
+        # caller holds self.lock; drops drivers whose heartbeat went stale
+        if now < self._next_prune:
+            return
+        self._next_prune = now + PRUNE_INTERVAL_S
+        stale = [d for d in self._drivers if now - self._last_seen.get(d, 0.0) >= self.ttl_s]
+        if not stale:
+            return
+        drivers = self._drivers.copy()
+        for driver_id in stale:
+            del drivers[driver_id]
+            self._last_seen.pop(driver_id, None)
+        self._publish(drivers)
 
+    # --------------------------------------------------
+    # Lock-free reads
+    # --------------------------------------------------
+
+    def is_online(self, driver_id) -> bool:
+        cutoff = time.monotonic() - self.ttl_s
+        return driver_id in self._drivers and self._last_seen.get(driver_id, cutoff) > cutoff
 
     def get_driver_status(self, driver_id):
-        with self.lock:
-            return {
-                "driver_id": driver_id,
-                "online": driver_id in self.active_drivers
-            }
-    
-    def driver_login(self, driver_id, name=None):
-        print(">>> DRIVER LOGIN:", driver_id)
-        self.active_drivers[driver_id] = {
-            "name": name or driver_id
+        return {
+            "driver_id": driver_id,
+            "online": self.is_online(driver_id),
         }
-        print(">>> ACTIVE DRIVERS NOW:", self.active_drivers)
 
-    def driver_logout(self, driver_id):
-        with self.lock:
-            print(">>> DRIVER LOGOUT:", driver_id)
-            self.active_drivers.pop(driver_id, None)
-            print(">>> ACTIVE DRIVERS NOW:", self.active_drivers)
+    def online_drivers(self):
+        """
+        Set of driver_ids online right now (one pass over the snapshot).
+        """
+        cutoff = time.monotonic() - self.ttl_s
+        seen = self._last_seen.get
+        return {d for d in self._drivers if seen(d, cutoff) > cutoff}
+
+    def drivers_status(self, driver_ids):
+        """
+        {driver_id: online} for many drivers at once.
+        """
+        online = self.online_drivers()
+        return {d: d in online for d in driver_ids}
+
+    @property
+    def active_drivers(self):
+        """
+        Read-only {driver_id: {"name", "since"}} of online drivers.
+        """
+        cutoff = time.monotonic() - self.ttl_s
+        seen = self._last_seen.get
+        return MappingProxyType({d: info for d, info in self._drivers.items() if seen(d, cutoff) > cutoff})
+
 
 GLOBAL_STATE = GlobalState()
@@ -0,0 +1,176 @@
+# backend/state/session_registry.py
+"""
+Per-browser-session state, keyed by Gradio's session hash.
+
+Who is logged in (and anything a view keeps between events, like the
+coach's loaded trip dataframe) used to live in module globals, so a second
+user in another tab overwrote the first. Handlers now take a gr.Request
+and look up their own SessionState:
+
+    session = SESSION_REGISTRY.get(request.session_hash)
+    session.login(user_id, role)
+    ...
+    driver_id = SESSION_REGISTRY.user_id(request.session_hash)
+
+Lookups are O(1) (dict keyed by session hash, kept in last-access order).
+Memory is bounded: at most MAX_SESSIONS sessions, each with at most
+MAX_VALUES view values, and sessions idle for IDLE_TTL_S are evicted —
+on access, so no sweeper thread. Closing the tab ends the session
+immediately (Blocks.unload -> end()). on_evict callbacks run for every
+session that goes away, e.g. to mark a driver offline.
+
+Env:
+    SESSION_IDLE_TTL   seconds without an event before eviction (default 1800)
+    SESSION_MAX        live sessions kept per process (default 1000)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEBUG = False
+
+IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+MAX_SESSIONS = int(os.getenv("SESSION_MAX", "1000"))
+MAX_VALUES = 8
+
+
+def _log(msg):
+    if DEBUG:
+        print(f"[SESSION_REGISTRY] {msg}")
+
+
+class SessionState:
+    __slots__ = ("session_id", "user_id", "role", "last_seen", "_values", "_lock")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.user_id = None
+        self.role = None
+        self.last_seen = time.monotonic()
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def login(self, user_id, role):
+        with self._lock:
+            self.user_id = user_id
+            self.role = role
+
+    def logout(self):
+        with self._lock:
+            self.user_id = None
+            self.role = None
+            self._values.clear()
+
+    def get(self, name, default=None):
+        with self._lock:
+            return self._values.get(name, default)
+
+    def set(self, name, value):
+        """
+        Keep a view value; past MAX_VALUES the oldest one is dropped.
+        """
+        with self._lock:
+            self._values[name] = value
+            self._values.move_to_end(name)
+            while len(self._values) > MAX_VALUES:
+                self._values.popitem(last=False)
+
+    def pop(self, name, default=None):
+        with self._lock:
+            return self._values.pop(name, default)
+
+
+class SessionRegistry:
+    def __init__(self, idle_ttl_s=IDLE_TTL_S, max_sessions=MAX_SESSIONS):
+        self.idle_ttl_s = idle_ttl_s
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> SessionState, least recently seen first
+        self._lock = threading.Lock()
+        self._evict_callbacks = []
+
+        self.created = 0
+        self.evicted = 0
+
+    def on_evict(self, callback):
+        """
+        callback(SessionState) after a session is ended or evicted.
+        """
+        self._evict_callbacks.append(callback)
+
+    def _expire(self, now):
+        # caller holds self._lock; oldest first, so stop at the first live one
+        gone = []
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.idle_ttl_s and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            gone.append(session)
+        self.evicted += len(gone)
+        return gone
+
+    def _notify(self, sessions):
+        for session in sessions:
+            _log(f"Session {session.session_id} ended (user={session.user_id})")
+            for callback in self._evict_callbacks:
+                try:
+                    callback(session)
+                except Exception as e:
+                    print(f"[SESSION_REGISTRY] on_evict callback failed (non-fatal): {e}")
+
+    def get(self, session_id) -> SessionState:
+        """
+        The session's state, created on first use; marks it active.
+        """
+        now = time.monotonic()
+        with self._lock:
+            gone = self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = SessionState(session_id)
+                self._sessions[session_id] = session
+                self.created += 1
+                gone += self._expire(now)  # over MAX_SESSIONS: drop the least recent
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_seen = now
+        self._notify(gone)
+        return session
+
+    def peek(self, session_id):
+        """
+        Existing session or None; does not create one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            gone = self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_seen = now
+                self._sessions.move_to_end(session_id)
+        self._notify(gone)
+        return session
+
+    def user_id(self, session_id):
+        session = self.peek(session_id)
+        return session.user_id if session is not None else None
+
+    def end(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._notify([session])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "logged_in": sum(1 for s in self._sessions.values() if s.user_id),
+                "created": self.created,
+                "evicted": self.evicted,
+            }
+
+
+SESSION_REGISTRY = SessionRegistry()
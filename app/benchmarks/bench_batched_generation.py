@@ -0,0 +1,73 @@
+"""
+Aggregate tokens/sec of batched multi-sequence generation vs batch size.
+
+Usage (from app/):
+    python -m benchmarks.bench_batched_generation --sizes 1 2 4 8 --check
+
+Loads the GGUF model from LLM_MODEL_PATH, builds real segment summaries
+from one trip and decodes them with BatchedGenerator at each batch size.
+--check also runs the single-prompt path with the same seeds and reports
+how many completions match exactly.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from backend.llm import llm_engine
+from backend.llm.batch_decode import BatchedGenerator
+from backend.llm.load_llm import load_llm_once
+from backend.processing.severity import assign_severity, build_llm_summary
+from backend.registry.trip_registry import TripRegistry
+
+
+def _requests(driver_id, trip_id, n, seed):
+    df = TripRegistry(Path("data/trips"))._load_trip_df(driver_id, trip_id)
+    out = []
+    for i in range(n):
+        row = df.iloc[i % len(df)].to_dict()
+        params = dict(llm_engine.SAMPLING_PROFILES[assign_severity(row)])
+        params["seed"] = seed + i
+        out.append((llm_engine._build_prompt(build_llm_summary(row)), params))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--driver", default="driver_02")
+    parser.add_argument("--trip", default="trip_001")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--prompts", type=int, default=8, help="prompts per batch size")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--check", action="store_true", help="compare against the single-prompt path")
+    args = parser.parse_args(argv)
+
+    load_llm_once()
+    llm = llm_engine.coach
+    requests = _requests(args.driver, args.trip, args.prompts, args.seed)
+
+    print(f"{'batch':>5} {'tokens':>7} {'seconds':>8} {'tok/s':>8}")
+    last = None
+    for size in args.sizes:
+        gen = BatchedGenerator(llm, n_seq=size)
+        outputs = []
+        t0 = time.perf_counter()
+        for i in range(0, len(requests), size):
+            outputs += gen.generate(requests[i:i + size], stop=llm_engine.STOP_TOKENS)
+        elapsed = time.perf_counter() - t0
+        gen.close()
+
+        tokens = sum(o["completion_tokens"] for o in outputs)
+        print(f"{size:>5} {tokens:>7} {elapsed:>8.2f} {tokens / elapsed:>8.1f}")
+        last = outputs
+
+    if args.check and last is not None:
+        same = 0
+        for (prompt, params), batched in zip(requests, last):
+            single = llm(prompt, stop=llm_engine.STOP_TOKENS, **params)["choices"][0]["text"]
+            same += single == batched["text"]
+        print(f"single-path parity: {same}/{len(requests)} identical completions")
+
+
+if __name__ == "__main__":
+    main()
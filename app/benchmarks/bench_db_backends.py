@@ -0,0 +1,101 @@
+"""
+Insert throughput of the storage backends under concurrent sessions.
+
+Usage (from app/):
+    python -m benchmarks.bench_db_backends --backends sqlite,mysql --sessions 1,4,8
+
+Each session is a thread that borrows a pooled connection and inserts
+--rows coaching rows into driver_responses in --batch sized executemany
+calls, one commit per batch (what db_writer does). SQLite runs on a
+temporary file; MySQL uses the DB_* settings and deletes its rows
+afterwards (driver_id "bench_*").
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from backend.db.storage import MySQLBackend, SQLiteBackend
+
+
+def _session(backend, sid, rows, batch, errors):
+    stmt = backend.statement("insert_response")
+    driver = f"bench_{sid}"
+    try:
+        for start in range(0, rows, batch):
+            params = [
+                (driver, "trip_bench", i, "MEDIUM", f"Segment {i}: braking", "Brake earlier.")
+                for i in range(start, min(rows, start + batch))
+            ]
+            with backend.session() as conn:
+                cur = conn.cursor()
+                cur.executemany(stmt, params)
+                conn.commit()
+                cur.close()
+    except Exception as e:
+        errors.append(e)
+
+
+def _cleanup(backend):
+    with backend.session() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM driver_responses WHERE driver_id LIKE 'bench_%'")
+        conn.commit()
+        cur.close()
+
+
+def _run(backend, sessions, rows, batch):
+    errors = []
+    threads = [
+        threading.Thread(target=_session, args=(backend, i, rows, batch, errors))
+        for i in range(sessions)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    if errors:
+        raise errors[0]
+    return elapsed
+
+
+def _make(name, sessions, tmp):
+    if name == "sqlite":
+        return SQLiteBackend(os.path.join(tmp, f"fleet_{sessions}.sqlite"), pool_size=sessions)
+    if name == "mysql":
+        return MySQLBackend(pool_size=sessions)
+    raise ValueError(f"unknown backend {name!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backends", default="sqlite")
+    parser.add_argument("--sessions", default="1,4,8")
+    parser.add_argument("--rows", type=int, default=2000, help="rows per session")
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="bench_db_backends_")
+    print(f"{'backend':>8} {'sessions':>9} {'rows':>7} {'seconds':>8} {'rows/s':>9}")
+    for name in args.backends.split(","):
+        for sessions in (int(n) for n in args.sessions.split(",")):
+            backend = _make(name, sessions, tmp)
+            try:
+                elapsed = _run(backend, sessions, args.rows, args.batch)
+                if name == "mysql":
+                    _cleanup(backend)
+            except Exception as e:
+                print(f"{name:>8} {sessions:>9}  failed: {e}")
+                continue
+            finally:
+                backend.close()
+            total = sessions * args.rows
+            print(f"{name:>8} {sessions:>9} {total:>7} {elapsed:>8.2f} {total / elapsed:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Login storm: many drivers logging in at once (shift change).
+
+Usage (from app/):
+    python -m benchmarks.bench_login_storm --users 48
+
+Creates --users accounts in a temporary user store, then logs them all
+in concurrently, one thread per driver, three ways:
+
+    inline   bcrypt.checkpw in the request thread (the old authenticate)
+    pool     auth_service.authenticate: bounded bcrypt pool
+    relogin  authenticate again with the same passwords: credential cache
+
+While the storm runs, a ticker thread stands in for the live dashboard
+(a 20 ms timer); its lag shows how much the logins starve other handlers.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+import bcrypt
+
+from backend.auth import auth_service
+from backend.auth.password_pool import PASSWORD_POOL
+from backend.auth.user_registry import CsvUserStore
+from backend.metrics import LatencySamples
+
+TICK_S = 0.02
+
+
+def _ticker(stop, lag):
+    next_tick = time.perf_counter() + TICK_S
+    while not stop.is_set():
+        time.sleep(max(0.0, next_tick - time.perf_counter()))
+        now = time.perf_counter()
+        lag.record(now - next_tick)
+        sum(i * i for i in range(2000))  # a little handler work
+        next_tick = now + TICK_S
+
+
+def _inline_login(store, user_id, password):
+    u = store.get(user_id)
+    return bcrypt.checkpw(password.encode(), u["password_hash"].encode())
+
+
+def _storm(login, users):
+    latency = LatencySamples(maxlen=len(users))
+    lag = LatencySamples(maxlen=100000)
+    failures = []
+    stop = threading.Event()
+    ticker = threading.Thread(target=_ticker, args=(stop, lag), daemon=True)
+    ticker.start()
+    start = threading.Barrier(len(users) + 1)
+
+    def one(user_id, password):
+        start.wait()
+        t0 = time.perf_counter()
+        ok = login(user_id, password)
+        latency.record(time.perf_counter() - t0)
+        if not ok:
+            failures.append(user_id)
+
+    threads = [threading.Thread(target=one, args=u) for u in users]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    ticker.join()
+    return elapsed, latency.stats(), lag.stats(), failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=48)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost of the test accounts")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="bench_login_")
+    store = CsvUserStore(os.path.join(tmp, "users.csv"))
+    users = [(f"driver_{i:03d}", f"pw-{i}") for i in range(args.users)]
+    salt = bcrypt.gensalt(args.rounds)
+    for user_id, password in users:
+        store.add(user_id, bcrypt.hashpw(password.encode(), salt).decode(), "driver")
+    auth_service.USER_STORE = store
+
+    modes = [
+        ("inline", lambda u, p: _inline_login(store, u, p)),
+        ("pool", lambda u, p: auth_service.authenticate(u, p)[0]),
+        ("relogin", lambda u, p: auth_service.authenticate(u, p)[0]),
+    ]
+
+    print(f"{args.users} concurrent logins, bcrypt cost {args.rounds}, "
+          f"pool of {PASSWORD_POOL.workers} workers on {os.cpu_count()} cores")
+    print(f"{'mode':>8} {'total_s':>8} {'login_p50':>10} {'login_p95':>10} {'login_max':>10} "
+          f"{'tick_lag_p95':>13} {'tick_lag_max':>13}")
+    for name, login in modes:
+        with contextlib.redirect_stdout(io.StringIO()):  # "AUTH ATTEMPT" lines
+            elapsed, latency, lag, failures = _storm(login, users)
+        print(f"{name:>8} {elapsed:>8.2f} {latency['p50']:>10.3f} {latency['p95']:>10.3f} "
+              f"{latency['max']:>10.3f} {lag.get('p95', 0):>13.4f} {lag.get('max', 0):>13.4f}"
+              + (f"  ({len(failures)} failed)" if failures else ""))
+
+    print(auth_service.auth_stats())
+
+
+if __name__ == "__main__":
+    main()
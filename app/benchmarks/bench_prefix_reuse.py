@@ -0,0 +1,70 @@
+"""
+Time-to-first-token with and without the system-prefix KV snapshot.
+
+Usage (from app/):
+    python -m benchmarks.bench_prefix_reuse --prompts 8
+
+Loads the GGUF model from LLM_MODEL_PATH and streams completions for real
+segment summaries from one trip in two modes:
+
+    cold      llm.reset() before each request (full prompt prefill)
+    snapshot  PrefixCache.restore() before each request (suffix prefill)
+
+The context is reset before every request in both modes, so llama.cpp's
+own prefix matching between consecutive calls does not blur the numbers.
+"""
+
+import argparse
+import statistics
+import time
+
+from backend.llm import llm_engine
+from backend.llm.load_llm import load_llm_once
+from backend.llm.prefix_cache import PrefixCache
+from benchmarks.bench_batched_generation import _requests
+
+
+def _first_token_seconds(llm, prompt, params):
+    t0 = time.perf_counter()
+    stream = llm(prompt, stop=llm_engine.STOP_TOKENS, stream=True, **params)
+    for _ in stream:
+        elapsed = time.perf_counter() - t0
+        stream.close()
+        return elapsed
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--driver", default="driver_02")
+    parser.add_argument("--trip", default="trip_001")
+    parser.add_argument("--prompts", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    load_llm_once()
+    llm = llm_engine.coach
+    requests = _requests(args.driver, args.trip, args.prompts, args.seed)
+    cache = PrefixCache(llm, llm_engine._prompt_prefix())
+    print(f"prefix: {len(cache.tokens)} tokens, snapshot built in {cache.build_seconds:.3f}s")
+
+    results = {}
+    for mode in ("cold", "snapshot"):
+        times = []
+        for prompt, params in requests:
+            llm.reset()
+            if mode == "snapshot":
+                cache.restore()
+            times.append(_first_token_seconds(llm, prompt, params))
+        results[mode] = times
+
+    print(f"{'mode':>9} {'mean_ttft':>10} {'p50':>8} {'max':>8}")
+    for mode, times in results.items():
+        print(f"{mode:>9} {statistics.mean(times):>10.3f} "
+              f"{statistics.median(times):>8.3f} {max(times):>8.3f}")
+    speedup = statistics.mean(results["cold"]) / statistics.mean(results["snapshot"])
+    print(f"speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
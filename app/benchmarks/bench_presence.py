@@ -0,0 +1,93 @@
+"""
+Driver presence at fleet scale.
+
+Usage (from app/):
+    python -m benchmarks.bench_presence --drivers 5000
+
+Logs --drivers drivers in, then runs heartbeat writer threads sending
+--rate heartbeats/s in total (driver dashboard ticks, round-robin; every
+100th tick is a logout + login) while a coach-style reader polls
+is_online for one driver and online_drivers() for the whole fleet.
+Reads take no lock, so their latency should not move with the writers.
+"""
+
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+from backend.metrics import LatencySamples
+from backend.state.global_state import GlobalState
+
+READ_PAUSE_S = 0.001
+
+
+def _run(presence, drivers, args):
+    t0 = time.perf_counter()
+    for d in drivers:
+        presence.driver_login(d)
+    login_s = time.perf_counter() - t0
+
+    stop = threading.Event()
+    beats = [0] * args.writers
+    interval = args.writers / args.rate
+
+    def writer(n):
+        i = n
+        next_beat = time.perf_counter()
+        while not stop.is_set():
+            driver_id = drivers[i % len(drivers)]
+            if i % 100 == n:
+                presence.driver_logout(driver_id)
+                presence.driver_login(driver_id)
+            presence.heartbeat(driver_id)
+            beats[n] += 1
+            i += args.writers
+            next_beat += interval
+            time.sleep(max(0.0, next_beat - time.perf_counter()))
+
+    one = LatencySamples(maxlen=100000)
+    fleet = LatencySamples(maxlen=100000)
+    threads = [threading.Thread(target=writer, args=(n,), daemon=True) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    deadline = time.perf_counter() + args.seconds
+    online = set()
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        presence.is_online(drivers[len(online) % len(drivers)])
+        one.record(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        online = presence.online_drivers()
+        fleet.record(time.perf_counter() - t0)
+        time.sleep(READ_PAUSE_S)
+    stop.set()
+    for t in threads:
+        t.join()
+    return login_s, sum(beats), one.stats(), fleet.stats(), len(online)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=5000, help="heartbeats per second, all writers")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    presence = GlobalState(ttl_s=60)
+    drivers = [f"driver_{i:05d}" for i in range(args.drivers)]
+    with contextlib.redirect_stdout(io.StringIO()):  # ">>> DRIVER LOGIN/LOGOUT" lines
+        login_s, beats, one, fleet, online = _run(presence, drivers, args)
+
+    print(f"{args.drivers} drivers, {args.writers} heartbeat threads, {args.seconds:.0f}s")
+    print(f"login all:       {login_s * 1000:.1f} ms")
+    print(f"heartbeats/s:    {beats / args.seconds:,.0f}")
+    print(f"online:          {online}")
+    for name, s in (("is_online", one), ("online_drivers", fleet)):
+        print(f"{name:<16} p50 {s['p50'] * 1e6:>8.1f} us  p95 {s['p95'] * 1e6:>8.1f} us  max {s['max'] * 1e6:>8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
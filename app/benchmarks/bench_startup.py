@@ -0,0 +1,103 @@
+"""
+Startup time to first served page, lazy vs. eager model loading.
+
+Usage (from app/):
+    python -m benchmarks.bench_startup --runs 3
+
+Starts the Gradio app in a subprocess (no share link) and polls its root
+URL until it answers 200, once per mode:
+
+    lazy   default: the model loads on a background thread
+    eager  LLM_EAGER_LOAD=1: the model loads before the app is built
+
+It also reports when the model finished loading (">>> LLM INITIALIZED"
+on the app's stdout), which should be about the same in both modes.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+_LAUNCH = (
+    "from ui.gradio_app import create_app; "
+    "create_app().launch(server_name='127.0.0.1', server_port={port}, share=False)"
+)
+
+
+def _page_up(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as resp:
+            return resp.status == 200
+    except Exception:
+        return False
+
+
+def _run_once(mode, port, timeout):
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    if mode == "eager":
+        env["LLM_EAGER_LOAD"] = "1"
+    else:
+        env.pop("LLM_EAGER_LOAD", None)
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", _LAUNCH.format(port=port)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    ready = {}
+
+    def _watch():
+        for line in proc.stdout:
+            if ">>> LLM INITIALIZED" in line and "model" not in ready:
+                ready["model"] = time.perf_counter() - t0
+
+    threading.Thread(target=_watch, daemon=True).start()
+
+    page = None
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if _page_up(f"http://127.0.0.1:{port}/"):
+                page = time.perf_counter() - t0
+                break
+            if proc.poll() is not None:
+                break
+            time.sleep(0.05)
+
+        while "model" not in ready and proc.poll() is None and time.perf_counter() - t0 < timeout:
+            time.sleep(0.1)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    return page, ready.get("model")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=7899)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':>6} {'first_page_s':>13} {'model_ready_s':>14}")
+    for mode in ("lazy", "eager"):
+        pages, models = [], []
+        for _ in range(args.runs):
+            page, model = _run_once(mode, args.port, args.timeout)
+            if page is not None:
+                pages.append(page)
+            if model is not None:
+                models.append(model)
+
+        page_s = f"{statistics.mean(pages):.2f}" if pages else "n/a"
+        model_s = f"{statistics.mean(models):.2f}" if models else "n/a"
+        print(f"{mode:>6} {page_s:>13} {model_s:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Makes `backend` / `ui` importable when pytest runs from the repo root or app/.
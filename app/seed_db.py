@@ -1,11 +1,13 @@
 # seed_db.py — run once, then delete
-from backend.db.db_writer import log_user
-import time
+from backend.db.db_writer import log_user, flush
 
 log_user("driver_01", "driver")
 log_user("driver_02", "driver")
 log_user("driver_03", "driver")
 log_user("coach_01", "coach")
 
-time.sleep(2)   # give background thread time to flush
-print("Done seeding users into DB.")
\ No newline at end of file
+# wait until the writer thread has committed them
+if flush(timeout=30):
+    print("Done seeding users into DB.")
+else:
+    print("Timed out waiting for the DB writer; users may not be seeded.")
@@ -0,0 +1,92 @@
+"""
+The vectorized window engine must match the reference per-window loop.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.processing import merger
+from backend.processing.merger import (
+    ACCEL_COLUMNS,
+    GYRO_COLUMNS,
+    LOCATION_COLUMNS,
+    _extract_window_features_loop,
+    _load_csv,
+    extract_window_features,
+)
+
+TRIPS_ROOT = Path(__file__).resolve().parents[1] / "data" / "trips"
+SENSOR_FILES = ("location_data.csv", "accelerometer_data.csv", "gyroscope_data.csv")
+MAX_SEGMENTS = 300  # the reference loop is slow; enough windows to cover events and skips
+TOLERANCE = 1e-9
+
+
+def _bundled_trips():
+    return sorted(
+        p for p in TRIPS_ROOT.glob("*/*")
+        if all((p / name).exists() for name in SENSOR_FILES)
+    )
+
+
+def _assert_parity(location_df, accel_df, gyro_df, max_segments=None):
+    fast = extract_window_features(location_df, accel_df, gyro_df, max_segments=max_segments)
+    slow = _extract_window_features_loop(location_df, accel_df, gyro_df, max_segments=max_segments)
+
+    assert list(fast.columns) == list(slow.columns)
+    assert fast.shape == slow.shape
+    assert len(fast) > 0
+    np.testing.assert_allclose(
+        fast.to_numpy(dtype=float), slow.to_numpy(dtype=float),
+        rtol=TOLERANCE, atol=TOLERANCE, equal_nan=True,
+    )
+
+
+@pytest.mark.parametrize("trip_dir", _bundled_trips(), ids=lambda p: f"{p.parent.name}/{p.name}")
+def test_parity_on_bundled_trips(trip_dir):
+    location_df = _load_csv(trip_dir / "location_data.csv", usecols=LOCATION_COLUMNS)
+    accel_df = _load_csv(trip_dir / "accelerometer_data.csv", usecols=ACCEL_COLUMNS)
+    gyro_df = _load_csv(trip_dir / "gyroscope_data.csv", usecols=GYRO_COLUMNS)
+
+    _assert_parity(location_df, accel_df, gyro_df, max_segments=MAX_SEGMENTS)
+
+
+def _random_trace(seed, seconds=600):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2025-01-15T10:00:00Z")
+
+    # GPS roughly at 1 Hz with jitter
+    gps_t = np.cumsum(rng.uniform(0.5, 1.5, seconds))
+    location_df = pd.DataFrame(
+        {"speed": np.abs(rng.normal(12, 6, seconds))},
+        index=start + pd.to_timedelta(gps_t, unit="s"),
+    )
+
+    # IMU at IMU_HZ with a few dropouts, so some windows are skipped
+    n = seconds * merger.IMU_HZ
+    imu_t = np.arange(n) / merger.IMU_HZ
+    keep = np.ones(n, dtype=bool)
+    for gap_start in rng.integers(0, n, 4):
+        keep[gap_start:gap_start + 20 * merger.IMU_HZ] = False
+    index = start + pd.to_timedelta(imu_t[keep], unit="s")
+
+    accel_df = pd.DataFrame(
+        rng.normal(0, 0.25, (keep.sum(), len(ACCEL_COLUMNS))) + [0, 0, -1],
+        index=index, columns=ACCEL_COLUMNS,
+    )
+    gyro_df = pd.DataFrame(
+        rng.normal(0, 0.3, (keep.sum(), len(GYRO_COLUMNS))),
+        index=index, columns=GYRO_COLUMNS,
+    )
+    return location_df, accel_df, gyro_df
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_parity_on_random_trace(seed):
+    _assert_parity(*_random_trace(seed))
+
+
+def test_parity_with_max_segments():
+    _assert_parity(*_random_trace(3), max_segments=25)
@@ -2,18 +2,21 @@ import gradio as gr
 from backend.services.coach_services import (
     get_driver_status,
     list_drivers,
+    online_drivers,
     list_trips,
     list_segments,
     analyze_segment,
-    get_segment_severities
+    stored_analysis,
+    stored_segments,
+    get_segment_severities,
+    get_llm_status
 )
 from backend.processing.severity import assign_severity
 from backend.registry.trip_registry import TripRegistry
+from backend.state.session_registry import SESSION_REGISTRY
 from pathlib import Path
 import threading
 import time
-trip_df_state = None
-trip_df_lock = threading.Lock()
 
 TRIPS_ROOT = Path("data/trips")
 _registry = TripRegistry(TRIPS_ROOT)
@@ -51,8 +54,6 @@ def build_coach_view():
 
         output_box = gr.Markdown("### Driving Behaviour Feedback\nSelect trip, then click 'Analyze Trip' to get feedback", elem_classes=["feedback-box"], visible=True)
     
-    trip_df_state = gr.State(None)
-
     refresh_state = gr.State(0)
 
     def refresh_status(driver_id):
@@ -68,9 +69,12 @@ def build_coach_view():
             value=f"**Driver ID:** {info['driver_id']} , **Status:** {status_icon}"
         )
 
+    def driver_choices():
+        online = online_drivers()
+        return [(f"🟢 {d}" if d in online else d, d) for d in list_drivers()]
+
     def refresh_drivers():
-        drivers = list_drivers()
-        return gr.update(choices=drivers, value=None)
+        return gr.update(choices=driver_choices(), value=None)
 
     def refresh_trips(driver_id):
         if not driver_id:
@@ -80,55 +84,63 @@ def build_coach_view():
         display_choices = [(f"Day {i}", trip_name) for i, trip_name in enumerate(raw_trips, 1)]
         return gr.update(choices=display_choices, value=None)
 
-    def refresh_segments(driver_id, trip_id):
-        global trip_df_state
-
+    def refresh_segments(driver_id, trip_id, request: gr.Request):
         if not driver_id or not trip_id:
             return gr.update(choices=[], value=None)
         
-        with trip_df_lock:
-            trip_df_state = None
+        # the loaded trip lives in this browser session only
+        session = SESSION_REGISTRY.get(request.session_hash)
+        session.pop("coach_trip_df")
 
         # 🔥 start background load
         t = threading.Thread(
             target=load_trip_df_background,
-            args=(driver_id, trip_id),
+            args=(session, driver_id, trip_id),
             daemon=True
         )
         t.start()
 
-        choices = [(f"Trip {i+1}", i) for i in range(MAX_SEGMENTS)]
+        stored = stored_segments(driver_id, trip_id)
+        choices = [
+            (f"Trip {i+1} (coaching saved)" if i in stored else f"Trip {i+1}", i)
+            for i in range(MAX_SEGMENTS)
+        ]
 
         return gr.update(choices=choices, value=None)
     
     def run_analysis(driver_id, trip_id, segment_display):
         if not driver_id or not trip_id or not segment_display:
-            return gr.update(value=" Please select driver, day, and trip.")
+            yield gr.update(value=" Please select driver, day, and trip.")
+            return
 
         try:
             segment_idx = segment_display  # already an int
-            result = analyze_segment(driver_id, trip_id, segment_idx)
-            return gr.update(value=f"### Driver's Behaviour Feedback\n\n{result['coaching']}")
+            # coaching generated earlier (e.g. during the driver's trip) needs no model
+            result = stored_analysis(driver_id, trip_id, segment_idx)
+            if result is None:
+                if get_llm_status()["state"] == "loading":
+                    # the request queues until the model is ready
+                    yield gr.update(value="### Driving Behaviour Feedback\n⏳ Coaching model is still loading — your analysis is queued.")
+                result = analyze_segment(driver_id, trip_id, segment_idx)
+            yield gr.update(value=f"### Driver's Behaviour Feedback\n\n{result['coaching']}")
         except Exception as e:
-            return gr.update(value=f" Error: {e}")
+            yield gr.update(value=f" Error: {e}")
     
-    def load_trip_df_background(driver_id, trip_id):
-        global trip_df_state
+    def load_trip_df_background(session, driver_id, trip_id):
         df = _registry._load_trip_df(driver_id, trip_id)
-        with trip_df_lock:
-            trip_df_state = df
+        session.set("coach_trip_df", ((driver_id, trip_id), df))
 
-    def show_selected_segment_severity(driver_id, trip_id, segment_idx):
-        global trip_df_state  
+    def show_selected_segment_severity(driver_id, trip_id, segment_idx, request: gr.Request):
         time.sleep(1)
         if not driver_id or not trip_id or segment_idx is None: 
             return gr.update(value="<h3>Trip Severity</h3><p> Please select a trip.</p>")  
+        session = SESSION_REGISTRY.get(request.session_hash)
         # Wait until DF is ready (very briefly)
         for _ in range(50):  # ~0.5s max
-            with trip_df_lock:
-                if trip_df_state is not None:
-                    df = trip_df_state
-                    break
+            loaded = session.get("coach_trip_df")
+            if loaded is not None and loaded[0] == (driver_id, trip_id):
+                df = loaded[1]
+                break
             time.sleep(0.01)
         else:
             return gr.update("<h3>Trip Severity</h3><p>Loading…</p>")
@@ -145,13 +157,13 @@ def build_coach_view():
         except Exception as e:
             return gr.update(value=f"<h3>Trip Severity</h3><p> Error: {e}</p>")
     
-    def reset_coach_view():
-        global trip_df_state
-        with trip_df_lock:
-            trip_df_state = None
+    def reset_coach_view(request: gr.Request):
+        session = SESSION_REGISTRY.peek(request.session_hash)
+        if session is not None:
+            session.pop("coach_trip_df")
 
         return (
-            gr.update(choices=list_drivers(), value=None),   # driver_dd
+            gr.update(choices=driver_choices(), value=None),   # driver_dd
             gr.update(choices=[], value=None),   # trip_dd
             gr.update(choices=[], value=None),   # segment_dd
             gr.update(value="Select a driver to view details."),  # driver_status_box
@@ -1,56 +1,111 @@
+import threading
+from concurrent.futures import CancelledError
+
 import gradio as gr
-from backend.state import global_state
+from backend.state.session_registry import SESSION_REGISTRY
+from backend.state.global_state import GLOBAL_STATE
 from backend.services.driver_services import load_segment_severities_for_stream
 from backend.processing.severity import build_llm_summary
-from backend.llm.llm_engine import get_coaching_feedback
+from backend.llm.llm_engine import stream_coaching_feedback, PRIORITY_LIVE
+from backend.llm.prefetcher import LookaheadPrefetcher
 from pathlib import Path
 from backend.registry.trip_registry import TripRegistry
 from backend.db.db_writer import log_driver_response
-import threading
 
 TRIPS_ROOT = Path("data/trips")
 _registry = TripRegistry(TRIPS_ROOT)
 MAX_SEGMENTS = 15
-_llm_lock = threading.Lock() 
-_segment_results = {}  # keyed by (driver_id, trip_id, idx) — never goes through gr.State
+
+# Live-trip state of one browser session. It is kept on the SessionState
+# (never in gr.State, which copies), so Stop Trip, logout and session
+# eviction drop it with everything else the session holds:
+#   {"trip": (driver_id, trip_id),
+#    "results": {idx: coaching}, "partials": {idx: text streamed so far},
+#    "awaiting": idx the dashboard is waiting on, or None,
+#    "shown": idx whose result a poll tick already rendered, or None}
+TRIP_STREAM = "trip_stream"
 
 ALERT_SEVERITIES = {"high", "critical"}  # adjust to match your labels
 
-# ── CHANGED: Added severity parameter + non-blocking lock + try/finally
-def start_llm_for_segment(idx, summaries, llm_result_holder, severity, driver_id=None, trip_id=None, segments=None):
-    def _run():
-        if not _llm_lock.acquire(blocking=False):
-            print("LLM is currently busy. Thread exiting.")
-            return
-       
+STREAM_INTERVAL_SEC = 10.0  # 🔧 adjust freely
+TOKEN_POLL_SEC = 0.5        # how often streamed tokens are rendered
+
+# Keeps upcoming segments queued at low priority, paced to STREAM_INTERVAL_SEC
+_prefetcher = LookaheadPrefetcher(STREAM_INTERVAL_SEC)
+
+
+def _new_trip_stream(session, driver_id, trip_id):
+    stream = {"trip": (driver_id, trip_id), "results": {}, "partials": {}, "awaiting": None, "shown": None}
+    session.set(TRIP_STREAM, stream)
+    return stream
+
+
+def _trip_stream(session, driver_id, trip_id):
+    """This session's state for the trip it is playing, or None."""
+    stream = session.get(TRIP_STREAM) if session is not None else None
+    if stream is None or stream["trip"] != (driver_id, trip_id):
+        return None
+    return stream
+
+
+def prefetch_ahead(idx, summaries, segments, driver_id, trip_id):
+    if driver_id and trip_id and segments:
+        _prefetcher.update(
+            (driver_id, trip_id), idx, summaries,
+            [seg["severity"] for seg in segments],
+        )
+
+# Requests go through the LLM scheduler: nothing is dropped when the model
+# is busy, duplicates share one generation, and Stop cancels what's queued.
+# Tokens are consumed on a background thread as they are generated.
+def start_llm_for_segment(idx, summaries, llm_result_holder, severity, driver_id=None, trip_id=None, segments=None, stream=None):
+    summary = summaries[idx]
+    deltas = stream_coaching_feedback(
+        summary, severity, False,
+        priority=PRIORITY_LIVE,
+        tag=(driver_id, trip_id),
+    )
+
+    def _consume():
+        coaching = ""
         try:
-            summary = summaries[idx]
-            coaching = get_coaching_feedback(summary, severity, False)
-            llm_result_holder["result"] = coaching
-
-            # Also store in module-level dict — immune to gr.State copying
-            if driver_id and trip_id:
-                _segment_results[(driver_id, trip_id, idx)] = coaching
-
-            if driver_id and trip_id and segments and idx < len(segments):
-                try:
-                    # severity is now passed in, but we still log the same one for consistency
-                    log_driver_response(
-                        driver_id=driver_id,
-                        trip_id=trip_id,
-                        segment_index=int(idx),
-                        severity=severity,           # ← using passed severity
-                        summary=summary,
-                        coaching=coaching,
-                    )
-                except Exception as e:
-                    print(f"[DB_WRITER] log_driver_response error (non-fatal): {e}")
-        finally:
-            # ALWAYS release the lock so future threads can run
-            _llm_lock.release()
-
-    t = threading.Thread(target=_run, daemon=True)
-    t.start()
+            for delta in deltas:
+                coaching += delta
+                if stream is not None:
+                    stream["partials"][idx] = coaching
+        except CancelledError:
+            if stream is not None:
+                stream["partials"].pop(idx, None)
+            return
+        except Exception as e:
+            if stream is not None:
+                stream["partials"].pop(idx, None)
+            print(f"[LLM] segment {idx} failed: {e}")
+            return
+
+        llm_result_holder["result"] = coaching
+
+        # Also store on the session — immune to gr.State copying
+        if stream is not None:
+            stream["results"][idx] = coaching
+            stream["partials"].pop(idx, None)
+
+        if driver_id and trip_id and segments and idx < len(segments):
+            try:
+                log_driver_response(
+                    driver_id=driver_id,
+                    trip_id=trip_id,
+                    segment_index=int(idx),
+                    severity=severity,
+                    summary=summary,
+                    coaching=coaching,
+                )
+            except Exception as e:
+                print(f"[DB_WRITER] log_driver_response error (non-fatal): {e}")
+
+    thread = threading.Thread(target=_consume, daemon=True, name=f"llm-stream-{idx}")
+    thread.start()
+    return thread
 
 def build_driver_view():
     with gr.Column(elem_classes=["fixed-width-container"]):
@@ -80,8 +135,9 @@ def build_driver_view():
     refresh_state = gr.State(0)
 
     
-    def start_streaming():
-        driver_id = global_state.current_user_id
+    def start_streaming(request: gr.Request):
+        session = SESSION_REGISTRY.peek(request.session_hash)
+        driver_id = session.user_id if session is not None else None
         print(f">>> DRIVER VIEW: starting stream for driver={driver_id}")
 
         if not driver_id:
@@ -153,7 +209,10 @@ def build_driver_view():
         # ── CHANGED: pass severity to first segment
         holder = {"result": None}
         first_severity = segments[0]["severity"] if segments else None
-        start_llm_for_segment(0, summaries, holder, first_severity, driver_id=driver_id, trip_id=trip_id, segments=segments)
+        stream = _new_trip_stream(session, driver_id, trip_id)  # replaces any earlier trip's
+        stream["awaiting"] = 0
+        start_llm_for_segment(0, summaries, holder, first_severity, driver_id=driver_id, trip_id=trip_id, segments=segments, stream=stream)
+        prefetch_ahead(0, summaries, segments, driver_id, trip_id)
 
         return (
             segments,            # segment_stream_state
@@ -168,7 +227,13 @@ def build_driver_view():
             holder               # next_llm_result_state
         )
 
-    def stop_streaming():
+    def stop_streaming(trip_id, request: gr.Request):
+        session = SESSION_REGISTRY.peek(request.session_hash)
+        driver_id = session.user_id if session is not None else None
+        if driver_id and trip_id:
+            _prefetcher.stop((driver_id, trip_id))  # cancels live + look-ahead requests
+        if session is not None:
+            session.pop(TRIP_STREAM)
         return (
             [],                  # segment_stream_state
             0,                   # segment_pointer_state
@@ -180,95 +245,115 @@ def build_driver_view():
         )
 
 
-    def advance_segment_stream(segments, idx, trip_id, streaming, df, summaries, next_llm_idx, next_llm_result):
+    def render_result(segments, idx, stream):
+        """
+        Label and feedback updates showing segment idx's finished coaching
+        (with the alert for high severities).
+        """
+        severity = segments[idx]["severity"]
+        full_label = f"Segment {idx + 1} — Severity: {severity}"
+
+        notification_script = ""
+        if severity.lower() in ALERT_SEVERITIES:
+            print(f"NOTIFICATION: {severity}")
+            notification_script = f"""
+            <img src="x" style="display:none" onerror="
+                (function() {{
+                    // --- Sound (programmatic beep, no file needed) ---
+                    try {{
+                        const ctx = new (window.AudioContext || window.webkitAudioContext)();
+                        const osc = ctx.createOscillator();
+                        const gain = ctx.createGain();
+                        osc.connect(gain);
+                        gain.connect(ctx.destination);
+                        osc.type = 'sine';
+                        osc.frequency.setValueAtTime(880, ctx.currentTime);
+                        gain.gain.setValueAtTime(0.5, ctx.currentTime);
+                        gain.gain.exponentialRampToValueAtTime(0.001, ctx.currentTime + 1);
+                        osc.start(ctx.currentTime);
+                        osc.stop(ctx.currentTime + 1);
+                    }} catch(e) {{ console.warn('Audio failed:', e); }}
+
+                    // --- Banner ---
+                    const existing = document.getElementById('severity-alert-banner');
+                    if (existing) existing.remove();
+
+                    const banner = document.createElement('div');
+                    banner.id = 'severity-alert-banner';
+                    banner.innerHTML = '⚠️ HIGH SEVERITY DETECTED — Segment {idx + 1}: {severity}';
+                    banner.style.cssText = `
+                        position: fixed;
+                        top: 20px;
+                        left: 50%;
+                        transform: translateX(-50%);
+                        background: #ff4444;
+                        color: white;
+                        font-size: 18px;
+                        font-weight: bold;
+                        padding: 16px 32px;
+                        border-radius: 10px;
+                        z-index: 99999;
+                        box-shadow: 0 4px 20px rgba(0,0,0,0.4);
+                        animation: fadeout 4s forwards;
+                    `;
+
+                    // Auto-dismiss after 4 seconds
+                    document.body.appendChild(banner);
+                    setTimeout(() => banner.remove(), 4000);
+                }})();
+            ">
+            """
+
+        feedback_html = (
+            "<h3>Driving Behaviour Feedback</h3>"
+            f"<p>{stream['results'][idx]}</p>"
+            + notification_script
+        )
+        return gr.update(choices=[full_label], value=full_label), gr.update(value=feedback_html)
+
+    def advance_segment_stream(segments, idx, trip_id, streaming, df, summaries, next_llm_idx, next_llm_result, request: gr.Request):
+        session = SESSION_REGISTRY.peek(request.session_hash)
+        driver_id = session.user_id if session is not None else None
+        if driver_id and session.role == "driver":
+            GLOBAL_STATE.heartbeat(driver_id)  # dashboard still open: keep presence alive
+
         if not streaming or not segments:
             return idx, gr.update(), gr.update(), next_llm_idx, next_llm_result
 
-        driver_id = global_state.current_user_id
-        key = (driver_id, trip_id, idx) if driver_id and trip_id else None
+        stream = _trip_stream(session, driver_id, trip_id)
 
         # ── Result for CURRENT segment is ready ──
-        if key and key in _segment_results:
-            severity = segments[idx]["severity"]
-            full_label = f"Segment {idx + 1} — Severity: {severity}"
-
-            notification_script = ""
-            if severity.lower() in ALERT_SEVERITIES:
-                print(f"NOTIFICATION: {severity}")
-                notification_script = f"""
-                <img src="x" style="display:none" onerror="
-                    (function() {{
-                        // --- Sound (programmatic beep, no file needed) ---
-                        try {{
-                            const ctx = new (window.AudioContext || window.webkitAudioContext)();
-                            const osc = ctx.createOscillator();
-                            const gain = ctx.createGain();
-                            osc.connect(gain);
-                            gain.connect(ctx.destination);
-                            osc.type = 'sine';
-                            osc.frequency.setValueAtTime(880, ctx.currentTime);
-                            gain.gain.setValueAtTime(0.5, ctx.currentTime);
-                            gain.gain.exponentialRampToValueAtTime(0.001, ctx.currentTime + 1);
-                            osc.start(ctx.currentTime);
-                            osc.stop(ctx.currentTime + 1);
-                        }} catch(e) {{ console.warn('Audio failed:', e); }}
-
-                        // --- Banner ---
-                        const existing = document.getElementById('severity-alert-banner');
-                        if (existing) existing.remove();
-
-                        const banner = document.createElement('div');
-                        banner.id = 'severity-alert-banner';
-                        banner.innerHTML = '⚠️ HIGH SEVERITY DETECTED — Segment {idx + 1}: {severity}';
-                        banner.style.cssText = `
-                            position: fixed;
-                            top: 20px;
-                            left: 50%;
-                            transform: translateX(-50%);
-                            background: #ff4444;
-                            color: white;
-                            font-size: 18px;
-                            font-weight: bold;
-                            padding: 16px 32px;
-                            border-radius: 10px;
-                            z-index: 99999;
-                            box-shadow: 0 4px 20px rgba(0,0,0,0.4);
-                            animation: fadeout 4s forwards;
-                        `;
-
-                        // Auto-dismiss after 4 seconds
-                        document.body.appendChild(banner);
-                        setTimeout(() => banner.remove(), 4000);
-                    }})();
-                ">
-                """
-
-            feedback_html = (
-                "<h3>Driving Behaviour Feedback</h3>"
-                f"<p>{_segment_results[key]}</p>"
-                + notification_script
-            )
+        if stream is not None and idx in stream["results"]:
+            if stream["shown"] == idx:
+                # poll_segment_stream already put it on screen mid-interval
+                label_update, feedback_update = gr.update(), gr.update()
+            else:
+                label_update, feedback_update = render_result(segments, idx, stream)
+            stream["shown"] = None
 
             # Move forward
             next_idx = min(idx + 1, len(segments) - 1)
+            stream["awaiting"] = None
 
             # ── CHANGED: pass severity when pre-fetching next segment
-            next_key = (driver_id, trip_id, next_idx)
-            if next_idx != idx and next_key not in _segment_results:
+            if next_idx != idx and next_idx not in stream["results"]:
                 holder = {"result": None}
                 lookahead_severity = segments[next_idx]["severity"]
                 start_llm_for_segment(
                     next_idx, summaries, holder, lookahead_severity,
-                    driver_id=driver_id, trip_id=trip_id, segments=segments
+                    driver_id=driver_id, trip_id=trip_id, segments=segments, stream=stream
                 )
                 next_llm_idx = next_idx
                 next_llm_result = holder  # store HOLDER, not result
 
+            # keep the segments after that queued at low priority
+            prefetch_ahead(next_idx, summaries, segments, driver_id, trip_id)
+
             # Update BOTH label and feedback together → cohesive step
             return (
                 next_idx,
-                gr.update(choices=[full_label], value=full_label),
-                gr.update(value=feedback_html),
+                label_update,
+                feedback_update,
                 next_llm_idx,               # updated
                 next_llm_result             # updated
             )
@@ -278,20 +363,63 @@ def build_driver_view():
 
 
             # Do NOT change label or feedback yet → keeps previous segment visible
+            # until its tokens start streaming in (see poll_segment_stream)
+            if stream is not None:
+                stream["awaiting"] = idx
+                prefetch_ahead(idx, summaries, segments, driver_id, trip_id)
+
             # But make sure LLM for current is running
-            if key and next_llm_idx != idx:
+            if stream is not None and next_llm_idx != idx:
                 holder = {"result": None}
-                # Note: we don't pass severity here because this branch is fallback
-                # and original code didn't have it — keeping safe & minimal
+                # the scheduler dedups, so re-submitting a running segment is harmless
                 start_llm_for_segment(
-                    idx, summaries, holder,
-                    driver_id=driver_id, trip_id=trip_id, segments=segments
+                    idx, summaries, holder, segments[idx]["severity"],
+                    driver_id=driver_id, trip_id=trip_id, segments=segments, stream=stream
                 )
                 return idx, gr.update(), gr.update(), idx, holder
 
             # Nothing to do — wait for next tick
             return idx, gr.update(), gr.update(), next_llm_idx, next_llm_result
 
+    def poll_segment_stream(segments, idx, trip_id, streaming, df, summaries, next_llm_idx, next_llm_result, request: gr.Request):
+        """
+        Fast tick while the dashboard waits on a segment: render the tokens
+        streamed so far, and show the finished result as soon as it lands
+        instead of on the next STREAM_INTERVAL_SEC tick. Only that tick moves
+        the segment pointer, so every segment stays up a full interval.
+        """
+        session = SESSION_REGISTRY.peek(request.session_hash)
+        driver_id = session.user_id if session is not None else None
+        no_change = (idx, gr.update(), gr.update(), next_llm_idx, next_llm_result)
+        if not streaming or not segments or not driver_id:
+            return no_change
+        stream = _trip_stream(session, driver_id, trip_id)
+        if stream is None or stream["awaiting"] != idx:
+            return no_change
+
+        if idx in stream["results"]:
+            stream["awaiting"] = None
+            stream["shown"] = idx
+            label_update, feedback_update = render_result(segments, idx, stream)
+            return idx, label_update, feedback_update, next_llm_idx, next_llm_result
+
+        partial = stream["partials"].get(idx)
+        if not partial:
+            return no_change
+
+        label = f"Segment {idx + 1} — Generating feedback..."
+        feedback_html = (
+            "<h3>Driving Behaviour Feedback</h3>"
+            f"<p>{partial}</p>"
+        )
+        return (
+            idx,
+            gr.update(choices=[label], value=label),
+            gr.update(value=feedback_html),
+            next_llm_idx,
+            next_llm_result
+        )
+
     def reset_driver_view():
         return (
             [],                                  # segment_stream_state
@@ -330,7 +458,7 @@ def build_driver_view():
     )
     stop_btn.click(
         fn=stop_streaming,
-        inputs=[],
+        inputs=[current_trip_state],
         outputs=[
             segment_stream_state,
             segment_pointer_state,
@@ -363,8 +491,6 @@ def build_driver_view():
 
     logout_btn = gr.Button("Logout", elem_classes=["logout-btn"])
 
-    STREAM_INTERVAL_SEC = 10.0  # 🔧 adjust freely
-
     gr.Timer(STREAM_INTERVAL_SEC).tick(
         fn=advance_segment_stream,
         inputs=[
@@ -387,4 +513,26 @@ def build_driver_view():
         show_progress=False
     )
 
+    gr.Timer(TOKEN_POLL_SEC).tick(
+        fn=poll_segment_stream,
+        inputs=[
+            segment_stream_state,
+            segment_pointer_state,
+            current_trip_state,
+            streaming_state,
+            trip_df_state,
+            segment_summaries_state,
+            next_llm_idx_state,
+            next_llm_result_state
+        ],
+        outputs=[
+            segment_pointer_state,
+            segment_dropdown,
+            output_box,
+            next_llm_idx_state,
+            next_llm_result_state
+        ],
+        show_progress=False
+    )
+
     return refresh_state, logout_btn
\ No newline at end of file
@@ -2,13 +2,13 @@ import gradio as gr
 from ui.login_view import build_login_view
 from ui.driver_view import build_driver_view
 from ui.coach_view import build_coach_view
-from backend.state import global_state
 from backend.state.global_state import GLOBAL_STATE
-from backend.llm.load_llm import load_llm_once
+from backend.state.session_registry import SESSION_REGISTRY
+from backend.auth.auth_service import forget_login
+import os
+from backend.llm.load_llm import load_llm_once, start_llm_warmup, llm_status
 from ui.login_view import build_login_view, reset_login_fields
 
-load_llm_once()
-
 custom_css = """
 body {
     background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -117,13 +117,10 @@ footer {
 }
 """
 
-def route_after_login(user_id, role):
+def route_after_login(user_id, role, request: gr.Request):
     print(f">>> ROUTER: user_id={user_id}, role={role}")
-    global_state.current_user_id = user_id
-    global_state.current_role = role
-    print(">>> GLOBAL STATE CHECK")
-    print("   user_id:", global_state.current_user_id)
-    print("   role:", global_state.current_role)
+    if user_id and role:
+        SESSION_REGISTRY.get(request.session_hash).login(user_id, role)
 
     if role == "driver":
         GLOBAL_STATE.driver_login(driver_id=user_id, name=user_id)
@@ -150,21 +147,74 @@ def route_after_login(user_id, role):
         gr.update(value=0),
     )
 
-def logout():
+def logout(request: gr.Request):
     print(">>> LOGOUT")
-    user_id = global_state.current_user_id
-    role = global_state.current_role
-    if role == "driver":
-        GLOBAL_STATE.driver_logout(user_id)
-    global_state.current_user_id = None
-    global_state.current_role = None
+    session = SESSION_REGISTRY.peek(request.session_hash)
+    if session is not None:
+        user_id, role = session.user_id, session.role
+        if role == "driver":
+            GLOBAL_STATE.driver_logout(user_id)
+        if user_id:
+            forget_login(user_id)
+        session.logout()
     return (
         None, None
     )
 
+def logout_and_reset(request: gr.Request):
+    return (*logout(request), *reset_login_fields())
+
+def _session_evicted(session):
+    # tab closed or idle past SESSION_IDLE_TTL
+    if session.role == "driver" and session.user_id:
+        GLOBAL_STATE.driver_logout(session.user_id)
+
+SESSION_REGISTRY.on_evict(_session_evicted)
+
+def end_browser_session(request: gr.Request):
+    SESSION_REGISTRY.end(request.session_hash)
+
+def render_llm_status():
+    status = llm_status()
+    if status["state"] == "ready":
+        return gr.update(value="", visible=False), gr.Timer(active=False)
+    if status["state"] == "failed":
+        return gr.update(value=f"⚠️ Coaching model failed to load: {status['error']}", visible=True), gr.Timer(active=False)
+    return gr.update(value="⏳ Coaching model is loading — feedback requests will be answered once it is ready.", visible=True), gr.Timer(active=True)
+
+def start_llm():
+    """
+    The model loads in the background so the server binds immediately;
+    LLM_EAGER_LOAD=1 restores the old blocking load (startup benchmark baseline).
+
+    Called from create_app(), never at import: LLMWorkerPool spawns its
+    workers with a fresh interpreter that re-imports main.py (and so this
+    module), and each of them would otherwise start a model load of its own.
+    """
+    if os.getenv("LLM_EAGER_LOAD") == "1":
+        load_llm_once()
+    else:
+        start_llm_warmup()
+
 def create_app():
+    start_llm()
     with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue", secondary_hue="gray", radius_size="lg"), css=custom_css) as app:
-        
+
+        llm_status_box = gr.Markdown("", visible=False, elem_classes=["center-header_subtitle"])
+        llm_status_timer = gr.Timer(1.0)
+        llm_status_timer.tick(
+            fn=render_llm_status,
+            inputs=[],
+            outputs=[llm_status_box, llm_status_timer],
+            show_progress=False
+        )
+        app.load(
+            fn=render_llm_status,
+            inputs=[],
+            outputs=[llm_status_box, llm_status_timer],
+            show_progress=False
+        )
+
         with gr.Column(visible=True) as login_col:
             user_id_state, role_state, username_box, password_box, error_box = build_login_view()
 
@@ -189,7 +239,7 @@ def create_app():
         )
 
         driver_logout_btn.click(
-            fn=lambda: (*logout(), *reset_login_fields()),
+            fn=logout_and_reset,
             inputs=[],
             outputs=[
                 user_id_state,
@@ -207,7 +257,7 @@ def create_app():
         )
 
         coach_logout_btn.click(
-            fn=lambda: (*logout(), *reset_login_fields()),
+            fn=logout_and_reset,
             inputs=[],
             outputs=[
                 user_id_state,
@@ -224,5 +274,7 @@ def create_app():
             show_progress=False
         )
 
+        app.unload(end_browser_session)
+
 
     return app
\ No newline at end of file